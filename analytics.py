@@ -0,0 +1,185 @@
+from datetime import date
+import threading
+
+from databasee import analytics_as_of, cached_analytics_as_of, get_analytics_cursor, get_read_cursor, DIFFICULTY_LEVELS
+
+# NumPy is imported inside the functions that use it, so importing this module (and the
+# quiz engine, which invalidates its cache) stays cheap for processes that never compute mastery
+
+
+class Mastery:
+    """Accuracy of a class or school's answers, broken down in NumPy arrays.
+
+    ``accuracy`` is students x topics, ``difficulty_accuracy`` is students x difficulty levels
+    and ``topic_trend`` is topics x weeks (weeks counted from the Monday of the homework's
+    DateAssigned). Cells with no answers are NaN. ``as_of`` is when the analytics snapshot it was
+    computed from was taken, or None if it came from the live database.
+    """
+
+    def __init__(self, student_ids, topic_ids, topic_names, weeks, answered, correct,
+                 difficulty_answered, difficulty_correct, trend_answered, trend_correct, homework_ids):
+        self.student_ids = student_ids
+        self.topic_ids = topic_ids
+        self.topic_names = topic_names
+        self.weeks = weeks
+        self.answered = answered
+        self.correct = correct
+        self.accuracy = _ratio(correct, answered)
+        self.difficulty_accuracy = _ratio(difficulty_correct, difficulty_answered)
+        self.topic_trend = _ratio(trend_correct, trend_answered)
+        self.homework_ids = homework_ids
+        self.as_of = None
+        self._student_index = {student_id: i for i, student_id in enumerate(student_ids.tolist())}
+        self._topic_index = {topic_id: i for i, topic_id in enumerate(topic_ids.tolist())}
+
+    def student_topic(self, student_id, topic_id):
+        """Accuracy of one student on one topic, or None if they have not answered any of it."""
+        i = self._student_index.get(student_id)
+        j = self._topic_index.get(topic_id)
+        if i is None or j is None or not self.answered[i, j]:
+            return None
+        return float(self.accuracy[i, j])
+
+    def weakest_topics(self, student_id, n=3):
+        """The ``n`` answered topics with the lowest accuracy for a student, as ``[(TopicName, accuracy), ...]``."""
+        import numpy as np
+
+        i = self._student_index.get(student_id)
+        if i is None:
+            return []
+        row = self.accuracy[i]
+        answered = np.flatnonzero(~np.isnan(row))
+        order = answered[np.argsort(row[answered], kind="stable")][:n]
+        return [(self.topic_names[j], float(row[j])) for j in order]
+
+    def topic_averages(self):
+        """Class-wide accuracy per topic, pooling every student's answers."""
+        return _ratio(self.correct.sum(axis=0), self.answered.sum(axis=0))
+
+
+def _ratio(numerator, denominator):
+    import numpy as np
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+
+def _grid(rows, cols, n_rows, n_cols, weights=None):
+    import numpy as np
+
+    # Scatter-add into a dense n_rows x n_cols grid with one bincount over flattened indices
+    return np.bincount(rows * n_cols + cols, weights=weights, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
+
+
+def compute_mastery(rows, homework_ids):
+    """Build a Mastery from ``(StudentID, TopicID, TopicName, DifficultyLevel, DateAssigned, AnswerGiven, CorrectAnswer)`` rows."""
+    import numpy as np
+
+    if rows:
+        student_col, topic_col, topic_name_col, difficulty_col, assigned_col, given_col, correct_col = zip(*rows)
+    else:
+        student_col = topic_col = topic_name_col = difficulty_col = assigned_col = given_col = correct_col = ()
+
+    given = np.char.lower(np.char.strip(np.array([a or "" for a in given_col], dtype=str)))
+    expected = np.char.lower(np.char.strip(np.array(correct_col, dtype=str)))
+    is_correct = (given == expected).astype(float) if rows else np.zeros(0)
+
+    student_ids, s_idx = np.unique(np.array(student_col, dtype=np.int64), return_inverse=True)
+    topic_ids, t_idx = np.unique(np.array(topic_col, dtype=np.int64), return_inverse=True)
+    topic_names = dict(zip(topic_col, topic_name_col))
+    levels, level_idx = np.unique(np.array(difficulty_col, dtype=str), return_inverse=True)
+    d_idx = np.array([DIFFICULTY_LEVELS.index(level) for level in levels.tolist()], dtype=np.int64)[level_idx]
+
+    # Week number of each answer's homework, counted in Monday-aligned weeks; only distinct dates are parsed
+    assigned, assigned_idx = np.unique(np.array([str(d)[:10] for d in assigned_col], dtype=str), return_inverse=True)
+    ordinals = np.array([date.fromisoformat(d).toordinal() for d in assigned.tolist()], dtype=np.int64)[assigned_idx]
+    week_ordinals, w_idx = np.unique((ordinals - 1) // 7, return_inverse=True)
+    weeks = [date.fromordinal(int(w) * 7 + 1) for w in week_ordinals]
+
+    n_students, n_topics, n_weeks = len(student_ids), len(topic_ids), len(weeks)
+    n_levels = len(DIFFICULTY_LEVELS)
+    return Mastery(
+        student_ids=student_ids,
+        topic_ids=topic_ids,
+        topic_names=[topic_names[t] for t in topic_ids.tolist()],
+        weeks=weeks,
+        answered=_grid(s_idx, t_idx, n_students, n_topics),
+        correct=_grid(s_idx, t_idx, n_students, n_topics, is_correct),
+        difficulty_answered=_grid(s_idx, d_idx, n_students, n_levels),
+        difficulty_correct=_grid(s_idx, d_idx, n_students, n_levels, is_correct),
+        trend_answered=_grid(t_idx, w_idx, n_topics, n_weeks),
+        trend_correct=_grid(t_idx, w_idx, n_topics, n_weeks, is_correct),
+        homework_ids=homework_ids,
+    )
+
+
+MASTERY_QUERY = """
+    SELECT r.StudentID, q.TopicID, t.TopicName, q.DifficultyLevel, h.DateAssigned, r.AnswerGiven, q.CorrectAnswer
+    FROM StudentQuizResults r
+    JOIN HomeworkTasks h ON h.HomeworkID = r.HomeworkID
+    JOIN QuizQuestions q ON q.QuestionID = r.QuestionID
+    JOIN QuestionTopics t ON t.TopicID = q.TopicID
+    WHERE r.HomeworkID IN ({homework})
+"""
+
+_cache = {}
+_cache_lock = threading.Lock()
+# Bumped on every invalidation, so a load that raced with a new answer is not cached
+_generation = 0
+
+
+def _mastery(key, homework_sql, params):
+    # Computed from the analytics snapshot when there is one, and then cached until the next snapshot
+    as_of = analytics_as_of()
+    with _cache_lock:
+        cached = _cache.get(key)
+        generation = _generation
+    if cached is not None and cached.as_of == as_of:
+        return cached
+    with get_analytics_cursor() as c:
+        homework_ids = {row[0] for row in c.execute(homework_sql, params)}
+        rows = c.execute(MASTERY_QUERY.format(homework=homework_sql), params).fetchall()
+    mastery = compute_mastery(rows, homework_ids)
+    mastery.as_of = as_of
+    with _cache_lock:
+        if generation == _generation:
+            _cache[key] = mastery
+    return mastery
+
+
+def class_mastery(class_id):
+    return _mastery(("class", class_id), "SELECT HomeworkID FROM HomeworkTasks WHERE ClassID = ?", (class_id,))
+
+
+def school_mastery(school_id):
+    return _mastery(("school", school_id), """
+        SELECT HomeworkID FROM HomeworkTasks
+        WHERE ClassID IN (SELECT ClassID FROM Classes WHERE SchoolID = ?)
+    """, (school_id,))
+
+
+def invalidate_homework(homework_id):
+    """Drop cached mastery for the class and school a newly answered homework belongs to."""
+    global _generation
+    if cached_analytics_as_of() is not None:
+        # Mastery comes from the snapshot, so the new answer only shows up once the next one is taken.
+        # Any cached mastery was read after the snapshot it came from was opened, so the cached time is enough
+        return
+    with _cache_lock:
+        _generation += 1
+        if not _cache:
+            return
+        stale = [key for key, mastery in _cache.items() if homework_id in mastery.homework_ids]
+    if not stale:
+        # Homework created after the cache was filled: find its class and school directly
+        with get_read_cursor() as c:
+            row = c.execute("""
+                SELECT h.ClassID, cl.SchoolID FROM HomeworkTasks h
+                JOIN Classes cl ON cl.ClassID = h.ClassID
+                WHERE h.HomeworkID = ?
+            """, (homework_id,)).fetchone()
+        if row:
+            stale = [("class", row[0]), ("school", row[1])]
+    with _cache_lock:
+        for key in stale:
+            _cache.pop(key, None)
@@ -1,24 +1,23 @@
-from databasee import connection, c
+from databasee import get_directory_cursor, get_directory_read_cursor, current_principal
 from datetime import datetime
 
 import sqlite3
 import hashlib
-from argon2 import PasswordHasher
 from datetime import datetime
 import json
 import random
-import pandas as pd
 import os
 
 import sqlite3
 
-ph = PasswordHasher()
 
 current_user_token = None
 
 from session import session
-from school import add_school, add_class, add_teacher_to_class, add_student_to_class, approve_enrollment_request, add_period, add_teacher_to_school, approve_school_join_request, request_to_join_school, add_busy_time, request_to_join_class
-from tasks import add_homework_task, create_quiz_from_pool, add_topic, add_quiz_question, bulk_upload_questions
+from passwords import passwords, PasswordServiceBusy
+from migrations import migrate
+from school import add_school, add_class, add_teacher_to_class, add_student_to_class, approve_enrollment_request, add_period, add_teacher_to_school, approve_school_join_request, request_to_join_school, add_busy_time, batch_decide_enrollment_requests, batch_decide_school_join_requests, sync_class_roster, bulk_provision_users, request_to_join_class, view_schedule, find_free_time, view_revision_plan
+from tasks import add_homework_task, create_quiz_from_pool, add_topic, add_quiz_question, bulk_upload_questions, view_quiz_results, view_topic_mastery
 
 def log_in():
     global current_user_token
@@ -39,23 +38,47 @@ def login_flow():
     global current_user_token
     while True:
         email = input("Email: ")
-        row = c.execute("SELECT UserID, PasswordHash, UserRole FROM Users WHERE Email=?", (email,)).fetchone()
-        if not row:
+        with get_directory_read_cursor() as c:
+            exists = c.execute("SELECT 1 FROM Users WHERE Email=?", (email,)).fetchone()
+        if not exists:
             print("Email not found. Please try again.")
             continue
 
-        user_id, password_hash, role = row
         password = input("Password: ")
         try:
-            ph.verify(password_hash, password)
-            session.login(user_id, role)
-            current_user_token = user_id
-            session.start_time = datetime.now()
-            session.role = role
-            print(f"✅ Login successful! User ID: {session.get_user_id()}")
-            student_options() if role.lower() == "student" else teacher_options()
-        except:
+            user = authenticate(email, password)
+        except PasswordServiceBusy as e:
+            print(f"⚠️ {e}")
+            continue
+        if user is None:
             print("❌ Incorrect password. Please try again.")
+            continue
+        user_id, role = user
+        session.login(user_id, role)
+        current_principal()
+        current_user_token = user_id
+        session.start_time = datetime.now()
+        session.role = role
+        print(f"✅ Login successful! User ID: {session.get_user_id()}")
+        student_options() if role.lower() == "student" else teacher_options()
+
+def authenticate(email, password):
+    """``(UserID, UserRole)`` if the password matches, otherwise None.
+
+    Verification runs on the hashing pool, not on this thread, and raises
+    PasswordServiceBusy when the pool is saturated.
+    """
+    with get_directory_read_cursor() as c:
+        row = c.execute("SELECT UserID, PasswordHash, UserRole FROM Users WHERE Email=?", (email,)).fetchone()
+    if not row:
+        # Same cost as a wrong password, so timing does not reveal which emails are registered
+        passwords.verify_absent(password)
+        return None
+    user_id, password_hash, role = row
+    if not passwords.verify(password_hash, password):
+        return None
+    passwords.rehash_in_background(user_id, password_hash, password)
+    return user_id, role
 
 def sign_up():
     global current_user_token
@@ -66,14 +89,16 @@ def sign_up():
     # Email uniqueness
     while True:
         email = input("Email: ")
-        if c.execute("SELECT 1 FROM Users WHERE Email=?", (email,)).fetchone():
+        with get_directory_read_cursor() as c:
+            taken = c.execute("SELECT 1 FROM Users WHERE Email=?", (email,)).fetchone()
+        if taken:
             print("⚠️ Email already exists. Try a different one.")
         else:
             break
 
     # Password and Role
     password = input("Password: ")
-    hashed_password = ph.hash(password)
+    hashed_password = passwords.hash(password)
 
     while True:
         user_role = input("User Role (Student/Teacher): ").strip().lower()
@@ -87,32 +112,32 @@ def sign_up():
     if school_input:
         try:
             school_id = int(school_input)
-            if not c.execute("SELECT 1 FROM Schools WHERE SchoolID=?", (school_id,)).fetchone():
+            with get_directory_read_cursor() as c:
+                school_exists = c.execute("SELECT 1 FROM Schools WHERE SchoolID=?", (school_id,)).fetchone()
+            if not school_exists:
                 print("⚠️ Invalid school ID. Ignoring.")
                 school_id = None
         except:
             print("⚠️ Invalid input. Ignoring school ID.")
 
-    # Insert User
-    c.execute("""INSERT INTO Users (FirstName, LastName, Email, PasswordHash, UserRole)
-                 VALUES (?, ?, ?, ?, ?)""", (first_name, last_name, email, hashed_password, user_role))
-    connection.commit()
-    
-    user_id = c.execute("SELECT UserID FROM Users WHERE Email=?", (email,)).fetchone()[0]
-    current_user_token = user_id
-    session.login(user_id, user_role)
-
-    if school_id:
-        c.execute("INSERT INTO SchoolJoinRequests (UserID, SchoolID) VALUES (?, ?)", (current_user_token, school_id))
-    connection.commit()
-
     if user_role == "student":
         year_group = int(input("Year Group: "))
-        c.execute("INSERT INTO Students (YearGroup, UserID) VALUES (?, ?)", (year_group, user_id))
-    else:
-        c.execute("INSERT INTO Teachers (UserID) VALUES (?)", (user_id,))
 
-    connection.commit()
+    # The user, their role row and any join request are committed together
+    with get_directory_cursor() as c:
+        c.execute("""INSERT INTO Users (FirstName, LastName, Email, PasswordHash, UserRole)
+                     VALUES (?, ?, ?, ?, ?)""", (first_name, last_name, email, hashed_password, user_role))
+        user_id = c.lastrowid
+
+        if school_id:
+            c.execute("INSERT INTO SchoolJoinRequests (UserID, SchoolID) VALUES (?, ?)", (user_id, school_id))
+
+        if user_role == "student":
+            c.execute("INSERT INTO Students (YearGroup, UserID) VALUES (?, ?)", (year_group, user_id))
+        else:
+            c.execute("INSERT INTO Teachers (UserID) VALUES (?)", (user_id,))
+    current_user_token = user_id
+    session.login(user_id, user_role)
     print("🎉 Registration complete!")
     return student_options() if user_role == "student" else teacher_options()
 
@@ -134,14 +159,18 @@ def student_options():
         "1": request_to_join_class,
         "2": add_busy_time,
         "3": request_to_join_school,
-        "4": logout
+        "4": view_schedule,
+        "5": view_revision_plan,
+        "6": logout
     }
     while current_user_token:
         print("\n📘 Student Menu:")
         print("1. Request to join a class")
         print("2. Add busy time")
         print("3. Request to join a school")
-        print("4. Log out")
+        print("4. View my schedule")
+        print("5. View my revision plan")
+        print("6. Log out")
         action = input("Choose an option: ")
         if action in actions:
             actions[action]()
@@ -163,8 +192,15 @@ def teacher_options():
         "11": create_quiz_from_pool,
         "12": add_topic,
         "13": add_quiz_question,
-        "14": bulk_upload_questions,  # NEW
-        "15": logout
+        "14": bulk_upload_questions,
+        "15": view_quiz_results,
+        "16": view_topic_mastery,
+        "17": find_free_time,
+        "18": batch_decide_enrollment_requests,
+        "19": batch_decide_school_join_requests,
+        "20": sync_class_roster,
+        "21": bulk_provision_users,
+        "22": logout
     }
     while current_user_token:
         print("\n📗 Teacher Menu:")
@@ -177,21 +213,8 @@ def teacher_options():
         else:
             print("❌ Invalid option.")
 
-def create_indexes():
-    # Creating indexes to speed up queries
-    try:
-        c.execute("CREATE INDEX IF NOT EXISTS idx_school_id ON Users(SchoolID);")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_class_id ON Enrollment(ClassID);")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_user_id ON Users(UserID);")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_student_id ON Enrollment(StudentID);")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_teacher_id ON ClassTeachers(TeacherID);")
-        c.execute("CREATE INDEX IF NOT EXISTS idx_classes_class_id ON Classes(ClassID);")
-        connection.commit()
-        print("Indexes created successfully!")
-    except sqlite3.DatabaseError as e:
-        print(f"Error creating indexes: {e}")
-
-
-create_indexes()
-# Start the login process
-log_in()
\ No newline at end of file
+
+if __name__ == "__main__":
+    migrate()
+    # Start the login process
+    log_in()
@@ -0,0 +1,331 @@
+"""Benchmark the hot paths headlessly and compare against a stored baseline.
+
+    python synthetic_data.py --db bench.db
+    python benchmark.py --db bench.db --save-baseline benchmark_baseline.json
+    python benchmark.py --db bench.db --baseline benchmark_baseline.json
+
+The database is copied first, so the writes the benchmarks make never touch the original.
+Each benchmark reports throughput and p50/p99 latency; with --baseline, any p50 or p99
+more than --tolerance slower than the baseline is a regression and the exit status is 1.
+Baselines are only comparable on the same machine and dataset.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+BENCHMARKS = []
+
+
+def benchmark(name, iterations):
+    """Register ``setup(rng)``, which prepares inputs and returns the operation to time."""
+    def register(setup):
+        BENCHMARKS.append((name, iterations, setup))
+        return setup
+    return register
+
+
+def _rows(sql, params=()):
+    from databasee import get_read_cursor
+    with get_read_cursor() as c:
+        return c.execute(sql, params).fetchall()
+
+
+@benchmark("get_next_question", 2000)
+def next_question(rng):
+    from quiz_engine import engine
+    pairs = _rows("""
+        SELECT e.StudentID, h.AssignmentID, h.HomeworkID FROM Enrollment e
+        JOIN HomeworkTasks h ON h.ClassID = e.ClassID AND h.HomeworkType = 'Quiz'
+        ORDER BY random() LIMIT 500
+    """)
+    return lambda: engine.next_question(*rng.choice(pairs))
+
+
+@benchmark("record_answer", 500)
+def record_answer(rng):
+    from quiz_engine import engine
+    pairs = _rows("""
+        SELECT e.StudentID, h.AssignmentID, h.HomeworkID FROM Enrollment e
+        JOIN HomeworkTasks h ON h.ClassID = e.ClassID AND h.HomeworkType = 'Quiz'
+        ORDER BY random() LIMIT 500
+    """)
+
+    def op():
+        student_id, quiz_id, homework_id = rng.choice(pairs)
+        question = engine.next_question(student_id, quiz_id, homework_id)
+        if question is not None:
+            engine.record_answer(student_id, quiz_id, homework_id, question[0], rng.choice(json.loads(question[2])))
+    return op
+
+
+@benchmark("login", 20)
+def login(rng):
+    from auth import authenticate
+    emails = [row[0] for row in _rows("SELECT Email FROM Users ORDER BY random() LIMIT 100")]
+    return lambda: authenticate(rng.choice(emails), "password")
+
+
+@benchmark("add_questions (1000 rows)", 5)
+def add_questions(rng):
+    from services import add_questions
+    admins = _school_admins()
+    topics = {}
+    for topic_id, school_id in _rows("SELECT TopicID, SchoolID FROM QuestionTopics"):
+        topics.setdefault(school_id, []).append(topic_id)
+    school_ids = [school_id for school_id in admins if school_id in topics]
+
+    def op():
+        school_id = rng.choice(school_ids)
+        n = rng.randrange(10 ** 9)
+        add_questions(admins[school_id], [{
+            "topic_id": rng.choice(topics[school_id]), "question_text": f"Benchmark {n} question {i}?",
+            "difficulty": ["easy", "Medium", "HARD"][i % 3], "options": ["a", "b", "c", "d"], "correct_answer": "a",
+        } for i in range(1000)])
+    return op
+
+
+@benchmark("bulk_upload_questions (1000 rows)", 5)
+def bulk_upload(rng):
+    import pandas as pd
+
+    from databasee import get_cursor
+    from tasks import upsert_questions
+    school_ids = [row[0] for row in _rows("SELECT SchoolID FROM Schools")]
+
+    def op():
+        n = rng.randrange(10 ** 9)
+        df = pd.DataFrame({
+            "TopicName": [f"Benchmark topic {i % 10}" for i in range(1000)],
+            "Difficulty": [["easy", "Medium", "HARD"][i % 3] for i in range(1000)],
+            "QuestionText": [f"Benchmark {n} question {i}?" for i in range(1000)],
+            "Option1": ["a"] * 1000, "Option2": ["b"] * 1000, "Option3": ["c"] * 1000, "Option4": ["d"] * 1000,
+            "CorrectAnswer": ["a"] * 1000,
+        })
+        with get_cursor() as c:
+            upsert_questions(c, rng.choice(school_ids), df)
+    return op
+
+
+def _principals(user_ids):
+    from databasee import load_principal
+    return {user_id: load_principal(user_id) for user_id in set(user_ids)}
+
+
+def _school_admins():
+    """SchoolID -> the Principal of one of its admins."""
+    admins = dict(_rows("SELECT SchoolID, MIN(UserID) FROM Users WHERE IsSchoolAdmin GROUP BY SchoolID"))
+    principals = _principals(admins.values())
+    return {school_id: principals[user_id] for school_id, user_id in admins.items()}
+
+
+@benchmark("add_period", 50)
+def add_period(rng):
+    from services import create_period
+    classes = _rows("""
+        SELECT ct.ClassID, t.UserID FROM ClassTeachers ct JOIN Teachers t ON t.TeacherID = ct.TeacherID
+        ORDER BY random() LIMIT 200
+    """)
+    principals = _principals(user_id for _, user_id in classes)
+
+    def op():
+        class_id, user_id = rng.choice(classes)
+        start = rng.randrange(8 * 60, 15 * 60, 5)
+        create_period(principals[user_id], class_id, f"{start // 60:02d}:{start % 60:02d}", f"{(start + 50) // 60:02d}:{(start + 50) % 60:02d}")
+    return op
+
+
+@benchmark("approve_enrollment_request", 200)
+def approve_enrollment(rng):
+    from services import decide_enrollment_request
+    admins = _school_admins()
+    pending = _rows("""
+        SELECT r.RequestID, cl.SchoolID FROM EnrollmentRequests r JOIN Classes cl ON cl.ClassID = r.ClassID
+        WHERE r.Status='Pending'
+    """)
+    pending = [(request_id, admins[school_id]) for request_id, school_id in pending if school_id in admins]
+    rng.shuffle(pending)
+
+    def op():
+        if pending:
+            request_id, admin = pending.pop()
+            decide_enrollment_request(admin, request_id, True)
+    return op
+
+
+@benchmark("approve_school_join_request", 200)
+def approve_school_join(rng):
+    from services import decide_school_join_request
+    admins = _school_admins()
+    pending = _rows("SELECT RequestID, SchoolID FROM SchoolJoinRequests WHERE Status='Pending'")
+    pending = [(request_id, admins[school_id]) for request_id, school_id in pending if school_id in admins]
+    rng.shuffle(pending)
+
+    def op():
+        if pending:
+            request_id, admin = pending.pop()
+            decide_school_join_request(admin, request_id, True)
+    return op
+
+
+@benchmark("enroll_many (1000 pairs)", 5)
+def enroll_many(rng):
+    from services import enroll_many
+    admins = _school_admins()
+    by_school = {}
+    for student_id, school_id in _rows("SELECT s.StudentID, u.SchoolID FROM Students s JOIN Users u ON u.UserID = s.UserID"):
+        by_school.setdefault(school_id, []).append(student_id)
+    classes = {}
+    for class_id, school_id in _rows("SELECT ClassID, SchoolID FROM Classes"):
+        classes.setdefault(school_id, []).append(class_id)
+    school_ids = [school_id for school_id in admins if by_school.get(school_id) and classes.get(school_id)]
+
+    def op():
+        school_id = rng.choice(school_ids)
+        enroll_many(admins[school_id], [(rng.choice(by_school[school_id]), rng.choice(classes[school_id]))
+                                        for _ in range(1000)])
+    return op
+
+
+@benchmark("sync_roster (5000 rows)", 5)
+def sync_roster(rng):
+    from services import sync_roster
+    admins = _school_admins()
+    students = {}
+    for email, school_id in _rows("SELECT u.Email, u.SchoolID FROM Students s JOIN Users u ON u.UserID = s.UserID"):
+        students.setdefault(school_id, []).append(email)
+    classes = {}
+    for identifier, school_id in _rows("SELECT LocalClassIdentifier, SchoolID FROM Classes"):
+        classes.setdefault(school_id, []).append(identifier)
+    school_ids = [school_id for school_id in admins if students.get(school_id) and classes.get(school_id)]
+
+    def op():
+        # A fresh roster each time, so every run both adds and removes enrollments
+        school_id = rng.choice(school_ids)
+        sync_roster(admins[school_id], [(rng.choice(classes[school_id]), rng.choice(students[school_id]))
+                                        for _ in range(5000)])
+    return op
+
+
+@benchmark("grade_class", 20)
+def grade_class(rng):
+    from grading import grade_class
+    class_ids = [row[0] for row in _rows("SELECT ClassID FROM Classes")]
+    return lambda: grade_class(rng.choice(class_ids))
+
+
+@benchmark("class_mastery (uncached)", 20)
+def class_mastery(rng):
+    import analytics
+    class_ids = [row[0] for row in _rows("SELECT ClassID FROM Classes")]
+
+    def op():
+        analytics._cache.clear()
+        analytics.class_mastery(rng.choice(class_ids))
+    return op
+
+
+@benchmark("class_free_slots", 50)
+def class_free_slots(rng):
+    from scheduling import class_free_slots
+    class_ids = [row[0] for row in _rows("SELECT ClassID FROM Classes")]
+    return lambda: class_free_slots(rng.choice(class_ids), threshold=0.8)
+
+
+def percentile(sorted_values, p):
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def run(names=None, scale=1.0, seed=0):
+    """Run the registered benchmarks and return ``{name: {"n", "throughput", "p50", "p99"}}`` (times in ms)."""
+    results = {}
+    for name, iterations, setup in BENCHMARKS:
+        if names and name not in names:
+            continue
+        rng = random.Random(seed)
+        op = setup(rng)
+        timings = []
+        for _ in range(max(1, int(iterations * scale))):
+            start = time.perf_counter()
+            op()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[name] = {
+            "n": len(timings),
+            "throughput": len(timings) / sum(timings) if sum(timings) else float("inf"),
+            "p50": percentile(timings, 50) * 1000,
+            "p99": percentile(timings, 99) * 1000,
+        }
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta_ms=0.5):
+    """Names of benchmarks whose p50 or p99 is more than ``tolerance`` slower than the baseline.
+
+    Slowdowns under ``min_delta_ms`` are ignored, since sub-millisecond timings are mostly noise.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base and any(result[key] > base[key] * (1 + tolerance) and result[key] - base[key] > min_delta_ms
+                        for key in ("p50", "p99")):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Revision App's hot paths.")
+    parser.add_argument("--db", required=True, help="database to benchmark (a copy is used)")
+    parser.add_argument("--only", action="append", help="run just this benchmark; may be repeated")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every benchmark's iteration count")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", help="write these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a regression, e.g. 0.2 = 20%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="revisionapp-bench-")
+    copy_path = os.path.join(workdir, "bench.db")
+    with sqlite3.connect(f"file:{args.db}?mode=ro", uri=True) as source, sqlite3.connect(copy_path) as copy:
+        source.backup(copy)
+    # The connection pool reads its path at import time
+    os.environ["REVISIONAPP_DB"] = copy_path
+    from migrations import migrate
+    migrate(verbose=False)
+
+    results = run(args.only, args.scale)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+
+    print(f"{'benchmark':<36} {'n':>5} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        line = f"{name:<36} {result['n']:>5} {result['throughput']:>10.1f} {result['p50']:>9.2f} {result['p99']:>9.2f}"
+        if name in baseline:
+            line += f"   (baseline p50 {baseline[name]['p50']:.2f}, p99 {baseline[name]['p99']:.2f})"
+        if name in regressions:
+            line += "  ❌ regression"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}.")
+    from databasee import pool
+    from passwords import passwords
+    passwords.shutdown()
+    pool.close_all()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
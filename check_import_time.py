@@ -0,0 +1,68 @@
+"""Fail if importing the core modules gets slow or starts pulling in heavy dependencies.
+
+Run with ``python check_import_time.py``. Each module is imported in a fresh interpreter
+under ``-X importtime``; the best of a few runs is compared against its budget so one
+noisy run does not fail the check.
+"""
+import subprocess
+import sys
+
+# Cumulative import time allowed per module, in milliseconds
+BUDGETS_MS = {
+    "grading": 60,
+    "quiz_engine": 80,
+    "scheduling": 60,
+    "planner": 100,
+    "analytics": 60,
+    "services": 100,
+    "tasks": 150,
+}
+
+# Only loaded by the code paths that need them (bulk upload, templates, mastery, hashing, planning a school)
+LAZY_DEPENDENCIES = ["pandas", "numpy", "openpyxl", "argon2", "multiprocessing"]
+
+RUNS = 3
+
+
+def import_time_ms(module):
+    """Cumulative time to import ``module`` in a fresh interpreter, and the modules it loaded."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    loaded = set()
+    cumulative_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package", nested names are indented
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        loaded.add(name.split(".")[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, loaded
+
+
+def main():
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        timings = []
+        for _ in range(RUNS):
+            elapsed, loaded = import_time_ms(module)
+            timings.append(elapsed)
+        best = min(timings)
+        heavy = [name for name in LAZY_DEPENDENCIES if name in loaded]
+        status = "ok"
+        if best > budget:
+            status = "over budget"
+            failed = True
+        if heavy:
+            status = f"imports {', '.join(heavy)} eagerly"
+            failed = True
+        print(f"{module:<12} {best:7.1f} ms  (budget {budget} ms)  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
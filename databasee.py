@@ -1,241 +1,520 @@
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+import time
 
+import contextvars
+import hashlib
+import os
+import re
 import sqlite3
+import threading
 from session import session
 
 global current_user_token
 current_user_token = None
 
+DB_PATH = os.environ.get("REVISIONAPP_DB", "tables.db")
+# When set, each school gets its own database in this directory, next to a directory.db
+# holding users and schools (see sharding.py); REVISIONAPP_DB is then unused
+SHARD_DIR = os.environ.get("REVISIONAPP_SHARD_DIR")
+BUSY_TIMEOUT_MS = 5000
+# When set, every statement the app runs is appended here for query_audit.py
+SQL_LOG = os.environ.get("REVISIONAPP_SQL_LOG")
+
+# Reports stop reading a snapshot from snapshots.py once it is this old, and read the live database instead
+ANALYTICS_MAX_AGE_SECONDS = float(os.environ.get("REVISIONAPP_ANALYTICS_MAX_AGE", 60 * 60))
+
+# When above 0, each database's writes go through one shared connection and concurrent units
+# of work are committed together, waiting up to this long for more to join (see GroupCommit)
+GROUP_COMMIT_MS = float(os.environ.get("REVISIONAPP_GROUP_COMMIT_MS", 0))
+
+# Allowed values of QuizQuestions.DifficultyLevel, easiest first
+DIFFICULTY_LEVELS = ["Easy", "Medium", "Hard"]
+
+
+class _Batch:
+    def __init__(self):
+        self.units = 0
+        self.committed = False
+        self.error = None
+
+
+class GroupCommit:
+    """Merges the commits of concurrent units of work into one.
+
+    Every thread writes through one shared connection, one unit at a time (SQLite allows a
+    single writer anyway). A finished unit releases its savepoint but leaves the transaction
+    open, then waits: the first waiter becomes the leader, lets the units already running or
+    queued finish for up to ``window`` seconds, and commits them all at once, so a burst of
+    requests costs one fsync instead of one each. A unit that raises is rolled back to its
+    savepoint without touching the others. A lone unit is committed straight away.
+    """
+
+    def __init__(self, open_connection, window):
+        self.window = window
+        self._open_connection = open_connection
+        self._conn = None
+        self._write_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._active = 0  # units waiting for or holding the write lock
+        self._uncommitted = 0  # finished units whose batch has not been committed yet
+        self._open_batch = _Batch()
+        self._leading = False
+
+    def connection(self):
+        with self._cond:
+            if self._conn is None:
+                # Every use is serialised by the write lock, whichever thread it comes from
+                self._conn = self._open_connection(synchronous="FULL")
+            return self._conn
+
+    @contextmanager
+    def unit(self):
+        conn = self.connection()
+        with self._cond:
+            self._active += 1
+        try:
+            with self._write_lock:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE;")
+                conn.execute("SAVEPOINT unit_of_work;")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK TO unit_of_work;")
+                    conn.execute("RELEASE unit_of_work;")
+                    with self._cond:
+                        idle = self._uncommitted == 0
+                    if idle:
+                        # Nothing else is waiting on this transaction, so end it instead of holding the lock
+                        conn.rollback()
+                    raise
+                conn.execute("RELEASE unit_of_work;")
+                with self._cond:
+                    batch = self._open_batch
+                    batch.units += 1
+                    self._uncommitted += 1
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+        self._wait_for(batch)
+
+    def _wait_for(self, batch):
+        with self._cond:
+            while not batch.committed:
+                if self._leading:
+                    self._cond.wait()
+                    continue
+                # No leader: the open batch is this one, so commit it
+                self._leading = True
+                deadline = time.monotonic() + self.window
+                while self._active and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                closing, self._open_batch = self._open_batch, _Batch()
+                self._cond.release()
+                try:
+                    with self._write_lock:
+                        try:
+                            if self._conn.in_transaction:
+                                self._conn.commit()
+                        except BaseException as e:
+                            self._conn.rollback()
+                            closing.error = e
+                finally:
+                    self._cond.acquire()
+                    closing.committed = True
+                    self._uncommitted -= closing.units
+                    self._leading = False
+                    self._cond.notify_all()
+        if batch.error is not None:
+            raise batch.error
+
+    def close(self):
+        with self._write_lock, self._cond:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ConnectionPool:
+    """Hands out one read-write and one read-only SQLite connection per thread.
+
+    Connections run in WAL mode so readers never block the writer, and every
+    connection waits up to ``busy_timeout_ms`` for a lock instead of failing
+    straight away with "database is locked". With ``group_commit_ms`` set, the
+    writers are replaced by one shared GroupCommit connection with durable
+    (synchronous = FULL) commits, which concurrent transactions share.
+    """
+
+    def __init__(self, path, busy_timeout_ms=BUSY_TIMEOUT_MS, group_commit_ms=GROUP_COMMIT_MS):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._group = GroupCommit(self._open, group_commit_ms / 1000) if group_commit_ms > 0 else None
+        # When the newest snapshot this process has taken or opened was copied
+        self._snapshot_taken_at = None
+
+    def _open(self, read_only=False, synchronous="NORMAL"):
+        # Each connection is only used by the thread it belongs to, but close_all() closes them all
+        # from whichever thread calls it, so sqlite3's same-thread check is turned off
+        if read_only:
+            uri = Path(self.path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON;")
+        else:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute(f"PRAGMA synchronous = {synchronous};")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)};")
+        conn.execute("PRAGMA foreign_keys = ON;")
+        if SQL_LOG:
+            conn.set_trace_callback(self._log_statement)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _log_statement(self, sql):
+        with self._lock:
+            with open(SQL_LOG, "a", encoding="utf-8") as f:
+                f.write(" ".join(sql.split()) + "\n")
+
+    def connection(self):
+        if self._group is not None:
+            return self._group.connection()
+        conn = getattr(self._local, "writer", None)
+        if conn is None:
+            conn = self._local.writer = self._open()
+        return conn
+
+    def read_connection(self):
+        conn = getattr(self._local, "reader", None)
+        if conn is None:
+            self.connection()  # make sure the file exists before opening it read-only
+            conn = self._local.reader = self._open(read_only=True)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Unit of work on this thread's writer: commits once when the outermost block exits
+        cleanly and rolls back if it raises. Nested blocks, including every cursor() and
+        read_cursor() inside it, join the outer one, so one logical action is one commit."""
+        if getattr(self._local, "depth", 0):
+            self._local.depth += 1
+            try:
+                yield self._local.unit
+            finally:
+                self._local.depth -= 1
+            return
+        with (self._group.unit() if self._group is not None else self._solo_unit()) as conn:
+            self._local.unit, self._local.depth = conn, 1
+            try:
+                yield conn
+            finally:
+                self._local.unit, self._local.depth = None, 0
+
+    @contextmanager
+    def _solo_unit(self):
+        conn = self.connection()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        if conn.in_transaction:
+            conn.commit()
+
+    @contextmanager
+    def cursor(self):
+        """Cursor on this thread's writer, inside a transaction() of its own or the enclosing one."""
+        with self.transaction() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    @contextmanager
+    def read_cursor(self):
+        """Cursor on this thread's read-only connection, for listing queries. Inside a
+        transaction() it reads through the writer instead, so it sees the unit's own writes."""
+        unit = getattr(self._local, "unit", None)
+        cur = (unit if unit is not None else self.read_connection()).cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    @property
+    def replica_path(self):
+        """Where snapshots.py keeps this database's analytics snapshot."""
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.analytics{ext or '.db'}"
+
+    def replica_connection(self):
+        """This thread's connection to the latest snapshot and the time it was taken, or ``(None, None)``
+        if there is none yet. Reopened whenever snapshots.py renames a newer snapshot into place."""
+        try:
+            stat = os.stat(self.replica_path)
+        except FileNotFoundError:
+            return None, None
+        version = (stat.st_ino, stat.st_mtime_ns)
+        conn = getattr(self._local, "replica", None)
+        if conn is not None and self._local.replica_version == version:
+            return conn, self._local.replica_taken_at
+        if conn is not None:
+            with self._lock:
+                self._connections.remove(conn)
+            conn.close()
+        # Snapshots are never written in place, so SQLite can skip locking them altogether
+        uri = Path(self.replica_path).resolve().as_uri() + "?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON;")
+        if SQL_LOG:
+            conn.set_trace_callback(self._log_statement)
+        taken_at = datetime.fromisoformat(conn.execute("SELECT TakenAt FROM SnapshotInfo").fetchone()[0])
+        with self._lock:
+            self._connections.append(conn)
+        self._local.replica, self._local.replica_version, self._local.replica_taken_at = conn, version, taken_at
+        self.publish_snapshot(taken_at)
+        return conn, taken_at
+
+    def publish_snapshot(self, taken_at):
+        """Note that a snapshot taken at ``taken_at`` is in place, for cached_analytics_as_of()."""
+        with self._lock:
+            if self._snapshot_taken_at is None or taken_at > self._snapshot_taken_at:
+                self._snapshot_taken_at = taken_at
+
+    def cached_analytics_as_of(self):
+        """analytics_as_of() going by the newest snapshot this process has taken or opened, without
+        looking at the file, so it is cheap enough to check on every quiz answer."""
+        taken_at = self._snapshot_taken_at
+        if taken_at is None or time.time() - taken_at.timestamp() > ANALYTICS_MAX_AGE_SECONDS:
+            return None
+        return taken_at
+
+    def analytics_connection(self):
+        """The snapshot connection and its age for reports, or the live read-only connection and None
+        when there is no snapshot younger than ANALYTICS_MAX_AGE_SECONDS."""
+        conn, taken_at = self.replica_connection()
+        if conn is None or time.time() - taken_at.timestamp() > ANALYTICS_MAX_AGE_SECONDS:
+            return self.read_connection(), None
+        return conn, taken_at
+
+    @contextmanager
+    def analytics_cursor(self):
+        """Cursor for reports and mastery, which may be a few minutes behind the live database."""
+        cur = self.analytics_connection()[0].cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    def close_all(self):
+        if self._group is not None:
+            self._group.close()
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class ShardRouter:
+    """Opens ``directory.db`` and one ``school_<SchoolID>.db`` per school under ``shard_dir``, on first use.
+
+    A shard file may be a symlink, so busy schools can live on other disks.
+    """
+
+    def __init__(self, shard_dir, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.shard_dir = shard_dir
+        self.busy_timeout_ms = busy_timeout_ms
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, school_id):
+        name = "directory.db" if school_id is None else f"school_{int(school_id)}.db"
+        return os.path.join(self.shard_dir, name)
+
+    def pool_for(self, school_id):
+        pool = self._pools.get(school_id)
+        if pool is None:
+            with self._lock:
+                if school_id not in self._pools:
+                    os.makedirs(self.shard_dir, exist_ok=True)
+                    self._pools[school_id] = ConnectionPool(self.path_for(school_id), self.busy_timeout_ms)
+                pool = self._pools[school_id]
+        return pool
+
+    def school_ids(self):
+        if not os.path.isdir(self.shard_dir):
+            return []
+        return sorted(int(match.group(1)) for match in map(re.compile(r"school_(\d+)\.db").fullmatch, os.listdir(self.shard_dir))
+                      if match)
+
+    def close_all(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close_all()
+
+
+# In sharded mode ``pool`` is the directory; school data goes through current_pool()
+router = ShardRouter(SHARD_DIR) if SHARD_DIR else None
+pool = router.pool_for(None) if router else ConnectionPool(DB_PATH)
+
+# The school whose shard get_cursor() uses in sharded mode; None means the directory
+current_school = contextvars.ContextVar("current_school", default=None)
+
+
+@contextmanager
+def use_school(school_id):
+    """Route this thread's (or task's) get_cursor() calls to ``school_id``'s shard inside the block."""
+    token = current_school.set(school_id)
+    try:
+        yield
+    finally:
+        current_school.reset(token)
+
+
+def current_pool():
+    if router is None:
+        return pool
+    return router.pool_for(current_school.get())
+
+
+def transaction():
+    # Unit of work for a service action: its cursors share one commit
+    return current_pool().transaction()
+
+def get_cursor():
+    return current_pool().cursor()
+
+def get_read_cursor():
+    return current_pool().read_cursor()
+
+def get_analytics_cursor():
+    # Reads the latest snapshot from snapshots.py, so long reports hold no locks on the live file
+    return current_pool().analytics_cursor()
+
+def analytics_as_of():
+    """When the data get_analytics_cursor() reads was copied, or None when it reads the live database."""
+    return current_pool().analytics_connection()[1]
+
+def cached_analytics_as_of():
+    return current_pool().cached_analytics_as_of()
+
+def get_directory_cursor():
+    # Users, Students, Teachers, Schools and SchoolJoinRequests; the same database when not sharded
+    return pool.cursor()
+
+def get_directory_read_cursor():
+    return pool.read_cursor()
+
+
+def select_in(c, sql, ids, params=()):
+    """Rows of ``sql`` with ``{ids}`` expanded to placeholders, run once per batch of 500 ``ids``
+    to stay under SQLite's limit on bound variables."""
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), 500):
+        batch = ids[start:start + 500]
+        rows += c.execute(sql.format(ids=", ".join("?" * len(batch))), (*params, *batch)).fetchall()
+    return rows
+
+
+class Principal:
+    """The logged-in user's identity, so menu actions do not look it up again on every call."""
+
+    def __init__(self, user_id, role, school_id, teacher_id, student_id, is_admin):
+        self.user_id = user_id
+        self.role = role
+        self.school_id = school_id
+        self.teacher_id = teacher_id
+        self.student_id = student_id
+        self.is_admin = is_admin
+
+
+def load_principal(user_id):
+    with get_directory_read_cursor() as c:
+        row = c.execute("""
+            SELECT u.UserRole, u.SchoolID, t.TeacherID, s.StudentID, u.IsSchoolAdmin
+            FROM Users u
+            LEFT JOIN Teachers t ON t.UserID = u.UserID
+            LEFT JOIN Students s ON s.UserID = u.UserID
+            WHERE u.UserID=?
+        """, (user_id,)).fetchone()
+    if row is None:
+        return None
+    role, school_id, teacher_id, student_id, is_admin = row
+    return Principal(user_id, role.lower(), school_id, teacher_id, student_id, bool(is_admin))
 
-# Connect to the SQLite database
-connection = sqlite3.connect("tables.db")
-c = connection.cursor()
-c.execute("PRAGMA foreign_keys = ON;")
-connection.commit()
+
+def current_principal():
+    """The session's Principal, loaded on first use after login or after session.invalidate_principal()."""
+    if session.user_id is None:
+        return None
+    if session.principal is None or session.principal.user_id != session.user_id:
+        session.principal = load_principal(session.user_id)
+        if session.principal is not None:
+            # The terminal app serves one user, so its shard follows whoever is logged in
+            current_school.set(session.principal.school_id)
+    return session.principal
+
+
+def _principal_for(user_id):
+    # The helpers below are mostly called for the logged-in user, whose details are already cached
+    if user_id is not None and user_id == session.user_id:
+        return current_principal()
+    return None
 
 
 # Helper functions
 def get_user_role(user_id):
-    return c.execute("SELECT UserRole FROM Users WHERE UserID=?", (user_id,)).fetchone()[0].lower()
+    principal = _principal_for(user_id)
+    if principal is not None:
+        return principal.role
+    with get_directory_read_cursor() as c:
+        return c.execute("SELECT UserRole FROM Users WHERE UserID=?", (user_id,)).fetchone()[0].lower()
 
 def get_school_id(user_id):
-    return c.execute("SELECT SchoolID FROM Users WHERE UserID=?", (user_id,)).fetchone()[0]
+    principal = _principal_for(user_id)
+    if principal is not None:
+        return principal.school_id
+    with get_directory_read_cursor() as c:
+        return c.execute("SELECT SchoolID FROM Users WHERE UserID=?", (user_id,)).fetchone()[0]
 
 def get_teacher_id(user_id):
-    return c.execute("SELECT TeacherID FROM Teachers WHERE UserID=?", (user_id,)).fetchone()[0]
+    principal = _principal_for(user_id)
+    if principal is not None and principal.teacher_id is not None:
+        return principal.teacher_id
+    with get_directory_read_cursor() as c:
+        return c.execute("SELECT TeacherID FROM Teachers WHERE UserID=?", (user_id,)).fetchone()[0]
 
 def get_student_id(user_id):
-    return c.execute("SELECT StudentID FROM Students WHERE UserID=?", (user_id,)).fetchone()[0]
+    principal = _principal_for(user_id)
+    if principal is not None and principal.student_id is not None:
+        return principal.student_id
+    with get_directory_read_cursor() as c:
+        return c.execute("SELECT StudentID FROM Students WHERE UserID=?", (user_id,)).fetchone()[0]
+
+def is_school_admin(user_id):
+    principal = _principal_for(user_id)
+    if principal is not None:
+        return principal.is_admin
+    with get_directory_read_cursor() as c:
+        return bool(c.execute("SELECT IsSchoolAdmin FROM Users WHERE UserID=?", (user_id,)).fetchone()[0])
+
+def question_hash(topic_id, question_text):
+    """Identity of a question within a school: its topic plus the text with case and
+    whitespace folded, so "What is  2+2?" and "what is 2+2?" count as the same question."""
+    normalised = " ".join(str(question_text).split()).casefold()
+    return hashlib.sha256(f"{topic_id}\x1f{normalised}".encode("utf-8")).hexdigest()
 
 def ensure_logged_in():
-    if current_user_token is None:
+    if not session.is_logged_in():
         print("❌ You must be logged in to perform this action.")
         return False
     return True
-
-
-# Create tables
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Users (
-        UserID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        FirstName TEXT NOT NULL,
-        LastName TEXT NOT NULL,
-        Email TEXT NOT NULL,
-        PasswordHash TEXT NOT NULL,
-        UserRole TEXT NOT NULL,
-        SchoolID INTEGER,
-        IsSchoolAdmin BOOLEAN DEFAULT FALSE NOT NULL,
-        DateCreated DATE DEFAULT current_timestamp NOT NULL,
-        FOREIGN KEY(SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON Users(Email);")
-
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Students (
-        StudentID INTEGER PRIMARY KEY NOT NULL,
-        YearGroup INTEGER NOT NULL,
-        UserID INTEGER NOT NULL,
-        FOREIGN KEY(UserID) REFERENCES Users(UserID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Teachers (
-        TeacherID INTEGER PRIMARY KEY NOT NULL,
-        UserID INTEGER NOT NULL,
-        FOREIGN KEY(UserID) REFERENCES Users(UserID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Classes (
-        ClassID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        LocalClassIdentifier TEXT NOT NULL,
-        SchoolID INTEGER NOT NULL,
-        FOREIGN KEY(SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS ClassTeachers (
-        ClassTeacherID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        ClassID INTEGER NOT NULL,
-        TeacherID INTEGER NOT NULL,
-        FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Enrollment (
-        EnrollmentID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        StudentID INTEGER NOT NULL,
-        ClassID INTEGER NOT NULL,
-        DateEnrolled DATE DEFAULT current_date NOT NULL,
-        FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS StudentBusyTimes (
-        BusyID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        StudentID INTEGER NOT NULL,
-        StartTime TEXT NOT NULL,
-        EndTime TEXT NOT NULL,
-        FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Schools (
-        SchoolID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        SchoolName TEXT NOT NULL
-    );
-""")
-
-c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_schools_name ON Schools(SchoolName);")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Periods (
-        PeriodID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        StartTime TEXT NOT NULL,
-        EndTime TEXT NOT NULL,
-        ClassID INTEGER NOT NULL,
-        TeacherID INTEGER NOT NULL,
-        FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS EnrollmentRequests (
-        RequestID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        StudentID INTEGER NOT NULL,
-        ClassID INTEGER NOT NULL,
-        RequestDate DATE DEFAULT current_date NOT NULL,
-        Status TEXT DEFAULT 'Pending' NOT NULL,
-        FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS SchoolJoinRequests (
-        RequestID INTEGER PRIMARY KEY AUTOINCREMENT,
-        UserID INTEGER NOT NULL,
-        SchoolID INTEGER NOT NULL,
-        Status TEXT DEFAULT 'Pending' NOT NULL,
-        RequestDate DATE DEFAULT current_date,
-        FOREIGN KEY (UserID) REFERENCES Users(UserID) ON DELETE CASCADE,
-        FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS HomeworkTasks (
-        HomeworkID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        Title TEXT NOT NULL,
-        Description TEXT NOT NULL,
-        TimeToComplete INTEGER NOT NULL,
-        DueDate DATE NOT NULL,
-        HomeworkType TEXT NOT NULL,  -- Type of the homework (e.g., Quiz, Assignment, etc.),
-        DateAssigned DATE DEFAULT current_date NOT NULL,
-        ClassID INTEGER NOT NULL,
-        TeacherID INTEGER NOT NULL,
-        AssignmentID INTEGER DEFAULT NULL,
-        FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-c.execute("""
-    CREATE TABLE IF NOT EXISTS StudentQuizResults (
-        ResultID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        StudentID INTEGER NOT NULL,
-        HomeworkID INTEGER NOT NULL,
-        QuestionID INTEGER NOT NULL,
-        AnswerGiven TEXT,
-        FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(HomeworkID) REFERENCES HomeworkTasks(HomeworkID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(QuestionID) REFERENCES QuizQuestions(QuestionID) ON DELETE CASCADE ON UPDATE CASCADE
-    );            
-""")
-
-
-# Topics belong to a school
-c.execute("""
-    CREATE TABLE IF NOT EXISTS QuestionTopics (
-        TopicID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        SchoolID INTEGER NOT NULL,
-        TopicName TEXT NOT NULL,
-        UNIQUE(SchoolID, TopicName),
-        FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-# Questions belong to a school and a topic
-c.execute("""
-    CREATE TABLE IF NOT EXISTS QuizQuestions (
-        QuestionID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        SchoolID INTEGER NOT NULL,
-        TopicID INTEGER NOT NULL,
-        QuestionText TEXT NOT NULL,
-        DifficultyLevel TEXT CHECK(DifficultyLevel IN ('Easy', 'Medium', 'Hard')) NOT NULL,
-        AnswerOptions TEXT NOT NULL,  -- JSON string containing answer options
-        CorrectAnswer TEXT NOT NULL,
-        DateAdded DATE DEFAULT current_date NOT NULL,
-        FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY (TopicID) REFERENCES QuestionTopics(TopicID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-# Quizzes belong to a class (and therefore a school)
-c.execute("""
-    CREATE TABLE IF NOT EXISTS Quizzes (
-        QuizID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        Title TEXT NOT NULL,
-        ClassID INTEGER NOT NULL,
-        TeacherID INTEGER NOT NULL,
-        DateAssigned DATE DEFAULT current_date NOT NULL,
-        FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE,
-        FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-# Link table for quiz-question assignments
-c.execute("""
-    CREATE TABLE IF NOT EXISTS QuizQuestionAssignments (
-        AssignmentID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
-        QuizID INTEGER NOT NULL,
-        QuestionID INTEGER NOT NULL,
-        FOREIGN KEY(QuizID) REFERENCES Quizzes(QuizID) ON DELETE CASCADE ON UPDATE CASCADE,
-        FOREIGN KEY(QuestionID) REFERENCES QuizQuestions(QuestionID) ON DELETE CASCADE ON UPDATE CASCADE
-    );
-""")
-
-connection.commit()
\ No newline at end of file
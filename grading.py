@@ -0,0 +1,110 @@
+from collections import Counter
+
+from databasee import get_analytics_cursor, get_cursor, get_read_cursor, select_in
+
+
+def normalise_answer(answer):
+    return (answer or "").strip().lower()
+
+
+def load_answer_key(c, question_ids):
+    """QuestionID -> normalised correct answer, read in batches under SQLite's variable limit."""
+    question_ids = list(question_ids)
+    key = {}
+    for start in range(0, len(question_ids), 500):
+        batch = question_ids[start:start + 500]
+        key.update(
+            (question_id, normalise_answer(correct_answer))
+            for question_id, correct_answer in c.execute(
+                f"SELECT QuestionID, CorrectAnswer FROM QuizQuestions WHERE QuestionID IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+        )
+    return key
+
+
+def grade_homework(homework_ids):
+    """Re-grade every answer for the given homework in one pass and rebuild their materialised scores.
+
+    Returns the number of answers graded.
+    """
+    homework_ids = list(homework_ids)
+    if not homework_ids:
+        return 0
+    with get_cursor() as c:
+        # Delete first: it opens the write transaction, so no answer can land between the read and the rewrite.
+        # Every statement runs in batches, since migrations pass every HomeworkID in the database
+        select_in(c, "DELETE FROM StudentQuizScores WHERE HomeworkID IN ({ids});", homework_ids)
+        select_in(c, "DELETE FROM QuestionScores WHERE HomeworkID IN ({ids});", homework_ids)
+
+        results = select_in(c, """
+            SELECT HomeworkID, StudentID, QuestionID, AnswerGiven
+            FROM StudentQuizResults
+            WHERE HomeworkID IN ({ids})
+        """, homework_ids)
+        answer_key = load_answer_key(c, {question_id for _, _, question_id, _ in results})
+
+        student_answered = Counter()
+        student_correct = Counter()
+        question_answered = Counter()
+        question_correct = Counter()
+        for homework_id, student_id, question_id, answer_given in results:
+            was_correct = answer_key.get(question_id) == normalise_answer(answer_given)
+            student_answered[homework_id, student_id] += 1
+            student_correct[homework_id, student_id] += was_correct
+            question_answered[homework_id, question_id] += 1
+            question_correct[homework_id, question_id] += was_correct
+
+        c.executemany("INSERT INTO StudentQuizScores(HomeworkID, StudentID, Answered, Correct) VALUES(?, ?, ?, ?);",
+                      [(*key, answered, student_correct[key]) for key, answered in student_answered.items()])
+        c.executemany("INSERT INTO QuestionScores(HomeworkID, QuestionID, Answered, Correct) VALUES(?, ?, ?, ?);",
+                      [(*key, answered, question_correct[key]) for key, answered in question_answered.items()])
+    return len(results)
+
+
+def grade_class(class_id):
+    with get_read_cursor() as c:
+        homework_ids = [row[0] for row in c.execute("SELECT HomeworkID FROM HomeworkTasks WHERE ClassID=?", (class_id,))]
+    return grade_homework(homework_ids)
+
+
+def record_score(c, homework_id, student_id, question_id, was_correct):
+    """Fold one new answer into the materialised scores, inside the caller's transaction."""
+    was_correct = int(was_correct)
+    c.execute("""
+        INSERT INTO StudentQuizScores(HomeworkID, StudentID, Answered, Correct) VALUES(?, ?, 1, ?)
+        ON CONFLICT(HomeworkID, StudentID) DO UPDATE
+        SET Answered = Answered + 1, Correct = Correct + excluded.Correct
+    """, (homework_id, student_id, was_correct))
+    c.execute("""
+        INSERT INTO QuestionScores(HomeworkID, QuestionID, Answered, Correct) VALUES(?, ?, 1, ?)
+        ON CONFLICT(HomeworkID, QuestionID) DO UPDATE
+        SET Answered = Answered + 1, Correct = Correct + excluded.Correct
+    """, (homework_id, question_id, was_correct))
+
+
+def homework_results(homework_id):
+    """Per-student scores for one homework: ``[(StudentID, FirstName, LastName, Answered, Correct), ...]``,
+    as of databasee.analytics_as_of()."""
+    with get_analytics_cursor() as c:
+        return c.execute("""
+            SELECT s.StudentID, u.FirstName, u.LastName, s.Answered, s.Correct
+            FROM StudentQuizScores s
+            JOIN Students st ON st.StudentID = s.StudentID
+            JOIN Users u ON u.UserID = st.UserID
+            WHERE s.HomeworkID = ?
+            ORDER BY u.LastName, u.FirstName
+        """, (homework_id,)).fetchall()
+
+
+def question_results(homework_id):
+    """Per-question scores for one homework: ``[(QuestionID, QuestionText, Answered, Correct), ...]``,
+    as of databasee.analytics_as_of()."""
+    with get_analytics_cursor() as c:
+        return c.execute("""
+            SELECT s.QuestionID, q.QuestionText, s.Answered, s.Correct
+            FROM QuestionScores s
+            JOIN QuizQuestions q ON q.QuestionID = s.QuestionID
+            WHERE s.HomeworkID = ?
+            ORDER BY s.QuestionID
+        """, (homework_id,)).fetchall()
@@ -0,0 +1,134 @@
+"""Drive a running server.py with many concurrent students taking quizzes.
+
+    REVISIONAPP_DB=bench.db python server.py &
+    python load_test.py --db bench.db --students 200 --answers 20
+
+Each simulated student logs in once, then loops fetching the next question of one of its
+quizzes and answering it, over a single keep-alive connection. Latency of the quiz requests
+is reported as p50/p99 alongside the overall request rate. --db is only read to pick
+students with quizzes; all traffic goes through HTTP.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sqlite3
+import sys
+import time
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection speaking JSON."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.token = None
+        self._reader = self._writer = None
+
+    async def request(self, method, path, payload=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(body)}"]
+        if self.token:
+            head.append(f"Authorization: Bearer {self.token}")
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await self._writer.drain()
+
+        status_line, *header_lines = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        data = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return int(status_line.split(" ")[1]), json.loads(data) if data else None
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+def percentile(sorted_values, p):
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+async def student(host, port, email, password, quiz_ids, answers, timings, statuses, rng):
+    client = Client(host, port)
+    for attempt in range(20):
+        status, body = await client.request("POST", "/login", {"email": email, "password": password})
+        if status != 503:
+            break
+        # The server sheds logins when its hashing pool is full; back off and retry like a real client
+        await asyncio.sleep(rng.uniform(0.1, 0.5) * (attempt + 1))
+    statuses[status] = statuses.get(status, 0) + 1
+    if status != 200:
+        await client.close()
+        return
+    client.token = body["token"]
+    for _ in range(answers):
+        quiz_id = rng.choice(quiz_ids)
+        start = time.perf_counter()
+        status, question = await client.request("GET", f"/quizzes/{quiz_id}/next")
+        timings["next"].append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status != 200 or question["finished"]:
+            continue
+        start = time.perf_counter()
+        status, _ = await client.request("POST", f"/quizzes/{quiz_id}/answers",
+                                         {"question_id": question["question_id"], "answer": rng.choice(question["options"])})
+        timings["answer"].append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+    await client.close()
+
+
+async def run(args):
+    with sqlite3.connect(f"file:{args.db}?mode=ro", uri=True) as c:
+        rows = c.execute("""
+            SELECT u.Email, h.AssignmentID FROM Users u
+            JOIN Students s ON s.UserID = u.UserID
+            JOIN Enrollment e ON e.StudentID = s.StudentID
+            JOIN HomeworkTasks h ON h.ClassID = e.ClassID AND h.HomeworkType = 'Quiz'
+            WHERE u.UserID IN (SELECT UserID FROM Users WHERE UserRole = 'student' ORDER BY random() LIMIT ?)
+        """, (args.students,)).fetchall()
+    quizzes = {}
+    for email, quiz_id in rows:
+        quizzes.setdefault(email, []).append(quiz_id)
+
+    rng = random.Random(args.seed)
+    timings = {"next": [], "answer": []}
+    statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(student(args.host, args.port, email, args.password, quiz_ids, args.answers, timings,
+                                   statuses, random.Random(rng.random()))
+                           for email, quiz_ids in quizzes.items()))
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(quizzes)} students, {sum(statuses.values())} requests in {elapsed:.1f}s "
+          f"({sum(statuses.values()) / elapsed:.0f} req/s), statuses {dict(sorted(statuses.items()))}")
+    for name, values in timings.items():
+        if values:
+            values.sort()
+            print(f"  {name:<7} n={len(values):<6} p50 {percentile(values, 50) * 1000:7.2f} ms"
+                  f"   p99 {percentile(values, 99) * 1000:7.2f} ms")
+    return 0 if set(statuses) <= {200} else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running Revision App server.")
+    parser.add_argument("--db", required=True, help="database the server is using, to pick students")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--answers", type=int, default=20, help="questions each student answers")
+    parser.add_argument("--password", default="password", help="every student's password (synthetic_data.py uses 'password')")
+    parser.add_argument("--seed", type=int, default=0)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+"""Versioned schema migrations, keyed on SQLite's ``PRAGMA user_version``.
+
+Each migration runs in its own write transaction together with the version bump, so a
+failure leaves the database at the previous version. Startup costs a single PRAGMA read
+once the schema is current.
+"""
+import time
+
+from databasee import current_pool, current_school, get_cursor, question_hash, router, use_school
+
+MIGRATIONS = []
+# Rows a backfill rewrites per statement
+BACKFILL_BATCH_ROWS = 5000
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def _rekey_quiz_answers(c):
+    """Move answers saved under their QuizID, as the quiz engine once did, to the quiz's HomeworkID.
+
+    Uses the quiz engine's own mapping. Answers already under a Quiz homework whose quiz holds
+    the question are left alone, so running it again changes nothing. Returns the HomeworkIDs
+    whose answers moved, both old and new.
+    """
+    from quiz_engine import QUIZ_HOMEWORK_SQL
+
+    homework = QUIZ_HOMEWORK_SQL.format(quiz_id="StudentQuizResults.HomeworkID", student_id="StudentQuizResults.StudentID")
+    stale = f"""
+        NOT EXISTS (SELECT 1 FROM HomeworkTasks h JOIN QuizQuestionAssignments qa ON qa.QuizID = h.AssignmentID
+                    WHERE h.HomeworkID = StudentQuizResults.HomeworkID AND h.HomeworkType = 'Quiz'
+                      AND qa.QuestionID = StudentQuizResults.QuestionID)
+        AND EXISTS (SELECT 1 FROM QuizQuestionAssignments qa
+                    WHERE qa.QuizID = StudentQuizResults.HomeworkID AND qa.QuestionID = StudentQuizResults.QuestionID)
+        AND ({homework}) IS NOT NULL
+    """
+    moved = c.execute(f"SELECT DISTINCT HomeworkID, ({homework}) FROM StudentQuizResults WHERE {stale}").fetchall()
+    c.execute(f"UPDATE StudentQuizResults SET HomeworkID = ({homework}) WHERE {stale}")
+    return {homework_id for pair in moved for homework_id in pair}
+
+
+@migration(1, "Create the original tables")
+def create_tables(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Users (
+            UserID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            FirstName TEXT NOT NULL,
+            LastName TEXT NOT NULL,
+            Email TEXT NOT NULL,
+            PasswordHash TEXT NOT NULL,
+            UserRole TEXT NOT NULL,
+            SchoolID INTEGER,
+            IsSchoolAdmin BOOLEAN DEFAULT FALSE NOT NULL,
+            DateCreated DATE DEFAULT current_timestamp NOT NULL,
+            FOREIGN KEY(SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON Users(Email);")
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Students (
+            StudentID INTEGER PRIMARY KEY NOT NULL,
+            YearGroup INTEGER NOT NULL,
+            UserID INTEGER NOT NULL,
+            FOREIGN KEY(UserID) REFERENCES Users(UserID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Teachers (
+            TeacherID INTEGER PRIMARY KEY NOT NULL,
+            UserID INTEGER NOT NULL,
+            FOREIGN KEY(UserID) REFERENCES Users(UserID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Classes (
+            ClassID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            LocalClassIdentifier TEXT NOT NULL,
+            SchoolID INTEGER NOT NULL,
+            FOREIGN KEY(SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS ClassTeachers (
+            ClassTeacherID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            ClassID INTEGER NOT NULL,
+            TeacherID INTEGER NOT NULL,
+            FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Enrollment (
+            EnrollmentID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            StudentID INTEGER NOT NULL,
+            ClassID INTEGER NOT NULL,
+            DateEnrolled DATE DEFAULT current_date NOT NULL,
+            FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS StudentBusyTimes (
+            BusyID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            StudentID INTEGER NOT NULL,
+            StartTime TEXT NOT NULL,
+            EndTime TEXT NOT NULL,
+            FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Schools (
+            SchoolID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            SchoolName TEXT NOT NULL
+        );
+    """)
+
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_schools_name ON Schools(SchoolName);")
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Periods (
+            PeriodID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            StartTime TEXT NOT NULL,
+            EndTime TEXT NOT NULL,
+            ClassID INTEGER NOT NULL,
+            TeacherID INTEGER NOT NULL,
+            FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS EnrollmentRequests (
+            RequestID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            StudentID INTEGER NOT NULL,
+            ClassID INTEGER NOT NULL,
+            RequestDate DATE DEFAULT current_date NOT NULL,
+            Status TEXT DEFAULT 'Pending' NOT NULL,
+            FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS SchoolJoinRequests (
+            RequestID INTEGER PRIMARY KEY AUTOINCREMENT,
+            UserID INTEGER NOT NULL,
+            SchoolID INTEGER NOT NULL,
+            Status TEXT DEFAULT 'Pending' NOT NULL,
+            RequestDate DATE DEFAULT current_date,
+            FOREIGN KEY (UserID) REFERENCES Users(UserID) ON DELETE CASCADE,
+            FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS HomeworkTasks (
+            HomeworkID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            Title TEXT NOT NULL,
+            Description TEXT NOT NULL,
+            TimeToComplete INTEGER NOT NULL,
+            DueDate DATE NOT NULL,
+            HomeworkType TEXT NOT NULL,  -- Type of the homework (e.g., Quiz, Assignment, etc.),
+            DateAssigned DATE DEFAULT current_date NOT NULL,
+            ClassID INTEGER NOT NULL,
+            TeacherID INTEGER NOT NULL,
+            AssignmentID INTEGER DEFAULT NULL,
+            FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS StudentQuizResults (
+            ResultID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            StudentID INTEGER NOT NULL,
+            HomeworkID INTEGER NOT NULL,
+            QuestionID INTEGER NOT NULL,
+            AnswerGiven TEXT,
+            FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(HomeworkID) REFERENCES HomeworkTasks(HomeworkID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(QuestionID) REFERENCES QuizQuestions(QuestionID) ON DELETE CASCADE ON UPDATE CASCADE
+        );            
+    """)
+
+    # Topics belong to a school
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS QuestionTopics (
+            TopicID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            SchoolID INTEGER NOT NULL,
+            TopicName TEXT NOT NULL,
+            UNIQUE(SchoolID, TopicName),
+            FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    # Questions belong to a school and a topic
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS QuizQuestions (
+            QuestionID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            SchoolID INTEGER NOT NULL,
+            TopicID INTEGER NOT NULL,
+            QuestionText TEXT NOT NULL,
+            DifficultyLevel TEXT CHECK(DifficultyLevel IN ('Easy', 'Medium', 'Hard')) NOT NULL,
+            AnswerOptions TEXT NOT NULL,  -- JSON string containing answer options
+            CorrectAnswer TEXT NOT NULL,
+            DateAdded DATE DEFAULT current_date NOT NULL,
+            FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY (TopicID) REFERENCES QuestionTopics(TopicID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    # Quizzes belong to a class (and therefore a school)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Quizzes (
+            QuizID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            Title TEXT NOT NULL,
+            ClassID INTEGER NOT NULL,
+            TeacherID INTEGER NOT NULL,
+            DateAssigned DATE DEFAULT current_date NOT NULL,
+            FOREIGN KEY(ClassID) REFERENCES Classes(ClassID) ON DELETE CASCADE,
+            FOREIGN KEY(TeacherID) REFERENCES Teachers(TeacherID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    # Link table for quiz-question assignments
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS QuizQuestionAssignments (
+            AssignmentID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            QuizID INTEGER NOT NULL,
+            QuestionID INTEGER NOT NULL,
+            FOREIGN KEY(QuizID) REFERENCES Quizzes(QuizID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(QuestionID) REFERENCES QuizQuestions(QuestionID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+
+@migration(2, "Index the common lookups")
+def create_indexes(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_school_id ON Users(SchoolID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_class_id ON Enrollment(ClassID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_user_id ON Users(UserID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_student_id ON Enrollment(StudentID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_teacher_id ON ClassTeachers(TeacherID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_classes_class_id ON Classes(ClassID);")
+
+
+@migration(3, "Add question content hashes and import checkpoints")
+def add_question_hashes(c):
+    # Databases created before QuizQuestions.ContentHash existed need the column and a backfill
+    columns = [row[1] for row in c.execute("PRAGMA table_info(QuizQuestions);")]
+    if "ContentHash" not in columns:
+        c.execute("ALTER TABLE QuizQuestions ADD COLUMN ContentHash TEXT;")
+        c.connection.create_function("question_hash", 2, question_hash, deterministic=True)
+        # In rowid ranges, so each statement is bounded however many questions there are
+        last_id = c.execute("SELECT COALESCE(MAX(QuestionID), 0) FROM QuizQuestions;").fetchone()[0]
+        for start in range(1, last_id + 1, BACKFILL_BATCH_ROWS):
+            c.execute("""
+                UPDATE QuizQuestions SET ContentHash = question_hash(TopicID, QuestionText)
+                WHERE QuestionID BETWEEN ? AND ?;
+            """, (start, start + BACKFILL_BATCH_ROWS - 1))
+        # Rows that only differed by case or spacing keep the oldest copy as the canonical one
+        c.execute("""
+            UPDATE QuizQuestions SET ContentHash = NULL
+            WHERE QuestionID NOT IN (
+                SELECT MIN(QuestionID) FROM QuizQuestions GROUP BY SchoolID, ContentHash
+            );
+        """)
+        if c.rowcount:
+            print(f"⚠️ {c.rowcount} duplicate questions were left without a content hash.")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_hash ON QuizQuestions(SchoolID, ContentHash);")
+
+    # Progress of streaming question imports, so an interrupted upload can resume
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS QuestionImportCheckpoints (
+            SchoolID INTEGER NOT NULL,
+            FileHash TEXT NOT NULL,
+            FilePath TEXT NOT NULL,
+            RowsDone INTEGER DEFAULT 0 NOT NULL,
+            UpdatedAt DATE DEFAULT current_timestamp NOT NULL,
+            PRIMARY KEY (SchoolID, FileHash),
+            FOREIGN KEY (SchoolID) REFERENCES Schools(SchoolID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+
+@migration(4, "Materialise quiz scores")
+def create_score_tables(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_results_student_homework ON StudentQuizResults(StudentID, HomeworkID);")
+
+    # Materialised scores, rebuilt by grading.grade_homework and kept current by grading.record_score
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS StudentQuizScores (
+            HomeworkID INTEGER NOT NULL,
+            StudentID INTEGER NOT NULL,
+            Answered INTEGER DEFAULT 0 NOT NULL,
+            Correct INTEGER DEFAULT 0 NOT NULL,
+            PRIMARY KEY (HomeworkID, StudentID),
+            FOREIGN KEY(HomeworkID) REFERENCES HomeworkTasks(HomeworkID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS QuestionScores (
+            HomeworkID INTEGER NOT NULL,
+            QuestionID INTEGER NOT NULL,
+            Answered INTEGER DEFAULT 0 NOT NULL,
+            Correct INTEGER DEFAULT 0 NOT NULL,
+            PRIMARY KEY (HomeworkID, QuestionID),
+            FOREIGN KEY(HomeworkID) REFERENCES HomeworkTasks(HomeworkID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(QuestionID) REFERENCES QuizQuestions(QuestionID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    # Existing answers are graded once here, under the homework they belong to; new ones are folded in as they arrive
+    from grading import grade_homework
+    _rekey_quiz_answers(c)
+    grade_homework([row[0] for row in c.execute("SELECT DISTINCT HomeworkID FROM StudentQuizResults;")])
+
+
+@migration(5, "Replace copied class periods with the StudentSchedule view")
+def create_schedule_view(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_busy_student ON StudentBusyTimes(StudentID, StartTime);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_periods_class ON Periods(ClassID);")
+
+    # Class periods are joined through Enrollment at query time instead of being copied into
+    # StudentBusyTimes for every student, which add_period used to do
+    if c.execute("SELECT 1 FROM sqlite_master WHERE type='view' AND name='StudentSchedule';").fetchone():
+        return
+    # One-off clean-up of the copies made by the old add_period (for every student in the school)
+    c.execute("""
+        DELETE FROM StudentBusyTimes
+        WHERE EXISTS (
+            SELECT 1 FROM Periods p
+            JOIN Classes cl ON cl.ClassID = p.ClassID
+            JOIN Students s ON s.StudentID = StudentBusyTimes.StudentID
+            JOIN Users u ON u.UserID = s.UserID
+            WHERE p.StartTime = StudentBusyTimes.StartTime
+              AND p.EndTime = StudentBusyTimes.EndTime
+              AND cl.SchoolID = u.SchoolID
+        );
+    """)
+    c.execute("""
+        CREATE VIEW StudentSchedule AS
+            SELECT StudentID, StartTime, EndTime, 'Personal' AS Source
+            FROM StudentBusyTimes
+            UNION ALL
+            SELECT e.StudentID, p.StartTime, p.EndTime, 'Class ' || p.ClassID AS Source
+            FROM Enrollment e
+            JOIN Periods p ON p.ClassID = e.ClassID;
+    """)
+
+
+@migration(6, "Add revision plans")
+def create_revision_plan(c):
+    # Homework blocks packed into each student's free time by planner.plan_students
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS RevisionPlan (
+            PlanID INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+            StudentID INTEGER NOT NULL,
+            HomeworkID INTEGER NOT NULL,
+            PlanDate DATE NOT NULL,
+            StartTime TEXT NOT NULL,
+            EndTime TEXT NOT NULL,
+            FOREIGN KEY(StudentID) REFERENCES Students(StudentID) ON DELETE CASCADE ON UPDATE CASCADE,
+            FOREIGN KEY(HomeworkID) REFERENCES HomeworkTasks(HomeworkID) ON DELETE CASCADE ON UPDATE CASCADE
+        );
+    """)
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_plan_student_date ON RevisionPlan(StudentID, PlanDate);")
+
+
+@migration(7, "Index the audited workload and drop indexes that duplicate primary keys")
+def add_workload_indexes(c):
+    # Proposed by query_audit.py; UserID and ClassID are already the rowid of their tables
+    c.execute("DROP INDEX IF EXISTS idx_user_id;")
+    c.execute("DROP INDEX IF EXISTS idx_classes_class_id;")
+    # Lookups the menus and services make on every action
+    c.execute("CREATE INDEX IF NOT EXISTS idx_teachers_user_id ON Teachers(UserID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_students_user_id ON Students(UserID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_classes_school_id_local_class_identifier ON Classes(SchoolID, LocalClassIdentifier);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_enrollment_requests_class_id_status ON EnrollmentRequests(ClassID, Status);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_school_join_requests_school_id_status ON SchoolJoinRequests(SchoolID, Status);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_homework_tasks_class_id_due_date ON HomeworkTasks(ClassID, DueDate);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_student_quiz_results_homework_id ON StudentQuizResults(HomeworkID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_questions_school_id_topic_id_difficulty_level ON QuizQuestions(SchoolID, TopicID, DifficultyLevel);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_question_assignments_quiz_id_question_id ON QuizQuestionAssignments(QuizID, QuestionID);")
+    # Foreign key children, so ON DELETE CASCADE finds the rows instead of scanning
+    c.execute("CREATE INDEX IF NOT EXISTS idx_class_teachers_class_id ON ClassTeachers(ClassID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_periods_teacher_id ON Periods(TeacherID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_enrollment_requests_student_id ON EnrollmentRequests(StudentID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_school_join_requests_user_id ON SchoolJoinRequests(UserID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_homework_tasks_teacher_id ON HomeworkTasks(TeacherID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_student_quiz_results_question_id ON StudentQuizResults(QuestionID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_questions_topic_id ON QuizQuestions(TopicID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quizzes_class_id ON Quizzes(ClassID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quizzes_teacher_id ON Quizzes(TeacherID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_student_quiz_scores_student_id ON StudentQuizScores(StudentID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_question_assignments_question_id ON QuizQuestionAssignments(QuestionID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_question_scores_question_id ON QuestionScores(QuestionID);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_revision_plan_homework_id ON RevisionPlan(HomeworkID);")
+
+
+@migration(8, "Re-key quiz answers saved under their QuizID")
+def rekey_quiz_answers(c):
+    # Databases that ran migration 4 before it re-keyed; their scores are rebuilt under the right homework
+    from grading import grade_homework
+    grade_homework(_rekey_quiz_answers(c))
+
+
+MIGRATIONS.sort()
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version():
+    with current_pool().read_cursor() as c:
+        return c.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(target=LATEST_VERSION, verbose=True):
+    """Bring the database up to ``target``, applying each pending migration in order.
+
+    Returns the version the database ends at. Each step is timed and reported. In sharded
+    mode, called outside databasee.use_school() it migrates the directory and every shard.
+    """
+    if router is None or current_school.get() is not None:
+        return _migrate_current(target, verbose)
+    version = _migrate_current(target, verbose)
+    for school_id in router.school_ids():
+        with use_school(school_id):
+            if verbose and schema_version() < target:
+                print(f"School {school_id}:")
+            version = min(version, _migrate_current(target, verbose))
+    return version
+
+
+def _migrate_current(target, verbose):
+    if schema_version() >= target:
+        return schema_version()
+    for version, description, apply in MIGRATIONS:
+        if version > target:
+            break
+        start = time.perf_counter()
+        with get_cursor() as c:
+            # Take the write lock first, then re-check: another process may have got here already
+            # (with group commit the shared connection has already taken it)
+            if not c.connection.in_transaction:
+                c.execute("BEGIN IMMEDIATE;")
+            if c.execute("PRAGMA user_version;").fetchone()[0] >= version:
+                continue
+            apply(c)
+            c.execute(f"PRAGMA user_version = {int(version)};")
+        if verbose:
+            print(f"Migration {version}: {description} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    return schema_version()
+
+
+if __name__ == "__main__":
+    print(f"Schema version {migrate()} (latest {LATEST_VERSION}).")
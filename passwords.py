@@ -0,0 +1,235 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import statistics
+import threading
+import time
+
+HASH_WORKERS = int(os.environ.get("REVISIONAPP_HASH_WORKERS", os.cpu_count() or 1))
+# Processes sidestep the GIL entirely; threads are enough when argon2 releases it in C
+HASH_USE_PROCESSES = os.environ.get("REVISIONAPP_HASH_PROCESSES", "0") == "1"
+# Argon2 parameters chosen for this host by `python passwords.py calibrate`
+PARAMS_PATH = os.environ.get("REVISIONAPP_ARGON2_PARAMS", "argon2_params.json")
+
+
+def load_params(path=PARAMS_PATH):
+    """Calibrated PasswordHasher keyword arguments, or {} for the library defaults."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _time_hash(params, rounds=3):
+    from argon2 import PasswordHasher
+
+    hasher = PasswordHasher(**params)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.hash("calibration password")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def calibrate(target_ms=250, max_memory_kib=65536, parallelism=None):
+    """Pick Argon2 parameters that take about ``target_ms`` per hash on this host.
+
+    Memory is held at the budget and time_cost raised until a hash reaches the target; if
+    even one pass is too slow, memory is halved instead. Returns the parameters and the
+    measured latency in milliseconds.
+    """
+    parallelism = parallelism or min(os.cpu_count() or 1, 4)
+    params = {"time_cost": 1, "memory_cost": max_memory_kib, "parallelism": parallelism}
+    elapsed = _time_hash(params)
+    while elapsed > target_ms and params["memory_cost"] > 8 * parallelism * 2:
+        params["memory_cost"] //= 2
+        elapsed = _time_hash(params)
+    while elapsed < target_ms:
+        candidate = dict(params, time_cost=params["time_cost"] + 1)
+        candidate_elapsed = _time_hash(candidate)
+        if candidate_elapsed > target_ms * 1.25:
+            break
+        params, elapsed = candidate, candidate_elapsed
+    return params, elapsed
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when every hashing slot is taken, so callers can shed load instead of queueing forever."""
+
+
+# One PasswordHasher per worker process, rebuilt only when the parameters change
+_worker_hasher = None
+
+
+def _hasher_for(params):
+    global _worker_hasher
+    if _worker_hasher is None or _worker_hasher[0] != params:
+        # Imported here so only the processes that actually hash pay for loading argon2
+        from argon2 import PasswordHasher
+        _worker_hasher = (params, PasswordHasher(**params))
+    return _worker_hasher[1]
+
+
+def _hash(params, password):
+    return _hasher_for(params).hash(password)
+
+
+def _hash_batch(params, passwords):
+    hasher = _hasher_for(params)
+    return [hasher.hash(password) for password in passwords]
+
+
+def _needs_rehash(params, password_hash):
+    return _hasher_for(params).check_needs_rehash(password_hash)
+
+
+def _verify(params, password_hash, password):
+    from argon2.exceptions import InvalidHashError, VerificationError
+
+    try:
+        return _hasher_for(params).verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+# A hash of a random password per parameter set, verified against when an email has no account
+_dummy_hashes = {}
+
+
+def _verify_dummy(params, password):
+    key = tuple(sorted(params.items()))
+    if key not in _dummy_hashes:
+        _dummy_hashes[key] = _hash(params, secrets.token_urlsafe(16))
+    _verify(params, _dummy_hashes[key], password)
+    return False
+
+
+class PasswordService:
+    """Runs Argon2 hashing and verification on a bounded worker pool.
+
+    At most ``max_pending`` operations may be queued or running. Blocking callers wait up
+    to ``wait_timeout`` seconds for a slot; async callers are refused straight away, so the
+    event loop never blocks. Both raise PasswordServiceBusy when the pool is saturated.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, use_processes=HASH_USE_PROCESSES, max_pending=None,
+                 wait_timeout=5.0, params=None):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.params = dict(load_params() if params is None else params)
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 4)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self._executor = executor_class(max_workers=self.workers)
+            return self._executor
+
+    def _submit(self, blocking, fn, *args):
+        if not self._slots.acquire(blocking, self.wait_timeout if blocking else None):
+            raise PasswordServiceBusy("Too many logins in progress. Please try again in a moment.")
+        try:
+            future = self._pool().submit(fn, self.params, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password):
+        return self._submit(True, _hash, password).result()
+
+    def verify(self, password_hash, password):
+        """True if ``password`` matches ``password_hash``; a wrong password is False, not an exception."""
+        return self._submit(True, _verify, password_hash, password).result()
+
+    def verify_absent(self, password):
+        """Take as long as verify() would, for a login whose email has no account. Always False.
+
+        Answering such logins straight away would tell an attacker which emails are registered.
+        """
+        return self._submit(True, _verify_dummy, password).result()
+
+    def hash_many(self, passwords, workers=None, batch_size=16):
+        """Hash a list of passwords across a process pool on every core, for bulk imports.
+
+        Uses a pool of its own for the duration of the call, so a large import never takes
+        the slots that logins wait for. Returns the hashes in the same order.
+        """
+        passwords = list(passwords)
+        workers = workers or os.cpu_count() or 1
+        batches = [passwords[i:i + batch_size] for i in range(0, len(passwords), batch_size)]
+        if workers == 1 or len(batches) <= 1:
+            return [password_hash for batch in batches for password_hash in _hash_batch(self.params, batch)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return [password_hash for hashes in pool.map(_hash_batch, [self.params] * len(batches), batches)
+                    for password_hash in hashes]
+
+    async def hash_async(self, password):
+        return await asyncio.wrap_future(self._submit(False, _hash, password))
+
+    async def verify_async(self, password_hash, password):
+        return await asyncio.wrap_future(self._submit(False, _verify, password_hash, password))
+
+    async def verify_absent_async(self, password):
+        return await asyncio.wrap_future(self._submit(False, _verify_dummy, password))
+
+    def rehash_in_background(self, user_id, password_hash, password):
+        """Upgrade a hash made with older parameters, after a successful login.
+
+        Runs on the pool without blocking the caller and is skipped when the pool is busy;
+        the next login will try again.
+        """
+        if not _needs_rehash(self.params, password_hash):
+            return None
+        try:
+            future = self._submit(False, _hash, password)
+        except PasswordServiceBusy:
+            return None
+
+        def store(done):
+            if done.exception() is not None:
+                return
+            from databasee import get_directory_cursor
+            with get_directory_cursor() as c:
+                # Only replace the hash we verified, in case the password changed meanwhile
+                c.execute("UPDATE Users SET PasswordHash=? WHERE UserID=? AND PasswordHash=?;",
+                          (done.result(), user_id, password_hash))
+
+        future.add_done_callback(store)
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+passwords = PasswordService()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune Argon2 parameters for this host.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = subcommands.add_parser("calibrate", help="benchmark and save Argon2 parameters")
+    calibrate_parser.add_argument("--target-ms", type=float, default=250, help="verify latency to aim for")
+    calibrate_parser.add_argument("--max-memory-mib", type=int, default=64, help="memory budget per hash")
+    calibrate_parser.add_argument("--parallelism", type=int, default=None)
+    calibrate_parser.add_argument("--output", default=PARAMS_PATH)
+    args = parser.parse_args()
+
+    chosen, measured = calibrate(args.target_ms, args.max_memory_mib * 1024, args.parallelism)
+    with open(args.output, "w") as f:
+        json.dump(chosen, f, indent=2)
+    print(f"✅ {chosen} takes {measured:.0f} ms per hash. Saved to {args.output}.")
+    print("Existing passwords are upgraded to these parameters as users log in.")
@@ -0,0 +1,160 @@
+from datetime import date, timedelta
+import os
+
+from databasee import get_cursor, get_read_cursor
+from scheduling import load_busy_minutes, merge_intervals, to_minutes, to_hhmm
+
+# Part of the day homework may be planned into, and the shortest block worth planning
+STUDY_DAY_START = "16:00"
+STUDY_DAY_END = "21:00"
+MIN_BLOCK_MINUTES = 15
+
+# Students handed to each worker process at a time when planning a whole school
+PLAN_BATCH_SIZE = 200
+
+
+def free_windows(busy, day_start, day_end):
+    """The gaps between merged busy intervals inside ``[day_start, day_end)``, in minutes."""
+    windows = []
+    position = day_start
+    for start, end in merge_intervals(busy):
+        if start > position:
+            windows.append((position, min(start, day_end)))
+        position = max(position, end)
+        if position >= day_end:
+            break
+    if position < day_end:
+        windows.append((position, day_end))
+    return [(start, end) for start, end in windows if end > start]
+
+
+def plan_student(busy, homework, today, day_start=STUDY_DAY_START, day_end=STUDY_DAY_END,
+                 min_block=MIN_BLOCK_MINUTES):
+    """Pack one student's homework into their free time, earliest deadline first.
+
+    ``busy`` is a list of ``(start, end)`` minutes and ``homework`` a list of
+    ``(HomeworkID, TimeToComplete, DueDate)``. Work is only planned on days before the due
+    date, and long tasks are split across as many blocks as they need. Returns
+    ``(blocks, unplanned)`` where blocks are ``(HomeworkID, date, StartTime, EndTime)`` and
+    unplanned maps HomeworkID to the minutes that did not fit.
+    """
+    windows = free_windows(busy, to_minutes(day_start), to_minutes(day_end))
+    queue = sorted(([due, homework_id, minutes] for homework_id, minutes, due in homework if minutes > 0),
+                   key=lambda task: (task[0], task[1]))
+    blocks = []
+    day = today
+    while queue and windows:
+        # Deadlines that have arrived can no longer be worked on
+        while queue and queue[0][0] <= day:
+            queue.pop(0)
+        if not queue:
+            break
+        for start, end in windows:
+            position = start
+            while position < end and queue and queue[0][0] > day:
+                task = queue[0]
+                length = min(task[2], end - position)
+                if length < min_block and length < task[2]:
+                    break
+                blocks.append((task[1], day, to_hhmm(position), to_hhmm(position + length)))
+                position += length
+                task[2] -= length
+                if not task[2]:
+                    queue.pop(0)
+        day += timedelta(days=1)
+
+    planned = {}
+    for homework_id, _, start_time, end_time in blocks:
+        planned[homework_id] = planned.get(homework_id, 0) + to_minutes(end_time) - to_minutes(start_time)
+    unplanned = {homework_id: minutes - planned.get(homework_id, 0)
+                 for homework_id, minutes, _ in homework if minutes > planned.get(homework_id, 0)}
+    return blocks, unplanned
+
+
+def _plan_batch(batch):
+    # Runs in a worker process: pure computation over the data the parent loaded
+    today, students = batch
+    return [(student_id, plan_student(busy, homework, today)[0]) for student_id, busy, homework in students]
+
+
+def _load_homework(student_ids, today):
+    homework = {student_id: [] for student_id in student_ids}
+    with get_read_cursor() as c:
+        for start in range(0, len(student_ids), 500):
+            batch = student_ids[start:start + 500]
+            for student_id, homework_id, minutes, due_date in c.execute(f"""
+                    SELECT e.StudentID, h.HomeworkID, h.TimeToComplete, h.DueDate
+                    FROM Enrollment e
+                    JOIN HomeworkTasks h ON h.ClassID = e.ClassID
+                    WHERE e.StudentID IN ({', '.join('?' * len(batch))}) AND h.DueDate > ?
+                    """, (*batch, today.isoformat())):
+                homework[student_id].append((homework_id, minutes, date.fromisoformat(str(due_date)[:10])))
+    return homework
+
+
+def plan_students(student_ids, today=None, workers=None):
+    """Re-plan the given students and store the result in RevisionPlan. Returns the number of blocks written.
+
+    Inputs are loaded in bulk, students are planned in parallel across a process pool when
+    there are enough of them to be worth it, and the old plans are replaced in one transaction.
+    """
+    student_ids = list(dict.fromkeys(student_ids))
+    if not student_ids:
+        return 0
+    today = today or date.today()
+    busy = load_busy_minutes(student_ids)
+    homework = _load_homework(student_ids, today)
+    students = [(student_id, busy[student_id], homework[student_id]) for student_id in student_ids]
+    batches = [(today, students[i:i + PLAN_BATCH_SIZE]) for i in range(0, len(students), PLAN_BATCH_SIZE)]
+
+    if len(batches) > 1 and workers != 1:
+        # Imported here: multiprocessing roughly doubles the import time of this module and of services
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            results = [plan for batch_plans in pool.map(_plan_batch, batches) for plan in batch_plans]
+    else:
+        results = [plan for batch in batches for plan in _plan_batch(batch)]
+
+    rows = [(student_id, homework_id, day.isoformat(), start_time, end_time)
+            for student_id, blocks in results for homework_id, day, start_time, end_time in blocks]
+    with get_cursor() as c:
+        for start in range(0, len(student_ids), 500):
+            batch = student_ids[start:start + 500]
+            c.execute(f"DELETE FROM RevisionPlan WHERE StudentID IN ({', '.join('?' * len(batch))});", batch)
+        c.executemany("INSERT INTO RevisionPlan(StudentID, HomeworkID, PlanDate, StartTime, EndTime) VALUES(?, ?, ?, ?, ?);", rows)
+    return len(rows)
+
+
+def plan_school(school_id, workers=None):
+    """Overnight job: re-plan every student in a school."""
+    with get_read_cursor() as c:
+        student_ids = [row[0] for row in c.execute("""
+            SELECT s.StudentID FROM Students s
+            JOIN Users u ON u.UserID = s.UserID
+            WHERE u.SchoolID=?
+        """, (school_id,))]
+    return plan_students(student_ids, workers=workers)
+
+
+def replan_class(class_id):
+    # A homework or period changed for a class: only its students need new plans
+    with get_read_cursor() as c:
+        student_ids = [row[0] for row in c.execute("SELECT StudentID FROM Enrollment WHERE ClassID=?", (class_id,))]
+    return plan_students(student_ids, workers=1)
+
+
+def replan_student(student_id):
+    return plan_students([student_id], workers=1)
+
+
+def get_plan(student_id, today=None):
+    today = today or date.today()
+    with get_read_cursor() as c:
+        return c.execute("""
+            SELECT p.PlanDate, p.StartTime, p.EndTime, h.Title, h.DueDate
+            FROM RevisionPlan p
+            JOIN HomeworkTasks h ON h.HomeworkID = p.HomeworkID
+            WHERE p.StudentID=? AND p.PlanDate >= ?
+            ORDER BY p.PlanDate, p.StartTime
+        """, (student_id, today.isoformat())).fetchall()
@@ -0,0 +1,166 @@
+"""Create a school's student and teacher accounts in bulk, e.g. from a MIS export.
+
+    python provisioning.py --file export.csv --admin-email admin@school.org --errors errors.csv
+
+The CSV or Excel file needs FirstName, LastName, Email, Role (Student or Teacher), YearGroup
+(students only) and Password columns. Rows are checked in one vectorised pass and their
+emails against Users in one query; passwords are hashed across a process pool on every core,
+and the accounts are inserted with executemany in one transaction, straight into the admin's
+school. Rows that fail go to an error file with their line number and the reason, and can be
+fixed and uploaded again on their own.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+from databasee import get_directory_cursor, get_directory_read_cursor
+from passwords import passwords
+from services import Conflict, InvalidInput, ServiceError, authorize
+import sharding
+
+REQUIRED_COLUMNS = ["FirstName", "LastName", "Email", "Role", "YearGroup", "Password"]
+ERROR_COLUMNS = ["Row", "FirstName", "LastName", "Email", "Role", "YearGroup", "Error"]
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+
+def read_users(file_path):
+    """The rows of a CSV or Excel file as strings, blanks included."""
+    import pandas as pd
+
+    if file_path.lower().endswith(".csv"):
+        df = pd.read_csv(file_path, dtype=str, keep_default_na=False)
+    elif file_path.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(file_path, dtype=str).fillna("")
+    else:
+        raise InvalidInput("Unsupported file format. Use CSV or Excel.")
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise InvalidInput(f"Missing required columns: {', '.join(missing)}.")
+    return df
+
+
+def validate(df):
+    """A normalised copy of ``df`` with an Error column: empty for valid rows, the first problem otherwise.
+
+    Row is the line in the file, counting the header as line 1.
+    """
+    import pandas as pd
+
+    def text(column):
+        return df[column].fillna("").astype(str).str.strip()
+
+    users = pd.DataFrame({
+        "Row": range(2, len(df) + 2),
+        "FirstName": text("FirstName"),
+        "LastName": text("LastName"),
+        # Kept as given: sign-up, login and idx_users_email all compare emails case-sensitively
+        "Email": text("Email"),
+        "Role": text("Role").str.lower(),
+        "YearGroup": text("YearGroup"),
+        "Password": df["Password"].fillna("").astype(str),
+    })
+    is_student = users["Role"] == "student"
+    year_group = pd.to_numeric(users["YearGroup"], errors="coerce")
+    whole_year = year_group.notna() & (year_group % 1 == 0) & (year_group > 0)
+    checks = [
+        ((users["FirstName"] == "") | (users["LastName"] == ""), "First and last name are required."),
+        (~users["Email"].str.match(EMAIL_PATTERN), "Invalid email address."),
+        (~users["Role"].isin(["student", "teacher"]), "Role must be Student or Teacher."),
+        (is_student & ~whole_year, "Students need a whole-number YearGroup."),
+        (users["Password"].str.strip() == "", "Password is required."),
+        (users["Email"].duplicated(keep="first"), "Email appears earlier in the file."),
+    ]
+    error = pd.Series("", index=users.index)
+    # Applied last to first, so each row keeps the first check it fails
+    for failed, message in reversed(checks):
+        error = error.mask(failed, message)
+    return users.assign(Error=error)
+
+
+def _registered(c, emails):
+    # One indexed lookup on idx_users_email, however many emails there are
+    return {row[0] for row in c.execute("SELECT Email FROM Users WHERE Email IN (SELECT value FROM json_each(?))",
+                                        (json.dumps(emails),))}
+
+
+def provision(actor, df, hash_workers=None):
+    """Create an account in the admin's school for every valid row of ``df``.
+
+    Returns ``(created, errors)``, where ``errors`` holds the rejected rows (without passwords)
+    in ERROR_COLUMNS. Nothing is created if an email is taken while the passwords are hashed.
+    """
+    authorize(actor, "teacher", "provision users", admin=True)
+    users = validate(df)
+    valid = users["Error"] == ""
+    with get_directory_read_cursor() as c:
+        registered = _registered(c, users.loc[valid, "Email"].tolist())
+    users.loc[valid & users["Email"].isin(registered), "Error"] = "Email is already registered."
+    valid = users["Error"] == ""
+
+    new = users[valid]
+    # Hashed before the transaction opens, so the write lock is only held for the inserts
+    hashes = passwords.hash_many(new["Password"].tolist(), workers=hash_workers)
+    emails = new["Email"].tolist()
+    with get_directory_cursor() as c:
+        try:
+            c.executemany("""
+                INSERT INTO Users (FirstName, LastName, Email, PasswordHash, UserRole, SchoolID)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(first_name, last_name, email, password_hash, role, actor.school_id)
+                  for first_name, last_name, email, role, password_hash
+                  in zip(new["FirstName"].tolist(), new["LastName"].tolist(), emails, new["Role"].tolist(), hashes)])
+        except sqlite3.IntegrityError:
+            raise Conflict("Some of these emails were registered while the import ran. Upload the file again.") from None
+        user_ids = dict(c.execute("SELECT Email, UserID FROM Users WHERE Email IN (SELECT value FROM json_each(?))",
+                                  (json.dumps(emails),)).fetchall())
+        students = new[new["Role"] == "student"]
+        c.executemany("INSERT INTO Students (YearGroup, UserID) VALUES (?, ?)",
+                      [(int(float(year_group)), user_ids[email])
+                       for year_group, email in zip(students["YearGroup"].tolist(), students["Email"].tolist())])
+        c.executemany("INSERT INTO Teachers (UserID) VALUES (?)",
+                      [(user_ids[email],) for email in new.loc[new["Role"] == "teacher", "Email"].tolist()])
+    sharding.move_users({user_id: None for user_id in user_ids.values()})
+    return len(new), users.loc[~valid, ERROR_COLUMNS]
+
+
+def write_errors(errors, path):
+    errors.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create student and teacher accounts from a CSV or Excel file.")
+    parser.add_argument("--file", required=True, help="CSV or Excel file with columns " + ", ".join(REQUIRED_COLUMNS))
+    parser.add_argument("--admin-email", required=True, help="admin of the school the accounts join")
+    parser.add_argument("--errors", help="where to write rejected rows (default: <file>_errors.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: one per core)")
+    args = parser.parse_args()
+
+    from databasee import load_principal
+    with get_directory_read_cursor() as c:
+        row = c.execute("SELECT UserID FROM Users WHERE Email=?", (args.admin_email,)).fetchone()
+    if row is None:
+        print(f"❌ No user with email {args.admin_email}.")
+        return 1
+    try:
+        created, errors = provision(load_principal(row[0]), read_users(args.file), args.workers)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading file: {e}")
+        return 1
+    except ServiceError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        passwords.shutdown()
+
+    print(f"✅ {created} accounts created.")
+    if len(errors):
+        error_path = args.errors or f"{os.path.splitext(args.file)[0]}_errors.csv"
+        write_errors(errors, error_path)
+        print(f"⚠️ {len(errors)} rows rejected. See {error_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+"""Audit the app's SQL against a database and suggest the indexes it is missing.
+
+Statements are collected from the source (every SQL string literal in the app's modules)
+and, optionally, from a log of what a real session ran (start the app with
+REVISIONAPP_SQL_LOG=sql.log). Each one is run through EXPLAIN QUERY PLAN; full table scans
+and temporary B-trees are flagged, an index is proposed for each, foreign keys without a
+supporting index (which make ON DELETE CASCADE scan the child table) are listed, and
+indexes made redundant by a primary key or a wider index are marked for dropping. The
+proposals are then built on an in-memory copy of the database to time the affected
+statements before and after, and can be printed as a migration for migrations.py.
+
+    python query_audit.py --db tables.db [--log sql.log] [--migration]
+"""
+import argparse
+import ast
+import glob
+import re
+import sqlite3
+import time
+
+# Modules whose SQL is audited; the tools themselves are left out
+APP_MODULES = ["analytics.py", "auth.py", "databasee.py", "grading.py", "planner.py", "provisioning.py",
+               "quiz_engine.py", "scheduling.py", "school.py", "server.py", "services.py", "sharding.py", "tasks.py"]
+
+# The app writes SQL keywords in capitals, which keeps prompts such as "Select a class" out
+SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\b")
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+# column, operator, and whether the other side is a parameter or literal rather than a join column
+PREDICATE = re.compile(r"(?:(\w+)\.)?(\w+)\s*(=|<=|>=|<|>|\bIN\b|\bIS\b)\s*(\(?\s*[?'\d])?", re.IGNORECASE)
+ORDER_BY = re.compile(r"\bORDER\s+BY\s+(.+?)(?:\bLIMIT\b|\)|;|$)", re.IGNORECASE | re.DOTALL)
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$")
+NOT_ALIASES = {"WHERE", "ON", "JOIN", "LEFT", "INNER", "GROUP", "ORDER", "SET", "VALUES", "USING", "LIMIT"}
+
+
+# A substitution right after one of these names the table, which is only known at run time
+TABLE_SLOT = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(?:\w+\.)?$", re.IGNORECASE)
+
+
+def _literal_sql(node, fragments=None):
+    """Plain strings as they are. In f-strings, a name bound to a string earlier in the same
+    function (a shared FROM ... WHERE clause, say) is inlined and any other substitution (a
+    placeholder list) becomes a single "?". None if the string is not a literal, or if a
+    substitution names the table."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if not isinstance(node, ast.JoinedStr):
+        return None
+    sql = ""
+    for part in node.values:
+        if isinstance(part, ast.Constant):
+            sql += part.value
+        elif TABLE_SLOT.search(sql):
+            return None
+        elif isinstance(part.value, ast.Name) and fragments and part.value.id in fragments:
+            sql += _literal_sql(fragments[part.value.id]) or "?"
+        elif not sql.rstrip().endswith("?"):
+            sql += "?"
+        # Straight after a parameter, it can only be extra conditions, which the plan can do without
+    return sql
+
+
+def _fragments(tree):
+    """id(node) -> the string literals assigned to plain names in the function enclosing the node."""
+    scopes = {}
+    # ast.walk is breadth-first, so a nested function's bindings are recorded after, and override, its parent's
+    for scope in ast.walk(tree):
+        if not isinstance(scope, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        bound = {}
+        for node in ast.walk(scope):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name) \
+                    and isinstance(node.value, (ast.Constant, ast.JoinedStr)):
+                bound[node.targets[0].id] = node.value
+        for node in ast.walk(scope):
+            scopes[id(node)] = bound
+    return scopes
+
+
+def harvest_statements(paths=APP_MODULES):
+    """Every SQL statement written as a string literal in ``paths``, with its file and line."""
+    statements = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        # The pieces of an f-string are string constants too; only the whole string is a statement
+        pieces = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for part in node.values}
+        scopes = _fragments(tree)
+        for node in ast.walk(tree):
+            if id(node) in pieces:
+                continue
+            sql = _literal_sql(node, scopes.get(id(node)))
+            if sql and SQL_START.match(sql):
+                # str.format templates such as analytics.MASTERY_QUERY take a subquery; "?" keeps them valid
+                statements.append((re.sub(r"\{\w+\}", "?", sql), f"{path}:{node.lineno}"))
+    return statements
+
+
+def load_log(path):
+    """Statements captured with REVISIONAPP_SQL_LOG, one per line, literals already bound."""
+    with open(path, encoding="utf-8") as f:
+        return [(line.strip(), path) for line in f if SQL_START.match(line)]
+
+
+def fingerprint(sql):
+    sql = re.sub(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\?(?:\s*,\s*\?)+", "?", sql)
+    return " ".join(sql.split()).lower()
+
+
+def explain(conn, sql):
+    params = [None] * sql.count("?")
+    try:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    except sqlite3.Error as e:
+        return [f"ERROR {e}"]
+
+
+def table_columns(conn):
+    return {table: [row[1] for row in conn.execute(f"PRAGMA table_info({table});")]
+            for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")}
+
+
+def aliases(sql, columns):
+    names = {}
+    for table, alias in TABLE_REF.findall(sql):
+        if table in columns:
+            names[table] = table
+            if alias and alias.upper() not in NOT_ALIASES:
+                names[alias] = table
+    return names
+
+
+def suggest_index(sql, table, alias_map, columns, for_order=False):
+    """Columns for an index on ``table`` that serves the statement's predicates: equality
+    columns first in the order they appear, then at most one range column, then ORDER BY columns."""
+    own = {column.lower(): column for column in columns[table]}
+    single_table = len(set(alias_map.values())) == 1
+    equality, ranges, bound = [], [], set()
+    for qualifier, column, op, value in PREDICATE.findall(sql):
+        column = own.get(column.lower())
+        if column is None or qualifier and alias_map.get(qualifier) != table:
+            continue
+        if not qualifier and not (single_table or _only_in(column, table, alias_map, columns)):
+            continue
+        target = equality if op.upper() in ("=", "IN", "IS") else ranges
+        if value:
+            bound.add(column)
+        if column not in equality and column not in ranges:
+            target.append(column)
+    # Columns fixed by the caller's parameters lead, and key columns go before flags such as Status
+    equality.sort(key=lambda column: (column not in bound, not column.endswith("ID")))
+    chosen = equality + ranges[:1]
+    if for_order:
+        match = ORDER_BY.search(sql)
+        if match:
+            for term in match.group(1).split(","):
+                name = term.strip().split()[0] if term.strip() else ""
+                qualifier, _, column = name.rpartition(".")
+                column = own.get(column.lower())
+                if column and (not qualifier or alias_map.get(qualifier) == table) and column not in chosen:
+                    chosen.append(column)
+    return tuple(chosen)
+
+
+def _only_in(column, table, alias_map, columns):
+    return all(column not in columns[other] for other in set(alias_map.values()) if other != table)
+
+
+def existing_indexes(conn):
+    """(table, columns) -> index name for every index, including the automatic ones for UNIQUE/PRIMARY KEY."""
+    found = {}
+    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"):
+        for _, name, *_ in conn.execute(f"PRAGMA index_list({table});"):
+            cols = tuple(row[2] for row in conn.execute(f"PRAGMA index_info({name});"))
+            found[table, cols] = name
+    return found
+
+
+def rowid_column(conn, table):
+    for _, name, col_type, _, _, pk in conn.execute(f"PRAGMA table_info({table});"):
+        if pk == 1 and col_type.upper() == "INTEGER" and sum(r[5] > 0 for r in conn.execute(f"PRAGMA table_info({table});")) == 1:
+            return name
+    return None
+
+
+def covered(table, cols, indexes, conn):
+    if len(cols) == 1 and cols[0] == rowid_column(conn, table):
+        return True
+    return any(t == table and idx_cols[:len(cols)] == cols for t, idx_cols in indexes)
+
+
+def foreign_key_gaps(conn, indexes):
+    """(table, column) for every foreign key whose child column no index leads with."""
+    gaps = []
+    for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"):
+        for row in conn.execute(f"PRAGMA foreign_key_list({table});"):
+            column = row[3]
+            if not covered(table, (column,), indexes, conn) and (table, column) not in gaps:
+                gaps.append((table, column))
+    return gaps
+
+
+def redundant_indexes(conn, indexes):
+    """Explicit indexes that duplicate the rowid or are a leading prefix of another index."""
+    explicit = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index' AND sql IS NOT NULL;")}
+    unique = {row[1] for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")
+              for row in conn.execute(f"PRAGMA index_list({table});") if row[2]}
+    redundant = []
+    for (table, cols), name in indexes.items():
+        if name not in explicit:
+            continue
+        if len(cols) == 1 and cols[0] == rowid_column(conn, table):
+            redundant.append((name, f"duplicates the {table} primary key"))
+            continue
+        for (other_table, other_cols), other in indexes.items():
+            if other != name and other_table == table and len(other_cols) > len(cols) \
+                    and other_cols[:len(cols)] == cols and name not in unique:
+                redundant.append((name, f"is a prefix of {other}"))
+                break
+    return redundant
+
+
+def _snake(name):
+    return re.sub(r"(?<=[a-z])(?=[A-Z])", "_", name).lower()
+
+
+def index_name(table, cols):
+    return "idx_" + _snake(table) + "_" + "_".join(_snake(c) for c in cols)
+
+
+def audit(conn, statements):
+    """Returns ``(findings, proposals)``. Findings are ``(source, sql, problem)``;
+    proposals map ``(table, columns)`` to the statements they should speed up."""
+    columns = table_columns(conn)
+    indexes = existing_indexes(conn)
+    findings, proposals, seen = [], {}, set()
+    for sql, source in statements:
+        key = fingerprint(sql)
+        if key in seen:
+            continue
+        seen.add(key)
+        alias_map = aliases(sql, columns)
+        for detail in explain(conn, sql):
+            if detail.startswith("ERROR"):
+                findings.append((source, sql, detail))
+                continue
+            scan = SCAN.match(detail)
+            order = "USE TEMP B-TREE" in detail
+            if not scan and not order:
+                continue
+            findings.append((source, sql, detail))
+            if scan:
+                tables = [alias_map.get(scan.group(2) or scan.group(1), scan.group(1))]
+            elif len(set(alias_map.values())) == 1:
+                tables = list(set(alias_map.values()))
+            else:
+                # A sort over a join depends on join order; flag it but leave the fix to a person
+                tables = []
+            for table in tables:
+                if table not in columns:
+                    continue
+                cols = suggest_index(sql, table, alias_map, columns, for_order=order)
+                if cols and not covered(table, cols, indexes, conn):
+                    proposals.setdefault((table, cols), []).append(sql)
+    # An index that is a leading prefix of another proposal on the same table is served by it
+    for (table, cols), sqls in list(proposals.items()):
+        wider = [key for key in proposals if key[0] == table and len(key[1]) > len(cols) and key[1][:len(cols)] == cols]
+        if wider:
+            proposals[wider[0]].extend(proposals.pop((table, cols)))
+    return findings, proposals
+
+
+def time_statement(conn, sql, repeat=5):
+    params = [None] * sql.count("?")
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            conn.execute(sql, params).fetchall() if SQL_START.match(sql).group(1).upper() in ("SELECT", "WITH") \
+                else conn.execute("EXPLAIN " + sql, params).fetchall()
+        except sqlite3.Error:
+            return None
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+def compare(db_path, proposals):
+    """Median timings of each proposal's statements before and after building it, on an in-memory copy."""
+    copy = sqlite3.connect(":memory:")
+    with sqlite3.connect(f"file:{db_path}?mode=ro", uri=True) as source:
+        source.backup(copy)
+    results = []
+    for (table, cols), sqls in proposals.items():
+        sqls = [sql for sql in sqls if SQL_START.match(sql).group(1).upper() in ("SELECT", "WITH")]
+        before = [time_statement(copy, sql) for sql in sqls]
+        start = time.perf_counter()
+        copy.execute(f"CREATE INDEX {index_name(table, cols)} ON {table}({', '.join(cols)});")
+        build = (time.perf_counter() - start) * 1000
+        after = [time_statement(copy, sql) for sql in sqls]
+        results.append((table, cols, build,
+                        sum(t for t in before if t is not None), sum(t for t in after if t is not None)))
+    copy.close()
+    return results
+
+
+def migration_source(version, creates, drops):
+    lines = [f'@migration({version}, "Add indexes for the audited workload")',
+             "def add_workload_indexes(c):"]
+    lines += [f'    c.execute("DROP INDEX IF EXISTS {name};")' for name in drops]
+    lines += [f'    c.execute("CREATE INDEX IF NOT EXISTS {index_name(table, cols)} ON {table}({", ".join(cols)});")'
+              for table, cols in creates]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every app query and propose indexes.")
+    parser.add_argument("--db", default="tables.db", help="database to plan against; use a realistically sized one")
+    parser.add_argument("--log", action="append", default=[], help="statement log written with REVISIONAPP_SQL_LOG")
+    parser.add_argument("--migration", action="store_true", help="print the proposals as a migration")
+    args = parser.parse_args()
+
+    statements = harvest_statements(sorted(set(APP_MODULES) & set(glob.glob("*.py"))))
+    for path in args.log:
+        statements += load_log(path)
+
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    findings, proposals = audit(conn, statements)
+    indexes = existing_indexes(conn)
+    gaps = [(table, (column,)) for table, column in foreign_key_gaps(conn, indexes)
+            if not any(t == table and cols[:1] == (column,) for t, cols in proposals)]
+    redundant = redundant_indexes(conn, indexes)
+    conn.close()
+
+    print(f"{len(findings)} plan problems in {len({fingerprint(sql) for sql, _ in statements})} distinct statements\n")
+    for source, sql, detail in findings:
+        print(f"{source}: {detail}\n    {' '.join(sql.split())[:160]}")
+    print("\nProposed indexes (before -> after, summed over the affected statements):")
+    for table, cols, build, before, after in compare(args.db, proposals):
+        print(f"  {table}({', '.join(cols)}): {before:.2f} ms -> {after:.2f} ms, built in {build:.1f} ms")
+    print("\nForeign keys without an index (ON DELETE CASCADE scans the child table):")
+    for table, (column,) in gaps:
+        print(f"  {table}({column})")
+    print("\nRedundant indexes:")
+    for name, reason in redundant:
+        print(f"  {name} {reason}")
+
+    if args.migration:
+        from migrations import LATEST_VERSION
+        print("\n" + migration_source(LATEST_VERSION + 1, list(proposals) + gaps, [name for name, _ in redundant]))
+
+
+if __name__ == "__main__":
+    main()
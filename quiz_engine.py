@@ -0,0 +1,165 @@
+from collections import OrderedDict
+import threading
+
+from databasee import get_cursor, get_read_cursor, DIFFICULTY_LEVELS
+from grading import normalise_answer, record_score
+import analytics
+
+# Where to look when the wanted difficulty has no unanswered questions left
+FALLBACK_ORDER = {
+    "Easy": ["Easy", "Medium", "Hard"],
+    "Medium": ["Medium", "Easy", "Hard"],
+    "Hard": ["Hard", "Medium", "Easy"],
+}
+
+# The homework a student's answers to a quiz are saved under: the latest time the quiz was
+# set for one of their classes. Also used set-based by the migrations that re-key old answers.
+QUIZ_HOMEWORK_SQL = """
+    SELECT h.HomeworkID FROM HomeworkTasks h
+    JOIN Enrollment e ON e.ClassID = h.ClassID
+    WHERE h.HomeworkType = 'Quiz' AND h.AssignmentID = {quiz_id} AND e.StudentID = {student_id}
+    ORDER BY h.HomeworkID DESC LIMIT 1
+"""
+
+
+def quiz_homework_id(c, student_id, quiz_id):
+    """The HomeworkID a student answers ``quiz_id`` under, or None if it is not set for any of their classes."""
+    row = c.execute(QUIZ_HOMEWORK_SQL.format(quiz_id="?", student_id="?"), (quiz_id, student_id)).fetchone()
+    return row[0] if row else None
+
+
+class QuizQuestions:
+    """A quiz's questions loaded once and bucketed by difficulty."""
+
+    def __init__(self, rows):
+        self.buckets = {level: [] for level in DIFFICULTY_LEVELS}
+        self.answers = {}
+        self.difficulty = {}
+        for question_id, text, options, difficulty, correct_answer in rows:
+            self.buckets[difficulty].append((question_id, text, options))
+            self.answers[question_id] = normalise_answer(correct_answer)
+            self.difficulty[question_id] = difficulty
+
+
+class StudentProgress:
+    """Where one student is in one quiz: the difficulty to serve next and what they have answered."""
+
+    def __init__(self):
+        self.difficulty = "Medium"
+        self.answered = set()
+        # Per-bucket position of the first question that might still be unanswered
+        self.cursor = {level: 0 for level in DIFFICULTY_LEVELS}
+
+    def record(self, quiz, question_id, was_correct):
+        self.answered.add(question_id)
+        idx = DIFFICULTY_LEVELS.index(quiz.difficulty.get(question_id, self.difficulty))
+        if was_correct and idx < 2:
+            idx += 1
+        elif not was_correct and idx > 0:
+            idx -= 1
+        self.difficulty = DIFFICULTY_LEVELS[idx]
+
+
+class QuizEngine:
+    """Serves adaptive quiz questions from memory.
+
+    Each quiz's questions are read once, and each student's progress through a quiz homework
+    is rebuilt from StudentQuizResults the first time it is needed and then kept up to date by
+    record_answer. Both caches are LRU-bounded. Answers are stored under the HomeworkID the
+    quiz was set as (see quiz_homework_id), never the QuizID.
+    """
+
+    def __init__(self, max_quizzes=256, max_students=10000):
+        self.max_quizzes = max_quizzes
+        self.max_students = max_students
+        self._quizzes = OrderedDict()
+        self._progress = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _quiz(self, quiz_id):
+        quiz = self._quizzes.get(quiz_id)
+        if quiz is not None:
+            self._quizzes.move_to_end(quiz_id)
+            return quiz
+        with get_read_cursor() as c:
+            rows = c.execute("""
+                SELECT q.QuestionID, q.QuestionText, q.AnswerOptions, q.DifficultyLevel, q.CorrectAnswer
+                FROM QuizQuestionAssignments qa
+                JOIN QuizQuestions q ON qa.QuestionID = q.QuestionID
+                WHERE qa.QuizID = ?
+                ORDER BY qa.AssignmentID
+            """, (quiz_id,)).fetchall()
+        quiz = self._quizzes[quiz_id] = QuizQuestions(rows)
+        if len(self._quizzes) > self.max_quizzes:
+            self._quizzes.popitem(last=False)
+        return quiz
+
+    def _student(self, student_id, quiz_id, homework_id, quiz):
+        key = (student_id, quiz_id, homework_id)
+        progress = self._progress.get(key)
+        if progress is not None:
+            self._progress.move_to_end(key)
+            return progress
+        progress = StudentProgress()
+        with get_read_cursor() as c:
+            answers = c.execute("""
+                SELECT QuestionID, AnswerGiven FROM StudentQuizResults
+                WHERE StudentID = ? AND HomeworkID = ?
+                ORDER BY ResultID
+            """, (student_id, homework_id)).fetchall()
+        for question_id, answer_given in answers:
+            progress.record(quiz, question_id, quiz.answers.get(question_id) == normalise_answer(answer_given))
+        self._progress[key] = progress
+        if len(self._progress) > self.max_students:
+            self._progress.popitem(last=False)
+        return progress
+
+    def next_question(self, student_id, quiz_id, homework_id):
+        """Return ``(QuestionID, QuestionText, AnswerOptions)`` or None once every question is answered."""
+        with self._lock:
+            quiz = self._quiz(quiz_id)
+            progress = self._student(student_id, quiz_id, homework_id, quiz)
+            for level in FALLBACK_ORDER[progress.difficulty]:
+                bucket = quiz.buckets[level]
+                i = progress.cursor[level]
+                while i < len(bucket) and bucket[i][0] in progress.answered:
+                    i += 1
+                progress.cursor[level] = i
+                if i < len(bucket):
+                    return bucket[i]
+            return None
+
+    def has_question(self, quiz_id, question_id):
+        with self._lock:
+            return question_id in self._quiz(quiz_id).answers
+
+    def record_answer(self, student_id, quiz_id, homework_id, question_id, answer_given):
+        """Store and grade an answer and move the student's difficulty. Returns whether it was correct."""
+        with self._lock:
+            quiz = self._quiz(quiz_id)
+        was_correct = quiz.answers.get(question_id) == normalise_answer(answer_given)
+        with get_cursor() as c:
+            c.execute("INSERT INTO StudentQuizResults(StudentID, HomeworkID, QuestionID, AnswerGiven) VALUES(?, ?, ?, ?);",
+                      (student_id, homework_id, question_id, answer_given))
+            record_score(c, homework_id, student_id, question_id, was_correct)
+        analytics.invalidate_homework(homework_id)
+        with self._lock:
+            key = (student_id, quiz_id, homework_id)
+            if key in self._progress:
+                self._progress[key].record(quiz, question_id, was_correct)
+            return was_correct
+
+    def invalidate_quiz(self, quiz_id=None):
+        """Drop cached questions for one quiz, or for every quiz when ``quiz_id`` is None."""
+        with self._lock:
+            if quiz_id is None:
+                self._quizzes.clear()
+            else:
+                self._quizzes.pop(quiz_id, None)
+            # Bucket positions refer to the old question lists; the answered sets stay valid
+            for (_, progress_quiz_id, _), progress in self._progress.items():
+                if quiz_id is None or progress_quiz_id == quiz_id:
+                    progress.cursor = {level: 0 for level in DIFFICULTY_LEVELS}
+
+
+engine = QuizEngine()
@@ -0,0 +1,169 @@
+from datetime import timedelta
+import math
+
+from databasee import get_read_cursor
+
+MINUTES_PER_DAY = 24 * 60
+
+# Above this many students the sweep runs on NumPy arrays instead of Python lists
+VECTORISE_ABOVE = 100
+
+
+def to_minutes(hhmm):
+    hours, minutes = str(hhmm).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def to_hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or touching ``(start, end)`` minute intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def load_busy_minutes(student_ids):
+    """StudentID -> list of busy ``(start, end)`` minutes from StudentSchedule (personal times plus class periods)."""
+    busy = {student_id: [] for student_id in student_ids}
+    student_ids = list(busy)
+    with get_read_cursor() as c:
+        for start in range(0, len(student_ids), 500):
+            batch = student_ids[start:start + 500]
+            for student_id, start_time, end_time in c.execute(
+                    f"SELECT StudentID, StartTime, EndTime FROM StudentSchedule WHERE StudentID IN ({', '.join('?' * len(batch))})",
+                    batch):
+                begin, end = to_minutes(start_time), to_minutes(end_time)
+                # Times carry no date; an interval that wraps past midnight is cut at the end of the day
+                busy[student_id].append((begin, end if end > begin else MINUTES_PER_DAY))
+    return busy
+
+
+def _sweep(busy, window_start, window_end):
+    # Busy-count changes at each boundary, after merging each student's own overlaps
+    events = []
+    for intervals in busy.values():
+        for start, end in merge_intervals(intervals):
+            start, end = max(start, window_start), min(end, window_end)
+            if start < end:
+                events.append((start, 1))
+                events.append((end, -1))
+    events.sort()
+
+    segments = []
+    busy_count = 0
+    position = window_start
+    i = 0
+    while i < len(events):
+        time = events[i][0]
+        if time > position:
+            segments.append((position, time, busy_count))
+        while i < len(events) and events[i][0] == time:
+            busy_count += events[i][1]
+            i += 1
+        position = time
+    if position < window_end:
+        segments.append((position, window_end, busy_count))
+    return segments
+
+
+def _vectorised_sweep(busy, window_start, window_end):
+    import numpy as np
+
+    student_col, start_col, end_col = [], [], []
+    for i, intervals in enumerate(busy.values()):
+        for start, end in intervals:
+            student_col.append(i)
+            start_col.append(start)
+            end_col.append(end)
+    starts = np.clip(np.array(start_col, dtype=np.int64), window_start, window_end)
+    ends = np.clip(np.array(end_col, dtype=np.int64), window_start, window_end)
+    keep = starts < ends
+    if not keep.any():
+        return [(window_start, window_end, 0)]
+
+    # Merge each student's overlaps at once: shift every student onto their own stretch of the
+    # number line, sort, and start a new run wherever a start passes the running maximum end
+    offset = np.array(student_col, dtype=np.int64)[keep] * (MINUTES_PER_DAY + 1)
+    starts, ends = starts[keep] + offset, ends[keep] + offset
+    order = np.lexsort((ends, starts))
+    starts, ends, offset = starts[order], ends[order], offset[order]
+    reach = np.maximum.accumulate(ends)
+    new_run = np.concatenate(([True], starts[1:] > reach[:-1]))
+    run_starts = starts[new_run] - offset[new_run]
+    run_ends = np.maximum.reduceat(ends, np.flatnonzero(new_run)) - offset[new_run]
+
+    # Sweep the merged boundaries: +1 where a run starts, -1 where it ends
+    times, inverse = np.unique(np.concatenate(([window_start, window_end], run_starts, run_ends)), return_inverse=True)
+    delta = np.zeros(len(times), dtype=np.int64)
+    np.add.at(delta, inverse[2:2 + len(run_starts)], 1)
+    np.add.at(delta, inverse[2 + len(run_starts):], -1)
+    busy_count = np.cumsum(delta)
+    return [(int(a), int(b), int(count)) for a, b, count in zip(times[:-1], times[1:], busy_count[:-1]) if a < b]
+
+
+def common_free_slots(student_ids, day_start="08:00", day_end="18:00", threshold=1.0, min_minutes=30):
+    """Windows in the day when at least ``threshold`` of the students are free.
+
+    Returns ``[(StartTime, EndTime, free_count), ...]`` as HH:MM strings. Each student's
+    intervals are merged and a sorted sweep over the boundaries counts how many are busy;
+    large cohorts run the same sweep vectorised with NumPy.
+    """
+    busy = load_busy_minutes(student_ids)
+    total = len(busy)
+    if not total:
+        return []
+    window_start, window_end = to_minutes(day_start), to_minutes(day_end)
+    needed = math.ceil(threshold * total)
+
+    if total > VECTORISE_ABOVE:
+        segments = _vectorised_sweep(busy, window_start, window_end)
+    else:
+        segments = _sweep(busy, window_start, window_end)
+
+    slots = []
+    for start, end, busy_count in segments:
+        free_count = total - busy_count
+        if free_count < needed:
+            continue
+        # Join neighbouring segments that both qualify, keeping the smallest free count
+        if slots and slots[-1][1] == start:
+            slots[-1] = (slots[-1][0], end, min(slots[-1][2], free_count))
+        else:
+            slots.append((start, end, free_count))
+    return [(to_hhmm(start), to_hhmm(end), free_count)
+            for start, end, free_count in slots if end - start >= min_minutes]
+
+
+def class_free_slots(class_id, **options):
+    with get_read_cursor() as c:
+        student_ids = [row[0] for row in c.execute("SELECT StudentID FROM Enrollment WHERE ClassID=?", (class_id,))]
+    return common_free_slots(student_ids, **options)
+
+
+def year_group_free_slots(school_id, year_group, **options):
+    with get_read_cursor() as c:
+        student_ids = [row[0] for row in c.execute("""
+            SELECT s.StudentID FROM Students s
+            JOIN Users u ON u.UserID = s.UserID
+            WHERE u.SchoolID=? AND s.YearGroup=?
+        """, (school_id, year_group))]
+    return common_free_slots(student_ids, **options)
+
+
+def free_slots_between(start_date, end_date, slots):
+    """Repeat a day's slots for every date from ``start_date`` to ``end_date`` inclusive.
+
+    Busy times and periods are stored as times of day with no date, so every day has the
+    same windows.
+    """
+    days = (end_date - start_date).days + 1
+    return [(start_date + timedelta(days=n), start, end, free_count)
+            for n in range(max(days, 0)) for start, end, free_count in slots]
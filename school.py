@@ -1,395 +1,405 @@
-from databasee import c, connection
+from databasee import get_read_cursor, current_principal
 from session import session
-from databasee import get_school_id, get_teacher_id, get_student_id
+from databasee import get_student_id
 from datetime import datetime
-import sqlite3
+import csv
+import os
+from planner import get_plan
+from services import ServiceError, Conflict, InvalidInput
+import services
 
 def add_school():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a school.")
-        return False
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add schools.")
-        return False
-    if c.execute("SELECT IsSchoolAdmin FROM Users WHERE UserID=?", (session.get_user_id(),)).fetchone()[0]:
-        print("Entry denied! You are already a school admin. Leave the school admin role to add a new school.")
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add schools")
+        # Ask before writing so the write transaction is not held open while the user types
+        school_name = input("Enter the school name: ")
+        services.create_school(principal, school_name)
+    except ServiceError as e:
+        print(e)
         return False
-    
-    # Check if the user is a teacher and not already a school admin
-    c.execute("UPDATE Users SET IsSchoolAdmin = TRUE WHERE UserID = ?", (session.get_user_id(),))
+    session.invalidate_principal()
     print("You are now a school admin.")
-
-    school_name = input("Enter the school name: ")
-    c.execute("INSERT INTO Schools(SchoolName) VALUES(?);", (school_name,))
-    c.execute("UPDATE Users SET SchoolID = (SELECT SchoolID FROM Schools WHERE SchoolName = ?) WHERE UserID = ?;", 
-              (school_name, session.get_user_id()))
-    connection.commit()
     print("School added successfully!")
+    return True
 
 def add_class():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a class.")
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add classes")
+    except ServiceError as e:
+        print(e)
         return False
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add classes.")
-        return False
-    
-    if get_school_id(session.get_user_id()) is None:
-        print("You must be associated with a school to add a class.")
-        return False
-    
-    input_verified = False
-    while not input_verified:
+
+    while True:
         local_class_identifier = input("Enter the local class identifier: ")
-        if not local_class_identifier.strip():
-            print("Local class identifier cannot be empty. Please try again.")
-            continue
-        c.execute("SELECT LocalClassIdentifier FROM Classes WHERE LocalClassIdentifier=? AND SchoolId=?", (local_class_identifier, get_school_id(session.get_user_id())))
-        if c.fetchone() is not None:
-            print("This class identifier already exists. Please choose a different one.")
-            continue
-        else:
-            input_verified = True
-    school_id = get_school_id(session.get_user_id())
-    c.execute("INSERT INTO Classes(LocalClassIdentifier, SchoolID) VALUES(?, ?);", 
-              (local_class_identifier, school_id))
-    connection.commit()
+        try:
+            services.create_class(principal, local_class_identifier)
+            break
+        except (InvalidInput, Conflict) as e:
+            print(f"{e} Please try again.")
+        except ServiceError as e:
+            print(e)
+            return False
     print("Class added successfully!")
-
     return True
 
-def add_teacher_to_class():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a teacher to a class.")
-        return
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add teachers to classes.")
-        return False
-    
-    if not c.execute("SELECT IsSchoolAdmin FROM Users WHERE UserID=?", (session.get_user_id(),)).fetchone()[0]:
-        print("Entry denied! You must be a school admin to add teachers to your classes.")
-        return False
-    
-    verified = False
-    while not verified:
+def read_id(prompt, default=None):
+    # Keep asking until the user types a positive whole number (or accepts the default)
+    while True:
+        value = input(prompt).strip()
+        if not value and default is not None:
+            return default
         try:
-            class_id = int(input("Enter the class ID: "))
-            if class_id <= 0:
-                raise ValueError("Class ID must be a positive integer.")
-            if class_id is None:
-                raise ValueError("Class ID cannot be empty.")
-            verified = True
+            value = int(value)
+            if value > 0:
+                return value
         except ValueError:
-            print("Invalid input. Please enter a valid class ID.")
-    class_id = int(input("Enter the class ID: "))
+            pass
+        print("Invalid input. Please enter a positive whole number.")
 
-    verified = False
-    while not verified:
-        try:
-            teacher_id = int(input("Enter the teacher ID (or leave blank to select yourself): ") or get_teacher_id(session.get_user_id()))
-            if teacher_id <= 0:
-                raise ValueError("Teacher ID must be a positive integer.")
-            if teacher_id is None:
-                raise ValueError("Teacher ID cannot be empty.")
-            verified = True
-        except ValueError:
-            print("Invalid input. Please enter a valid teacher ID.")
+def read_optional_id(prompt):
+    # Like read_id, but a blank answer means "no filter"
+    while True:
+        value = input(prompt).strip()
+        if not value:
+            return None
+        if value.isdigit() and int(value) >= 0:
+            return int(value)
+        print("Invalid input. Please enter a whole number or leave it blank.")
 
-    c.execute("SELECT ClassID FROM Classes WHERE ClassID=?", (class_id,))
-    if c.fetchone() is None:
-        print("Class does not exist. Please check the class ID and try again.")
+def add_teacher_to_class():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add teachers to classes", admin=True)
+        class_id = read_id("Enter the class ID: ")
+        teacher_id = read_id("Enter the teacher ID (or leave blank to select yourself): ", principal.teacher_id)
+        services.assign_teacher(principal, class_id, teacher_id)
+    except ServiceError as e:
+        print(e)
         return False
+    print("Teacher added to class successfully!")
+    return True
 
-    c.execute("SELECT SchoolID FROM Classes WHERE ClassID=?", (class_id,))
-    school_id = c.fetchone()
-    if c.execute("SELECT SchoolID FROM Users WHERE UserID=?", (session.get_user_id(),)).fetchone()[0] != school_id[0]:
-        print("Entry denied! The teacher must belong to the same school as the class.")
-        return False
-    
-    if c.execute("SELECT ClassID FROM ClassTeachers WHERE ClassID=? AND TeacherID=?", (class_id, teacher_id)).fetchone() is not None:
-        print("This teacher is already assigned to this class.")
+def add_student_to_class():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add students to classes")
+        student_id = read_id("Enter the student ID: ")
+        class_id = read_id("Enter the class ID: ")
+        added = services.enroll(principal, student_id, class_id)
+    except ServiceError as e:
+        print(e)
         return False
+    print("Student added to class successfully!" if added else "This student is already in that class.")
+    return added
 
+def read_roster(file_path):
+    """``(class, student)`` pairs from a two-column CSV, skipping a header row and blank lines."""
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        rows = [row[:2] for row in csv.reader(f) if any(cell.strip() for cell in row)]
+    for row in rows:
+        if len(row) < 2:
+            raise ValueError(f"Expected two columns (class, student email or ID), got {row}.")
+    # A header names the columns instead of holding a student email or ID
+    if rows and "@" not in rows[0][1] and not rows[0][1].strip().isdigit():
+        rows = rows[1:]
+    return rows
 
-    c.execute("INSERT INTO ClassTeachers(ClassID, TeacherID) VALUES(?, ?);", 
-              (class_id, teacher_id))
-    connection.commit()
-    print("Teacher added to class successfully!")
-    return True
+def sync_class_roster():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "sync class rosters")
+        file_path = input("Enter the roster CSV path (columns: class, student email or ID): ").strip()
+        roster = read_roster(file_path)
+        preview = services.sync_roster(principal, roster, dry_run=True)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read the roster: {e}")
+        return False
+    except ServiceError as e:
+        print(e)
+        return False
 
-def add_student_to_class():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a student to a class.")
-        return
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add students to classes.")
+    print(f"{preview['classes']} classes: {preview['added']} to add, {preview['removed']} to remove, "
+          f"{preview['unchanged']} unchanged.")
+    if not preview["added"] and not preview["removed"]:
+        print("✅ Enrollments already match the roster.")
+        return True
+    if not ask_yes_no("Apply these changes? (Y/N): "):
+        print("Roster not synced.")
         return False
-    
-    student_id = int(input("Enter the student ID: "))
-    class_id = int(input("Enter the class ID: "))
-    c.execute("INSERT INTO Enrollment(StudentID, ClassID) VALUES(?, ?);", 
-              (student_id, class_id))
-    connection.commit()
-    print("Student added to class successfully!")
+    try:
+        summary = services.sync_roster(principal, roster)
+    except ServiceError as e:
+        print(e)
+        return False
+    print(f"✅ Roster synced: {summary['added']} added, {summary['removed']} removed.")
     return True
 
-def request_to_join_class():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to request to join a class.")
-        return
-    
-    if not session.require_role("student"):
-        print("Entry denied! Only students can request to join classes.")
-        return False
-    
-    verified = False
-    while not verified:
-        try:
-            class_id = int(input("Enter the class ID you want to join: "))
-            verified = True
-        except:
-            print("Invalid class ID. Please try again")
-    
-
-    class_exists = c.execute("SELECT ClassID FROM Classes WHERE ClassID=?", (class_id,)).fetchone()
-    if class_exists is None:
-        print("Class does not exist. Please check the class ID and try again.")
+def bulk_provision_users():
+    import provisioning
+
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "provision users", admin=True)
+        file_path = input(f"Enter path to your CSV or Excel file ({', '.join(provisioning.REQUIRED_COLUMNS)}): ").strip()
+        print("Hashing passwords, this can take a while for large files...")
+        created, errors = provisioning.provision(principal, provisioning.read_users(file_path))
+    except ServiceError as e:
+        print(f"❌ {e}")
         return False
-    
-    if c.execute("SELECT SchoolID FROM Classes WHERE ClassID=?", (class_id,)).fetchone()[0] != get_school_id(session.get_user_id()):
-        print("Entry denied! You can only request to join classes in your school.")
+    except (OSError, ValueError) as e:
+        print(f"❌ Error reading file: {e}")
         return False
+    print(f"✅ {created} accounts created.")
+    if len(errors):
+        error_path = f"{os.path.splitext(file_path)[0]}_errors.csv"
+        provisioning.write_errors(errors, error_path)
+        print(f"⚠️ {len(errors)} rows rejected. See {error_path}.")
+    return True
 
-    student_id = get_student_id(session.get_user_id())
-    if c.execute("SELECT StudentID FROM Enrollment WHERE StudentID=? AND ClassID=?", (student_id, class_id)).fetchone() is not None:
-        print("You are already enrolled in this class.")
+def request_to_join_class():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "student", "request to join classes")
+        class_id = read_id("Enter the class ID you want to join: ")
+        services.request_enrollment(principal, class_id)
+    except ServiceError as e:
+        print(e)
         return False
-    
-    c.execute("INSERT INTO EnrollmentRequests(StudentID, ClassID) VALUES(?, ?);", 
-              (student_id, class_id))
-    
-    connection.commit()
-    print("Request to join class submitted successfully!") 
+    print("Request to join class submitted successfully!")
     return True
 
+def ask_yes_no(prompt):
+    while True:
+        choice = input(prompt).strip().lower()
+        if choice in ("y", "n"):
+            return choice == "y"
+        print("Invalid choice. Please enter 'Y' or 'N'.")
+
 def approve_enrollment_request():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to approve enrollment requests.")
-        return
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can approve enrollment requests.")
+    principal = current_principal()
+    try:
+        requests = services.pending_enrollment_requests(principal)
+    except ServiceError as e:
+        print(e)
         return False
-    
-    list_requests = c.execute("SELECT RequestID, StudentID, ClassID FROM EnrollmentRequests WHERE ClassID IN (SELECT ClassID FROM ClassTeachers WHERE TeacherID=(SELECT TeacherID FROM Teachers WHERE UserID=?));", (session.get_user_id(),)).fetchall()
-    if not list_requests:
+    if not requests:
         print("No enrollment requests to approve.")
         return False
-    
+
+    # Collect every decision first, then apply them in one transaction per outcome
+    decisions = {True: [], False: []}
     print("Enrollment Requests:")
-    for request in list_requests:
-        print(f"Request ID: {request[0]}, Student ID: {request[1]}, Class ID: {request[2]}")
-        choice_approved = False
-        while not choice_approved:
-            choice = input("Do you want to approve this request? (Y/N): ").strip().lower()
-            if choice == 'y':
-                c.execute("INSERT INTO Enrollment(StudentID, ClassID) VALUES(?, ?);", (request[1], request[2]))
-                c.execute("UPDATE EnrollmentRequests SET Status='Approved' WHERE RequestID=?;", (request[0],))
-                print(f"Request ID {request[0]} approved successfully!")
-                connection.commit()
-                choice_approved = True
-            elif choice == 'n':
-                print(f"Request ID {request[0]} not approved.")
-                c.execute("UPDATE EnrollmentRequests SET Status='Denied' WHERE RequestID=?;", (request[0],))
-                connection.commit()
-                choice_approved = True
-            else:
-                print("Invalid choice. Please enter 'Y' or 'N'.")
-    
-    connection.commit()
-    print("Enrollment request approved successfully!")
+    for request_id, student_id, class_id in requests:
+        print(f"Request ID: {request_id}, Student ID: {student_id}, Class ID: {class_id}")
+        decisions[ask_yes_no("Do you want to approve this request? (Y/N): ")].append(request_id)
+    try:
+        for approved, request_ids in decisions.items():
+            services.approve_requests(principal, request_ids, approved)
+    except ServiceError as e:
+        print(e)
+        return False
+    print(f"✅ {len(decisions[True])} approved, {len(decisions[False])} not approved.")
     return True
-    
 
-def add_period():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a period.")
+def read_request_filters():
+    print("Leave a filter blank to match every pending request.")
+    year_group = read_optional_id("Year group: ")
+    email_domain = input("Email domain (e.g. school.org): ").strip() or None
+    older_than_days = read_optional_id("Only requests at least this many days old: ")
+    return year_group, email_domain, older_than_days
+
+def batch_decide_enrollment_requests():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "approve enrollment requests")
+        class_id = read_optional_id("Class ID (blank for all your classes): ")
+        year_group, email_domain, older_than_days = read_request_filters()
+        approved = ask_yes_no("Approve the matching requests? N denies them. (Y/N): ")
+        summary = services.batch_decide_enrollment_requests(principal, approved, class_id, year_group, email_domain,
+                                                            older_than_days)
+    except ServiceError as e:
+        print(e)
         return False
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add periods.")
+    if not summary["decided"]:
+        print("No pending enrollment requests match.")
         return False
-    
-    start_time = input("Enter the start time (HH:MM): ")
-    end_time = input("Enter the end time (HH:MM): ")
-    class_id = int(input("Enter the class ID: "))
-    teacher_id = get_teacher_id(session.get_user_id())
-    
-    c.execute("INSERT INTO Periods(StartTime, EndTime, ClassID, TeacherID) VALUES(?, ?, ?, ?);", 
-              (start_time, end_time, class_id, teacher_id))
-    connection.commit()
-    print("Period added successfully!")
-
-    c.execute("""
-              SELECT StudentID FROM Enrollment
-                WHERE ClassID=?;
-                """, (class_id,))
-    students = c.fetchall()
-    for student in students:
-        c.execute("INSERT INTO StudentBusyTimes(StudentID, StartTime, EndTime) VALUES(?, ?, ?);", 
-                  (student[0], start_time, end_time))
-    connection.commit()
-    print("Busy times for students in the class have been updated successfully!")
+    print(f"✅ {summary['decided']} requests {'approved' if approved else 'denied'}, {summary['enrolled']} new enrollments.")
+    for class_id, count in sorted(summary["by_class"].items()):
+        print(f"  Class {class_id}: {count}")
+    return True
 
+def add_period():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add periods")
+        start_time = input("Enter the start time (HH:MM): ")
+        end_time = input("Enter the end time (HH:MM): ")
+        class_id = read_id("Enter the class ID: ")
+        services.create_period(principal, class_id, start_time, end_time)
+    except ServiceError as e:
+        print(e)
+        return False
+    print("Period added successfully!")
     return True
 
 def add_teacher_to_school():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a teacher to a school.")
-        return
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add teachers to schools.")
-        return False
-    
-    if not c.execute("SELECT IsSchoolAdmin FROM Users WHERE UserID=?", (session.get_user_id(),)).fetchone()[0]:
-        print("Entry denied! You must be a school admin to add teachers to your school.")
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add teachers to schools", admin=True)
+        teacher_email = input("Enter the email of the teacher you want to add: ")
+        services.add_teacher_to_school(principal, teacher_email)
+    except ServiceError as e:
+        print(e)
         return False
-    
-    teacher_email = input("Enter the email of the teacher you want to add: ")
-    if c.execute("SELECT UserID FROM Users WHERE Email=?", (teacher_email,)).fetchone() is None:
-        print("Teacher not found. Please check the email and try again.")
-        return False
-    
-    teacher_id = c.execute("SELECT UserID FROM Users WHERE Email=?", (teacher_email,)).fetchone()[0]
-    school_id = get_school_id(session.get_user_id())
-    c.execute("UPDATE Users SET SchoolID = ? WHERE UserID = ?;", (school_id, c.execute("SELECT UserID FROM Users WHERE Email=?", (teacher_email,)).fetchone()[0]))
+    print("Teacher added to school successfully!")
+    return True
 
 def request_to_join_school():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to request to join a school.")
-        return False
-    
-    school_id_verified = False
-    while not school_id_verified:
-        try:
-            school_id = int(input("Enter the school ID you want to join: "))
-            if school_id <= 0:
-                raise ValueError("School ID must be a positive integer.")
-            if school_id is None:
-                raise ValueError("School ID cannot be empty.")
-            school_id_verified = True
-        except ValueError:
-            print("Invalid input. Please enter a valid school ID.")#
-    school_exists = c.execute("SELECT SchoolID FROM Schools WHERE SchoolID=?", (school_id,)).fetchone()
-    if school_exists is None:
-        print("School does not exist. Please check the school ID and try again.")
+    principal = current_principal()
+    try:
+        services.authorize(principal, action="request to join a school")
+        school_id = read_id("Enter the school ID you want to join: ")
+        services.request_to_join_school(principal, school_id)
+    except ServiceError as e:
+        print(e)
         return False
-    c.execute("INSERT INTO SchoolJoinRequests(UserID, SchoolID) VALUES(?, ?);", 
-          (session.get_user_id(), school_id))
-    connection.commit()
     print("Request to join school submitted successfully!")
+    return True
 
 def approve_school_join_request():
-    if current_user_token is None:
-        print("You must be logged in to approve school join requests.")
-        return
-    if c.execute("SELECT isSchoolAdmin FROM Users WHERE UserID=?", (session.get_user_id(),)).fetchone()[0] is False:
-        print("Entry denied! Only school admins can approve school join requests.")
+    principal = current_principal()
+    try:
+        requests = services.pending_join_requests(principal)
+    except ServiceError as e:
+        print(e)
         return False
-    
-    requests = c.execute("SELECT RequestID, UserID FROM SchoolJoinRequests WHERE Status='Pending' AND SchoolID=(SELECT SchoolID FROM Users WHERE UserID=?);", (session.get_user_id(),)).fetchall()
     if not requests:
         print("No school join requests to approve.")
         return False
+
+    decisions = {True: [], False: []}
     print("School Join Requests:")
-    for request in requests:
-        c.execute("SELECT FirstName, LastName, Email FROM Users WHERE UserID=?", (request[1],))
-        user = c.fetchone()
-        if user is None:
-            print(f"Request ID: {request[0]} - User not found.")
-            continue
-        print(f"Request ID: {request[0]}, User: {user[0]} {user[1]} {user[2]}")
-        choice_approved = False
-        while not choice_approved:
-            choice = input("Do you want to approve this request? (Y/N): ").strip().lower()
-            if choice == 'y':
-                c.execute("UPDATE SchoolJoinRequests SET Status='Approved' WHERE RequestID=?;", (request[0],))
-                c.execute("UPDATE Users SET SchoolID=(SELECT SchoolID FROM SchoolJoinRequests WHERE RequestID=?) WHERE UserID=?;", (request[0], request[1]))
-                connection.commit()
-                print(f"Request ID {request[0]} approved successfully!")
-                choice_approved = True
-            elif choice == 'n':
-                c.execute("UPDATE SchoolJoinRequests SET Status='Denied' WHERE RequestID=?;", (request[0],))
-                connection.commit()
-                print(f"Request ID {request[0]} not approved.")
-                choice_approved = True
-            else:
-                print("Invalid choice. Please enter 'Y' or 'N'.")
+    for request_id, _, first_name, last_name, email in requests:
+        print(f"Request ID: {request_id}, User: {first_name} {last_name} {email}")
+        decisions[ask_yes_no("Do you want to approve this request? (Y/N): ")].append(request_id)
+    try:
+        for approved, request_ids in decisions.items():
+            services.approve_join_requests(principal, request_ids, approved)
+    except ServiceError as e:
+        print(e)
+        return False
+    print(f"✅ {len(decisions[True])} approved, {len(decisions[False])} not approved.")
+    return True
 
+def batch_decide_school_join_requests():
+    principal = current_principal()
+    try:
+        services.authorize(principal, action="approve school join requests", admin=True)
+        year_group, email_domain, older_than_days = read_request_filters()
+        approved = ask_yes_no("Approve the matching requests? N denies them. (Y/N): ")
+        summary = services.batch_decide_school_join_requests(principal, approved, year_group, email_domain,
+                                                             older_than_days)
+    except ServiceError as e:
+        print(e)
+        return False
+    if not summary["decided"]:
+        print("No pending school join requests match.")
+        return False
+    print(f"✅ {summary['decided']} requests {'approved' if approved else 'denied'}, {summary['joined']} users joined the school.")
+    return True
 
 def add_busy_time():
-    global current_user_token
+    principal = current_principal()
+    try:
+        services.authorize(principal, "student", "add their busy periods")
+        start_time = input("Enter the start time (HH:MM): ")
+        end_time = input("Enter the end time (HH:MM): ")
+        services.add_busy_time(principal, start_time, end_time)
+    except ServiceError as e:
+        print(e)
+        return False
+    print("Student availability added successfully!")
+    return True
+
+def get_student_schedule(student_id):
+    # Personal busy times plus the periods of every enrolled class, earliest first
+    with get_read_cursor() as c:
+        return c.execute("""
+            SELECT StartTime, EndTime, Source FROM StudentSchedule
+            WHERE StudentID=?
+            ORDER BY StartTime, EndTime;
+        """, (student_id,)).fetchall()
+
+def view_schedule():
     if session.is_logged_in() is False:
-        print("You must be logged in to add the times when you are busy.")
+        print("You must be logged in to view your schedule.")
         return False
-    
+
     if not session.require_role("student"):
-        print("Entry denied! Only students can add their busy periods.")
+        print("Entry denied! Only students have a schedule.")
         return False
-    
-    start_time = input("Enter the start time (HH:MM): ")
-    start_time = datetime.strptime(start_time, "%H:%M").strftime("%H:%M")
-    end_time = input("Enter the end time (HH:MM): ")
-    end_time = datetime.strptime(end_time, "%H:%M").strftime("%H:%M")   
-    student_id = get_student_id(session.get_user_id())
-
-    c.execute("INSERT INTO StudentBusyTimes(StudentID, StartTime, EndTime) VALUES(?, ?, ?);", 
-              (student_id, start_time, end_time))
-    connection.commit()
-    print("Student availability added successfully!")
 
-def add_period():
-    global current_user_token
+    schedule = get_student_schedule(get_student_id(session.get_user_id()))
+    if not schedule:
+        print("Your schedule is empty.")
+        return True
+    for start_time, end_time, source in schedule:
+        print(f"{start_time} - {end_time} ({source})")
+    return True
+
+def read_time(prompt, default):
+    # Keep asking until the user types a time as HH:MM (or accepts the default)
+    while True:
+        value = input(prompt).strip() or default
+        try:
+            return datetime.strptime(value, "%H:%M").strftime("%H:%M")
+        except ValueError:
+            print("Invalid time. Please use HH:MM.")
+
+def read_percentage(prompt, default=100):
+    # Keep asking until the user types a whole number from 1 to 100 (or accepts the default)
+    while True:
+        value = input(prompt).strip()
+        if not value:
+            return default
+        if value.isdigit() and 0 < int(value) <= 100:
+            return int(value)
+        print("Invalid input. Please enter a whole number from 1 to 100.")
+
+def find_free_time():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "look up common free time")
+        class_id = read_id("Enter the class ID: ")
+        threshold = read_percentage("Percentage of students who must be free (default 100): ") / 100
+        day_start = read_time("Earliest start (HH:MM, default 08:00): ", "08:00")
+        day_end = read_time("Latest end (HH:MM, default 18:00): ", "18:00")
+        slots = services.class_free_slots(principal, class_id, threshold, day_start, day_end)
+    except ServiceError as e:
+        print(e)
+        return False
+    if not slots:
+        print("No common free time found.")
+        return False
+    for start_time, end_time, free_count in slots:
+        print(f"{start_time} - {end_time}: {free_count} students free")
+    return True
+
+def view_revision_plan():
     if session.is_logged_in() is False:
-        print("You must be logged in to add a period.")
+        print("You must be logged in to view your revision plan.")
         return False
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add periods.")
+
+    if not session.require_role("student"):
+        print("Entry denied! Only students have a revision plan.")
         return False
-    
-    start_time = input("Enter the start time (HH:MM): ")
-    end_time = input("Enter the end time (HH:MM): ")
-    class_id = int(input("Enter the class ID: "))
-    teacher_id = get_teacher_id(session.get_user_id())
-    
-    c.execute("INSERT INTO Periods(StartTime, EndTime, ClassID, TeacherID) VALUES(?, ?, ?, ?);", 
-              (start_time, end_time, class_id, teacher_id))
-    connection.commit()
-    print("Period added successfully!")
 
-    c.execute("""
-              SELECT StudentID FROM Students
-                WHERE UserID IN (SELECT UserID FROM Users WHERE SchoolID = (SELECT SchoolID FROM Classes WHERE ClassID = ?));
-                """, (class_id,))
-    students = c.fetchall()
-    for student in students:
-        c.execute("INSERT INTO StudentBusyTimes(StudentID, StartTime, EndTime) VALUES(?, ?, ?);", 
-                  (student[0], start_time, end_time))
-    connection.commit()
-    print("Busy times for students in the class have been updated successfully!")
-
-    return True
\ No newline at end of file
+    plan = get_plan(get_student_id(session.get_user_id()))
+    if not plan:
+        print("Nothing planned. Either you have no outstanding homework or no free time before it is due.")
+        return True
+    for plan_date, start_time, end_time, title, due_date in plan:
+        print(f"{plan_date} {start_time} - {end_time}: {title} (due {due_date})")
+    return True
@@ -0,0 +1,550 @@
+"""HTTP/JSON front end, so one process can serve a whole school at once.
+
+    REVISIONAPP_DB=tables.db python server.py --port 8080
+
+Log in with ``POST /login {"email": ..., "password": ...}`` and send the returned token as
+``Authorization: Bearer <token>`` on every other request. Each token has its own Principal,
+so concurrent users never share the terminal app's global session.
+
+The event loop only parses HTTP and routes requests. Every SQLite call runs on a bounded
+pool of worker threads, each with its own connections from databasee.pool, and password
+checks run on passwords.PasswordService. When the pool is saturated, new requests get a 503
+straight away instead of queueing without limit. Connections are HTTP/1.1 keep-alive.
+Quiz results are read from the analytics snapshots (see snapshots.py), which the server
+refreshes in the background.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import re
+import secrets
+import time
+
+from databasee import current_school, get_directory_read_cursor, load_principal
+from passwords import passwords, PasswordServiceBusy
+from planner import get_plan
+from school import get_student_schedule
+from services import ServiceError, PermissionDenied, NotFound, Conflict, InvalidInput
+from snapshots import SnapshotScheduler, SNAPSHOT_INTERVAL_SECONDS
+import services
+
+HOST = os.environ.get("REVISIONAPP_HOST", "127.0.0.1")
+PORT = int(os.environ.get("REVISIONAPP_PORT", "8080"))
+DB_WORKERS = int(os.environ.get("REVISIONAPP_DB_WORKERS", "8"))
+# Requests allowed to wait for or hold a DB worker before new ones are refused with 503
+DB_MAX_PENDING = DB_WORKERS * 16
+SESSION_TTL_SECONDS = 8 * 60 * 60
+# How often logging in also sweeps out expired tokens
+SESSION_PURGE_SECONDS = 5 * 60
+KEEPALIVE_TIMEOUT_SECONDS = 15
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+STATUS_REASONS = {
+    200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 401: "Unauthorized",
+    403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+    501: "Not Implemented", 503: "Service Unavailable",
+}
+
+ERROR_STATUS = {PermissionDenied: 403, NotFound: 404, Conflict: 409, InvalidInput: 400}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SessionStore:
+    """Login tokens and the UserID each one acts for, expiring after ``ttl`` seconds.
+
+    Only the UserID is kept: the Principal is loaded afresh for every request, so a change
+    to a user's school or admin rights applies to their very next request.
+    """
+
+    def __init__(self, ttl=SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._sessions = {}
+        self._next_purge = time.monotonic() + SESSION_PURGE_SECONDS
+
+    def create(self, user_id):
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self.purge(now)
+        token = secrets.token_urlsafe(32)
+        self._sessions[token] = (user_id, now + self.ttl)
+        return token
+
+    def get(self, token):
+        entry = self._sessions.get(token)
+        if entry is None:
+            return None
+        if entry[1] < time.monotonic():
+            del self._sessions[token]
+            return None
+        return entry[0]
+
+    def purge(self, now=None):
+        # Tokens nobody uses again would otherwise stay until the server restarts
+        now = time.monotonic() if now is None else now
+        self._sessions = {token: entry for token, entry in self._sessions.items() if entry[1] >= now}
+        self._next_purge = now + SESSION_PURGE_SECONDS
+
+    def delete(self, token):
+        self._sessions.pop(token, None)
+
+
+class DatabaseWorkers:
+    """Runs blocking SQLite calls on a fixed set of threads and sheds load beyond ``max_pending``."""
+
+    def __init__(self, workers=DB_WORKERS, max_pending=DB_MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="revisionapp-db")
+        self._slots = asyncio.Semaphore(max_pending)
+
+    async def run(self, fn, *args):
+        if self._slots.locked():
+            raise HttpError(503, "Server busy. Please try again in a moment.")
+        async with self._slots:
+            # run_in_executor does not carry context variables over, so the shard choice is passed explicitly
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+class Request:
+    def __init__(self, method, path, query, headers, body, params):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.params = params
+        self.token = None
+        self.principal = None
+
+    def field(self, name, default=KeyError):
+        """A field of the JSON body; 400 if it is missing and has no default."""
+        if not isinstance(self.body, dict) or name not in self.body:
+            if default is KeyError:
+                raise HttpError(400, f"Missing field '{name}'.")
+            return default
+        return self.body[name]
+
+
+ROUTES = []
+
+
+def route(method, pattern, login=True):
+    """Register an ``async handler(app, request)``; ``{name}`` in the pattern matches an integer ID."""
+    regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>\\d+)", pattern) + "$")
+
+    def register(handler):
+        ROUTES.append((method, regex, login, handler))
+        return handler
+    return register
+
+
+def _rows(rows, columns):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+# Accounts
+
+@route("POST", "/login", login=False)
+async def login(app, request):
+    email, password = request.field("email"), request.field("password")
+
+    def lookup():
+        with get_directory_read_cursor() as c:
+            return c.execute("SELECT UserID, PasswordHash FROM Users WHERE Email=?", (email,)).fetchone()
+    row = await app.db.run(lookup)
+    # Verified on the hashing pool, which refuses rather than queues when it is full. An unknown
+    # email costs the same verification, so response times do not reveal which emails are registered
+    if row is None:
+        await passwords.verify_absent_async(password)
+        raise HttpError(401, "Incorrect email or password.")
+    if not await passwords.verify_async(row[1], password):
+        raise HttpError(401, "Incorrect email or password.")
+    passwords.rehash_in_background(row[0], row[1], password)
+    principal = await app.db.run(load_principal, row[0])
+    return 200, {"token": app.sessions.create(principal.user_id), "user": _principal_json(principal)}
+
+
+@route("POST", "/logout")
+async def logout(app, request):
+    app.sessions.delete(request.token)
+    return 204, None
+
+
+@route("GET", "/me")
+async def me(app, request):
+    return 200, _principal_json(request.principal)
+
+
+def _principal_json(principal):
+    return {"user_id": principal.user_id, "role": principal.role, "school_id": principal.school_id,
+            "teacher_id": principal.teacher_id, "student_id": principal.student_id, "is_admin": principal.is_admin}
+
+
+# Students
+
+@route("GET", "/homework")
+async def homework(app, request):
+    rows = await app.db.run(services.list_homework, request.principal)
+    return 200, _rows(rows, ["homework_id", "title", "type", "due_date", "minutes", "class_id", "assignment_id"])
+
+
+@route("GET", "/quizzes/{quiz_id}/next")
+async def next_question(app, request):
+    question = await app.db.run(services.next_question, request.principal, request.params["quiz_id"])
+    if question is None:
+        return 200, {"finished": True}
+    question_id, text, options = question
+    return 200, {"finished": False, "question_id": question_id, "text": text, "options": json.loads(options)}
+
+
+@route("POST", "/quizzes/{quiz_id}/answers")
+async def submit_answer(app, request):
+    correct = await app.db.run(services.submit_answer, request.principal, request.params["quiz_id"],
+                               int(request.field("question_id")), str(request.field("answer")))
+    return 200, {"correct": correct}
+
+
+@route("POST", "/enrollment-requests")
+async def request_enrollment(app, request):
+    request_id = await app.db.run(services.request_enrollment, request.principal, int(request.field("class_id")))
+    return 201, {"request_id": request_id}
+
+
+@route("POST", "/school-join-requests")
+async def request_to_join_school(app, request):
+    request_id = await app.db.run(services.request_to_join_school, request.principal, int(request.field("school_id")))
+    return 201, {"request_id": request_id}
+
+
+@route("POST", "/busy-times")
+async def add_busy_time(app, request):
+    busy_id = await app.db.run(services.add_busy_time, request.principal,
+                               request.field("start_time"), request.field("end_time"))
+    return 201, {"busy_id": busy_id}
+
+
+@route("GET", "/schedule")
+async def schedule(app, request):
+    services.authorize(request.principal, "student", "view a schedule")
+    rows = await app.db.run(get_student_schedule, request.principal.student_id)
+    return 200, _rows(rows, ["start_time", "end_time", "source"])
+
+
+@route("GET", "/plan")
+async def plan(app, request):
+    services.authorize(request.principal, "student", "view a revision plan")
+    rows = await app.db.run(get_plan, request.principal.student_id)
+    return 200, _rows(rows, ["date", "start_time", "end_time", "title", "due_date"])
+
+
+# Teachers
+
+@route("POST", "/schools")
+async def create_school(app, request):
+    school_id = await app.db.run(services.create_school, request.principal, request.field("name"))
+    return 201, {"school_id": school_id}
+
+
+@route("POST", "/classes")
+async def create_class(app, request):
+    class_id = await app.db.run(services.create_class, request.principal, request.field("local_class_identifier"))
+    return 201, {"class_id": class_id}
+
+
+@route("POST", "/classes/{class_id}/teachers")
+async def assign_teacher(app, request):
+    await app.db.run(services.assign_teacher, request.principal, request.params["class_id"],
+                     request.field("teacher_id", None))
+    return 204, None
+
+
+@route("POST", "/classes/{class_id}/periods")
+async def create_period(app, request):
+    period_id = await app.db.run(services.create_period, request.principal, request.params["class_id"],
+                                 request.field("start_time"), request.field("end_time"), request.field("teacher_id", None))
+    return 201, {"period_id": period_id}
+
+
+@route("GET", "/classes/{class_id}/free-slots")
+async def free_slots(app, request):
+    threshold = float(request.query.get("threshold", 100)) / 100
+    slots = await app.db.run(services.class_free_slots, request.principal, request.params["class_id"], threshold,
+                             request.query.get("day_start", "08:00"), request.query.get("day_end", "18:00"))
+    return 200, _rows(slots, ["start_time", "end_time", "free_count"])
+
+
+@route("POST", "/enrollments")
+async def enroll_many(app, request):
+    pairs = [(item["student_id"], item["class_id"]) for item in request.field("enrollments")]
+    added = await app.db.run(services.enroll_many, request.principal, pairs)
+    return 200, {"added": added}
+
+
+@route("POST", "/rosters")
+async def sync_roster(app, request):
+    summary = await app.db.run(services.sync_roster, request.principal, request.field("rows"),
+                               bool(request.field("dry_run", False)))
+    return 200, summary
+
+
+@route("GET", "/enrollment-requests")
+async def pending_enrollment_requests(app, request):
+    rows = await app.db.run(services.pending_enrollment_requests, request.principal)
+    return 200, _rows(rows, ["request_id", "student_id", "class_id"])
+
+
+@route("POST", "/enrollment-requests/decisions")
+async def decide_enrollment_requests(app, request):
+    decided = await app.db.run(services.approve_requests, request.principal,
+                               request.field("request_ids"), bool(request.field("approved", True)))
+    return 200, {"decided": decided}
+
+
+@route("POST", "/enrollment-requests/batch-decisions")
+async def batch_decide_enrollment_requests(app, request):
+    summary = await app.db.run(
+        services.batch_decide_enrollment_requests, request.principal, bool(request.field("approved", True)),
+        request.field("class_id", None), request.field("year_group", None), request.field("email_domain", None),
+        request.field("older_than_days", None))
+    return 200, summary
+
+
+@route("GET", "/school-join-requests")
+async def pending_join_requests(app, request):
+    rows = await app.db.run(services.pending_join_requests, request.principal)
+    return 200, _rows(rows, ["request_id", "user_id", "first_name", "last_name", "email"])
+
+
+@route("POST", "/school-join-requests/decisions")
+async def decide_join_requests(app, request):
+    decided = await app.db.run(services.approve_join_requests, request.principal,
+                               request.field("request_ids"), bool(request.field("approved", True)))
+    return 200, {"decided": decided}
+
+
+@route("POST", "/school-join-requests/batch-decisions")
+async def batch_decide_join_requests(app, request):
+    summary = await app.db.run(
+        services.batch_decide_school_join_requests, request.principal, bool(request.field("approved", True)),
+        request.field("year_group", None), request.field("email_domain", None), request.field("older_than_days", None))
+    return 200, summary
+
+
+@route("POST", "/teachers")
+async def add_teacher_to_school(app, request):
+    user_id = await app.db.run(services.add_teacher_to_school, request.principal, request.field("email"))
+    return 200, {"user_id": user_id}
+
+
+@route("POST", "/homework")
+async def create_homework(app, request):
+    homework_id = await app.db.run(
+        services.create_homework, request.principal, int(request.field("class_id")), request.field("title"),
+        request.field("description", ""), request.field("minutes"), request.field("due_date"),
+        request.field("type"), request.field("assignment_id", None))
+    return 201, {"homework_id": homework_id}
+
+
+@route("GET", "/homework/{homework_id}/results")
+async def homework_results(app, request):
+    # Read from the analytics snapshot, so say how old it is
+    as_of, rows = await app.db.run(services.homework_results, request.principal, request.params["homework_id"])
+    return 200, {"as_of": as_of, "results": _rows(rows, ["student_id", "first_name", "last_name", "answered", "correct"])}
+
+
+@route("POST", "/quizzes")
+async def create_quiz(app, request):
+    quiz_id = await app.db.run(services.create_quiz, request.principal, int(request.field("class_id")),
+                               request.field("title"), request.field("question_ids"))
+    return 201, {"quiz_id": quiz_id}
+
+
+@route("POST", "/topics")
+async def add_topic(app, request):
+    topic_id = await app.db.run(services.add_topic, request.principal, request.field("name"))
+    return 201, {"topic_id": topic_id}
+
+
+@route("POST", "/questions")
+async def add_questions(app, request):
+    added = await app.db.run(services.add_questions, request.principal, request.field("questions"))
+    return 200, {"added": added}
+
+
+class App:
+    def __init__(self, db_workers=DB_WORKERS, max_pending=None):
+        self.db = DatabaseWorkers(db_workers, max_pending or db_workers * 16)
+        self.sessions = SessionStore()
+
+    async def dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        allowed = False
+        for route_method, regex, login, handler in ROUTES:
+            match = regex.match(url.path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method == method:
+                break
+        else:
+            raise HttpError(405 if allowed else 404, "Method not allowed." if allowed else "No such endpoint.")
+
+        try:
+            payload = json.loads(body) if body else None
+        except ValueError:
+            raise HttpError(400, "The body must be JSON.") from None
+        request = Request(method, url.path, {key: values[-1] for key, values in parse_qs(url.query).items()},
+                          headers, payload, {key: int(value) for key, value in match.groupdict().items()})
+        if login:
+            scheme, _, token = headers.get("authorization", "").partition(" ")
+            request.token = token.strip()
+            user_id = self.sessions.get(request.token) if scheme.lower() == "bearer" else None
+            # One indexed read, so school moves and admin changes made since login apply straight away
+            request.principal = await self.db.run(load_principal, user_id) if user_id is not None else None
+            if request.principal is None:
+                raise HttpError(401, "Log in first and send the token as 'Authorization: Bearer <token>'.")
+        # In sharded mode, this request's queries go to the user's school (copied into the DB workers by run())
+        current_school.set(request.principal.school_id if request.principal else None)
+        return await handler(self, request)
+
+    async def respond(self, method, target, headers, body):
+        try:
+            return await self.dispatch(method, target, headers, body)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except ServiceError as e:
+            return ERROR_STATUS.get(type(e), 400), {"error": str(e)}
+        except PasswordServiceBusy as e:
+            return 503, {"error": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {"error": f"Bad request: {e}"}
+        except Exception as e:
+            print(f"❌ {method} {target} failed: {e!r}")
+            return 500, {"error": "Internal server error."}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT_SECONDS)
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "Request headers too large."}, keep_alive=False)
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ")
+                except ValueError:
+                    await self._send(writer, 400, {"error": "Malformed request line."}, keep_alive=False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                if "transfer-encoding" in headers:
+                    await self._send(writer, 501, {"error": "Chunked requests are not supported."}, keep_alive=False)
+                    break
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self._send(writer, 413, {"error": "Request body too large."}, keep_alive=False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                status, payload = await self.respond(method.upper(), target, headers, body)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = b"" if payload is None else json.dumps(payload, default=_json_default).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: " + ("keep-alive" if keep_alive else "close"),
+        ]
+        if keep_alive:
+            head.append(f"Keep-Alive: timeout={KEEPALIVE_TIMEOUT_SECONDS}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    def shutdown(self):
+        self.db.shutdown()
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+async def serve(host=HOST, port=PORT, db_workers=DB_WORKERS, ready=None, snapshot_interval=SNAPSHOT_INTERVAL_SECONDS):
+    """Serve until cancelled. ``ready``, if given, is an asyncio.Event set once the socket is listening.
+
+    Analytics snapshots are refreshed every ``snapshot_interval`` seconds (0 turns them off).
+    """
+    app = App(db_workers)
+    snapshots = SnapshotScheduler(snapshot_interval)
+    server = await asyncio.start_server(app.handle_connection, host, port)
+    print(f"✅ Serving on http://{host}:{port} with {db_workers} DB workers")
+    snapshots.start()
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        snapshots.stop()
+        app.shutdown()
+        passwords.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Revision App over HTTP/JSON.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db-workers", type=int, default=DB_WORKERS)
+    parser.add_argument("--snapshot-seconds", type=float, default=SNAPSHOT_INTERVAL_SECONDS,
+                        help="refresh the analytics snapshots this often; 0 turns them off")
+    args = parser.parse_args()
+
+    from migrations import migrate
+    migrate()
+    try:
+        asyncio.run(serve(args.host, args.port, args.db_workers, snapshot_interval=args.snapshot_seconds))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
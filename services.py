@@ -0,0 +1,747 @@
+"""Headless versions of the school and homework actions.
+
+Every function takes the acting user's Principal (``databasee.current_principal()`` in the
+terminal app, ``databasee.load_principal(user_id)`` in a back-office job) plus plain
+arguments, and either returns a result or raises a ServiceError subclass. Nothing here reads
+input() or prints, so the menus in school.py and tasks.py and any batch job go through the
+same checks. Each action, including the batch variants, is one databasee.transaction() and
+commits once. Revision plans are rebuilt after that commit, in a transaction of their own,
+so planning never holds the write lock other writers are waiting for. Only actions that
+change a user's school also write to the directory, which in sharded mode is a separate
+database.
+"""
+from datetime import date, datetime
+import json
+import sqlite3
+
+from databasee import (DIFFICULTY_LEVELS, analytics_as_of, get_cursor, get_directory_cursor, get_directory_read_cursor,
+                       get_read_cursor, question_hash, select_in)
+from planner import plan_students, replan_class, replan_student
+from quiz_engine import engine as quiz_engine, quiz_homework_id
+import analytics
+import grading
+import scheduling
+import sharding
+
+HOMEWORK_TYPES = ["Quiz", "Assignment", "Project", "Other"]
+
+
+class ServiceError(Exception):
+    """Base class for the errors a service call reports back to its caller."""
+
+
+class PermissionDenied(ServiceError):
+    """The acting user is not logged in, has the wrong role, or is outside the school."""
+
+
+class NotFound(ServiceError):
+    """A referenced class, school, user, topic or request does not exist."""
+
+
+class Conflict(ServiceError):
+    """The change would duplicate something that already exists."""
+
+
+class InvalidInput(ServiceError, ValueError):
+    """An argument is malformed, e.g. a bad time, date or difficulty."""
+
+
+def authorize(actor, role=None, action="do this", admin=False):
+    """Raise PermissionDenied unless ``actor`` is logged in with ``role`` (and is a school admin if ``admin``)."""
+    if actor is None:
+        raise PermissionDenied(f"You must be logged in to {action}.")
+    if role is not None and actor.role != role:
+        raise PermissionDenied(f"Entry denied! Only {role}s can {action}.")
+    if admin and not actor.is_admin:
+        raise PermissionDenied(f"Entry denied! Only school admins can {action}.")
+
+
+def _school_of(actor, action):
+    if actor.school_id is None:
+        raise PermissionDenied(f"You must be associated with a school to {action}.")
+    return actor.school_id
+
+
+def _check_classes(c, actor, class_ids):
+    """Raise unless every class exists and belongs to the actor's school."""
+    class_ids = set(class_ids)
+    schools = dict(select_in(c, "SELECT ClassID, SchoolID FROM Classes WHERE ClassID IN ({ids})", class_ids))
+    for class_id in class_ids:
+        if class_id not in schools:
+            raise NotFound(f"Class {class_id} does not exist.")
+        if schools[class_id] != actor.school_id:
+            raise PermissionDenied(f"Entry denied! Class {class_id} belongs to another school.")
+
+
+def _check_teaches(c, actor, class_id):
+    """Raise unless the class belongs to the actor's school and the actor teaches it (admins see every class)."""
+    _check_classes(c, actor, [class_id])
+    if actor.is_admin:
+        return
+    if c.execute("SELECT 1 FROM ClassTeachers WHERE ClassID=? AND TeacherID=?", (class_id, actor.teacher_id)).fetchone() is None:
+        raise PermissionDenied(f"Entry denied! You do not teach class {class_id}.")
+
+
+def _check_teacher(c, actor, teacher_id):
+    """Raise unless the teacher exists and belongs to the actor's school."""
+    row = c.execute("""
+        SELECT u.SchoolID FROM Teachers t JOIN Users u ON u.UserID = t.UserID
+        WHERE t.TeacherID=?
+    """, (teacher_id,)).fetchone()
+    if row is None:
+        raise NotFound(f"Teacher {teacher_id} does not exist.")
+    if row[0] != actor.school_id:
+        raise PermissionDenied("Entry denied! The teacher must belong to the same school as the class.")
+
+
+def _time(value):
+    try:
+        return datetime.strptime(str(value).strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        raise InvalidInput(f"Invalid time '{value}'. Use HH:MM.") from None
+
+
+def _time_range(start_time, end_time):
+    start_time, end_time = _time(start_time), _time(end_time)
+    if start_time >= end_time:
+        raise InvalidInput("The end time must be after the start time.")
+    return start_time, end_time
+
+
+def _begin_write(c):
+    # Take the write lock before reading, so the rows a batch reads are the ones it then changes
+    if not c.connection.in_transaction:
+        c.execute("BEGIN IMMEDIATE;")
+
+
+# Schools and classes
+
+def create_school(actor, school_name):
+    """Create a school with ``actor`` as its admin. Returns the new SchoolID."""
+    authorize(actor, "teacher", "add schools")
+    if actor.is_admin:
+        raise PermissionDenied("Entry denied! You are already a school admin. Leave the school admin role to add a new school.")
+    school_name = school_name.strip()
+    if not school_name:
+        raise InvalidInput("School name cannot be empty.")
+    with get_directory_cursor() as c:
+        try:
+            c.execute("INSERT INTO Schools(SchoolName) VALUES(?);", (school_name,))
+        except sqlite3.IntegrityError:
+            raise Conflict(f"A school called '{school_name}' already exists.") from None
+        school_id = c.lastrowid
+        c.execute("UPDATE Users SET IsSchoolAdmin = TRUE, SchoolID = ? WHERE UserID = ?;", (school_id, actor.user_id))
+    sharding.create_shard(school_id)
+    sharding.move_users({actor.user_id: actor.school_id})
+    return school_id
+
+
+def create_class(actor, local_class_identifier):
+    """Add a class to the actor's school. Returns the new ClassID."""
+    authorize(actor, "teacher", "add classes")
+    school_id = _school_of(actor, "add a class")
+    local_class_identifier = local_class_identifier.strip()
+    if not local_class_identifier:
+        raise InvalidInput("Local class identifier cannot be empty.")
+    with get_cursor() as c:
+        if c.execute("SELECT 1 FROM Classes WHERE SchoolID=? AND LocalClassIdentifier=?",
+                     (school_id, local_class_identifier)).fetchone():
+            raise Conflict("This class identifier already exists. Please choose a different one.")
+        c.execute("INSERT INTO Classes(LocalClassIdentifier, SchoolID) VALUES(?, ?);", (local_class_identifier, school_id))
+        return c.lastrowid
+
+
+def assign_teacher(actor, class_id, teacher_id=None):
+    """Add a teacher (the actor by default) to one of the admin's classes."""
+    authorize(actor, "teacher", "add teachers to classes", admin=True)
+    teacher_id = teacher_id or actor.teacher_id
+    with get_cursor() as c:
+        _check_classes(c, actor, [class_id])
+        _check_teacher(c, actor, teacher_id)
+        if c.execute("SELECT 1 FROM ClassTeachers WHERE ClassID=? AND TeacherID=?", (class_id, teacher_id)).fetchone():
+            raise Conflict("This teacher is already assigned to this class.")
+        c.execute("INSERT INTO ClassTeachers(ClassID, TeacherID) VALUES(?, ?);", (class_id, teacher_id))
+
+
+def add_teacher_to_school(actor, email):
+    """Bring the teacher with ``email`` into the admin's school. Returns their UserID.
+
+    Only teachers without a school can be added this way; anyone else asks to join with
+    request_to_join_school, so nobody is moved between schools without their consent.
+    """
+    authorize(actor, "teacher", "add teachers to schools", admin=True)
+    with get_directory_cursor() as c:
+        row = c.execute("SELECT UserID, SchoolID, UserRole FROM Users WHERE Email=?", (email.strip(),)).fetchone()
+        if row is None or row[2].lower() != "teacher":
+            raise NotFound("Teacher not found. Please check the email and try again.")
+        if row[1] == actor.school_id:
+            raise Conflict("That teacher is already in your school.")
+        if row[1] is not None:
+            raise PermissionDenied("That teacher belongs to another school. They can ask to join yours instead.")
+        c.execute("UPDATE Users SET SchoolID = ? WHERE UserID = ?;", (actor.school_id, row[0]))
+    sharding.move_users({row[0]: row[1]})
+    return row[0]
+
+
+# Enrollment
+
+def enroll(actor, student_id, class_id):
+    """Enroll one student. Returns False if they were already in the class."""
+    return enroll_many(actor, [(student_id, class_id)]) == 1
+
+
+def enroll_many(actor, enrollments):
+    """Enroll ``(student_id, class_id)`` pairs in one transaction. Returns how many were new.
+
+    Every class and student is checked against the actor's school up front, with one query
+    per kind rather than one per pair; pairs already enrolled are skipped, so re-running a
+    batch is harmless. The new students are re-planned once at the end.
+    """
+    authorize(actor, "teacher", "add students to classes")
+    _school_of(actor, "add students to classes")
+    enrollments = list(dict.fromkeys((int(student_id), int(class_id)) for student_id, class_id in enrollments))
+    if not enrollments:
+        return 0
+    class_ids = {class_id for _, class_id in enrollments}
+    student_ids = {student_id for student_id, _ in enrollments}
+    with get_cursor() as c:
+        _check_classes(c, actor, class_ids)
+        schools = dict(select_in(c, """
+            SELECT s.StudentID, u.SchoolID FROM Students s JOIN Users u ON u.UserID = s.UserID
+            WHERE s.StudentID IN ({ids})
+        """, student_ids))
+        for student_id in student_ids:
+            if student_id not in schools:
+                raise NotFound(f"Student {student_id} does not exist.")
+            if schools[student_id] != actor.school_id:
+                raise PermissionDenied(f"Entry denied! Student {student_id} belongs to another school.")
+        existing = set(select_in(c, "SELECT StudentID, ClassID FROM Enrollment WHERE ClassID IN ({ids})", class_ids))
+        added = [pair for pair in enrollments if pair not in existing]
+        c.executemany("INSERT INTO Enrollment(StudentID, ClassID) VALUES(?, ?);", added)
+    # The classes' periods and homework are now part of these students' weeks
+    plan_students([student_id for student_id, _ in added])
+    return len(added)
+
+
+def sync_roster(actor, roster, dry_run=False):
+    """Make the enrollments of every class named in ``roster`` match it exactly.
+
+    ``roster`` is ``(class, student)`` pairs, e.g. the rows of an exported class list: the
+    class by LocalClassIdentifier or ClassID, the student by email or StudentID, all in the
+    actor's school. Students missing from a named class are removed; classes not named are
+    left alone. Current enrollments are diffed in memory and only the changes are written, in
+    one transaction, so re-running the same roster changes nothing. Any row that does not
+    resolve fails the whole sync. Returns ``{"classes": n, "added": n, "removed": n, "unchanged": n}``;
+    with ``dry_run`` nothing is written.
+    """
+    authorize(actor, "teacher", "sync class rosters")
+    school_id = _school_of(actor, "sync class rosters")
+    with get_cursor() as c:
+        if not dry_run:
+            _begin_write(c)
+        by_identifier, class_ids = {}, set()
+        for class_id, identifier in c.execute("SELECT ClassID, LocalClassIdentifier FROM Classes WHERE SchoolID=?", (school_id,)):
+            by_identifier[str(identifier).strip().casefold()] = class_id
+            class_ids.add(class_id)
+        by_email, student_ids = {}, set()
+        for student_id, email in c.execute("""
+            SELECT s.StudentID, u.Email FROM Students s JOIN Users u ON u.UserID = s.UserID WHERE u.SchoolID=?
+        """, (school_id,)):
+            by_email[str(email).strip().casefold()] = student_id
+            student_ids.add(student_id)
+
+        desired, errors = set(), []
+        for row_number, (class_ref, student_ref) in enumerate(roster, start=1):
+            class_key, student_key = str(class_ref).strip().casefold(), str(student_ref).strip().casefold()
+            class_id = by_identifier.get(class_key)
+            if class_id is None and class_key.isdigit() and int(class_key) in class_ids:
+                class_id = int(class_key)
+            student_id = by_email.get(student_key)
+            if student_id is None and student_key.isdigit() and int(student_key) in student_ids:
+                student_id = int(student_key)
+            if class_id is None:
+                errors.append(f"row {row_number}: no class '{class_ref}' in your school")
+            elif student_id is None:
+                errors.append(f"row {row_number}: no student '{student_ref}' in your school")
+            else:
+                desired.add((student_id, class_id))
+        if errors:
+            more = f" (and {len(errors) - 5} more)" if len(errors) > 5 else ""
+            raise InvalidInput("Roster not synced: " + "; ".join(errors[:5]) + more + ".")
+
+        named = {class_id for _, class_id in desired}
+        current = set(select_in(c, "SELECT StudentID, ClassID FROM Enrollment WHERE ClassID IN ({ids})", named))
+        added, removed = sorted(desired - current), sorted(current - desired)
+        if not dry_run:
+            c.executemany("INSERT INTO Enrollment(StudentID, ClassID) VALUES(?, ?);", added)
+            c.executemany("DELETE FROM Enrollment WHERE StudentID=? AND ClassID=?;", removed)
+    if not dry_run:
+        plan_students([student_id for student_id, _ in added + removed])
+    return {"classes": len(named), "added": len(added), "removed": len(removed), "unchanged": len(desired & current)}
+
+
+def request_enrollment(actor, class_id):
+    """File the actor's request to join a class. Returns the RequestID."""
+    authorize(actor, "student", "request to join classes")
+    with get_cursor() as c:
+        row = c.execute("SELECT SchoolID FROM Classes WHERE ClassID=?", (class_id,)).fetchone()
+        if row is None:
+            raise NotFound("Class does not exist. Please check the class ID and try again.")
+        if row[0] != actor.school_id:
+            raise PermissionDenied("Entry denied! You can only request to join classes in your school.")
+        if c.execute("SELECT 1 FROM Enrollment WHERE StudentID=? AND ClassID=?", (actor.student_id, class_id)).fetchone():
+            raise Conflict("You are already enrolled in this class.")
+        c.execute("INSERT INTO EnrollmentRequests(StudentID, ClassID) VALUES(?, ?);", (actor.student_id, class_id))
+        return c.lastrowid
+
+
+def pending_enrollment_requests(actor):
+    """``(RequestID, StudentID, ClassID)`` for the pending requests the actor may decide."""
+    authorize(actor, "teacher", "approve enrollment requests")
+    with get_read_cursor() as c:
+        if actor.is_admin:
+            return c.execute("""
+                SELECT r.RequestID, r.StudentID, r.ClassID FROM EnrollmentRequests r
+                JOIN Classes cl ON cl.ClassID = r.ClassID
+                WHERE r.Status='Pending' AND cl.SchoolID=?
+            """, (actor.school_id,)).fetchall()
+        return c.execute("""
+            SELECT RequestID, StudentID, ClassID FROM EnrollmentRequests
+            WHERE Status='Pending' AND ClassID IN (SELECT ClassID FROM ClassTeachers WHERE TeacherID=?)
+        """, (actor.teacher_id,)).fetchall()
+
+
+def approve_requests(actor, request_ids, approved=True):
+    """Approve (enrolling the students) or deny enrollment requests in one transaction.
+
+    Requests that are no longer pending are skipped. The actor must teach each request's
+    class or be an admin of its school. Returns how many requests were decided.
+    """
+    authorize(actor, "teacher", "approve enrollment requests")
+    request_ids = list(dict.fromkeys(request_ids))
+    with get_cursor() as c:
+        requests = select_in(c, """
+            SELECT r.RequestID, r.StudentID, r.ClassID, cl.SchoolID FROM EnrollmentRequests r
+            JOIN Classes cl ON cl.ClassID = r.ClassID
+            WHERE r.Status='Pending' AND r.RequestID IN ({ids})
+        """, request_ids)
+        taught = {row[0] for row in c.execute("SELECT ClassID FROM ClassTeachers WHERE TeacherID=?", (actor.teacher_id,))}
+        for request_id, _, class_id, school_id in requests:
+            if class_id not in taught and not (actor.is_admin and school_id == actor.school_id):
+                raise PermissionDenied(f"Entry denied! You cannot decide request {request_id}.")
+        if approved:
+            pairs = {(student_id, class_id) for _, student_id, class_id, _ in requests}
+            existing = set(select_in(c, "SELECT StudentID, ClassID FROM Enrollment WHERE ClassID IN ({ids})",
+                                      {class_id for _, class_id in pairs}))
+            c.executemany("INSERT INTO Enrollment(StudentID, ClassID) VALUES(?, ?);", sorted(pairs - existing))
+        c.executemany("UPDATE EnrollmentRequests SET Status=? WHERE RequestID=?;",
+                      [("Approved" if approved else "Denied", request[0]) for request in requests])
+    if approved:
+        plan_students([request[1] for request in requests])
+    return len(requests)
+
+
+def decide_enrollment_request(actor, request_id, approved):
+    """Approve or deny one enrollment request. Returns False if it was not pending."""
+    return approve_requests(actor, [request_id], approved) == 1
+
+
+def _request_filters(year_group, email_domain, older_than_days):
+    """SQL conditions and parameters for the filters the batch deciders share, on ``s`` (Students) and ``u`` (Users)."""
+    clauses, params = [], []
+    if year_group is not None:
+        clauses.append("s.YearGroup = ?")
+        params.append(int(year_group))
+    if email_domain:
+        domain = str(email_domain).strip().lstrip("@").lower()
+        if not domain or "@" in domain:
+            raise InvalidInput(f"Invalid email domain '{email_domain}'.")
+        clauses.append("lower(substr(u.Email, instr(u.Email, '@') + 1)) = ?")
+        params.append(domain)
+    if older_than_days is not None:
+        if int(older_than_days) < 0:
+            raise InvalidInput("The request age must be zero or more days.")
+        clauses.append("r.RequestDate <= date('now', ?)")
+        params.append(f"-{int(older_than_days)} days")
+    return clauses, params
+
+
+def batch_decide_enrollment_requests(actor, approved=True, class_id=None, year_group=None, email_domain=None,
+                                     older_than_days=None):
+    """Approve or deny every pending enrollment request the actor may decide that matches all the filters.
+
+    ``email_domain`` matches the student's email after the @, ``older_than_days`` requests
+    filed at least that many days ago. The students are enrolled and the requests marked with
+    one set-based statement each, in one transaction. Returns a summary:
+    ``{"decided": n, "enrolled": n, "by_class": {ClassID: n}}``.
+    """
+    authorize(actor, "teacher", "approve enrollment requests")
+    clauses, params = _request_filters(year_group, email_domain, older_than_days)
+    if actor.is_admin:
+        clauses.insert(0, "cl.SchoolID = ?")
+        params.insert(0, actor.school_id)
+    else:
+        clauses.insert(0, "r.ClassID IN (SELECT ClassID FROM ClassTeachers WHERE TeacherID = ?)")
+        params.insert(0, actor.teacher_id)
+    if class_id is not None:
+        clauses.append("r.ClassID = ?")
+        params.append(int(class_id))
+    matching = f"""
+        FROM EnrollmentRequests r
+        JOIN Classes cl ON cl.ClassID = r.ClassID
+        JOIN Students s ON s.StudentID = r.StudentID
+        JOIN Users u ON u.UserID = s.UserID
+        WHERE r.Status = 'Pending' AND {" AND ".join(clauses)}
+    """
+    enrolled = 0
+    with get_cursor() as c:
+        _begin_write(c)
+        requests = c.execute(f"SELECT r.RequestID, r.StudentID, r.ClassID {matching}", params).fetchall()
+        if approved and requests:
+            enrolled = c.execute(f"""
+                INSERT INTO Enrollment(StudentID, ClassID)
+                SELECT DISTINCT r.StudentID, r.ClassID {matching}
+                AND NOT EXISTS (SELECT 1 FROM Enrollment e WHERE e.StudentID = r.StudentID AND e.ClassID = r.ClassID)
+            """, params).rowcount
+        c.execute(f"UPDATE EnrollmentRequests SET Status = ? WHERE RequestID IN (SELECT r.RequestID {matching})",
+                  ("Approved" if approved else "Denied", *params))
+    if approved:
+        plan_students({student_id for _, student_id, _ in requests})
+    by_class = {}
+    for _, _, request_class_id in requests:
+        by_class[request_class_id] = by_class.get(request_class_id, 0) + 1
+    return {"decided": len(requests), "enrolled": enrolled, "by_class": by_class}
+
+
+# School membership
+
+def request_to_join_school(actor, school_id):
+    """File the actor's request to join a school. Returns the RequestID."""
+    authorize(actor, action="request to join a school")
+    with get_directory_cursor() as c:
+        if c.execute("SELECT 1 FROM Schools WHERE SchoolID=?", (school_id,)).fetchone() is None:
+            raise NotFound("School does not exist. Please check the school ID and try again.")
+        c.execute("INSERT INTO SchoolJoinRequests(UserID, SchoolID) VALUES(?, ?);", (actor.user_id, school_id))
+        return c.lastrowid
+
+
+def pending_join_requests(actor):
+    """``(RequestID, UserID, FirstName, LastName, Email)`` for the admin's pending school join requests."""
+    authorize(actor, action="approve school join requests", admin=True)
+    with get_directory_read_cursor() as c:
+        return c.execute("""
+            SELECT r.RequestID, r.UserID, u.FirstName, u.LastName, u.Email
+            FROM SchoolJoinRequests r JOIN Users u ON u.UserID = r.UserID
+            WHERE r.Status='Pending' AND r.SchoolID=?
+        """, (actor.school_id,)).fetchall()
+
+
+def approve_join_requests(actor, request_ids, approved=True):
+    """Approve (moving the users into the school) or deny the admin's school join requests. Returns how many were decided."""
+    authorize(actor, action="approve school join requests", admin=True)
+    request_ids = list(dict.fromkeys(request_ids))
+    with get_directory_cursor() as c:
+        requests = select_in(c, """
+            SELECT r.RequestID, r.UserID, r.SchoolID, u.SchoolID FROM SchoolJoinRequests r
+            JOIN Users u ON u.UserID = r.UserID
+            WHERE r.Status='Pending' AND r.RequestID IN ({ids})
+        """, request_ids)
+        for request_id, _, school_id, _ in requests:
+            if school_id != actor.school_id:
+                raise PermissionDenied(f"Entry denied! Request {request_id} is for another school.")
+        if approved:
+            c.executemany("UPDATE Users SET SchoolID=? WHERE UserID=?;",
+                          [(school_id, user_id) for _, user_id, school_id, _ in requests])
+        c.executemany("UPDATE SchoolJoinRequests SET Status=? WHERE RequestID=?;",
+                      [("Approved" if approved else "Denied", request[0]) for request in requests])
+    if approved:
+        sharding.move_users({user_id: previous_school_id for _, user_id, _, previous_school_id in requests})
+    return len(requests)
+
+
+def decide_school_join_request(actor, request_id, approved):
+    """Approve or deny one school join request. Returns False if it was not pending."""
+    return approve_join_requests(actor, [request_id], approved) == 1
+
+
+def batch_decide_school_join_requests(actor, approved=True, year_group=None, email_domain=None, older_than_days=None):
+    """Approve or deny every pending request to join the admin's school that matches all the filters.
+
+    ``year_group`` only matches students. Users are moved into the school and the requests
+    marked with one set-based statement each, in one transaction. Returns a summary:
+    ``{"decided": n, "joined": n}``.
+    """
+    authorize(actor, action="approve school join requests", admin=True)
+    clauses, params = _request_filters(year_group, email_domain, older_than_days)
+    matching = f"""
+        FROM SchoolJoinRequests r
+        JOIN Users u ON u.UserID = r.UserID
+        LEFT JOIN Students s ON s.UserID = r.UserID
+        WHERE r.Status = 'Pending' AND r.SchoolID = ? {"".join(" AND " + clause for clause in clauses)}
+    """
+    params = [actor.school_id, *params]
+    with get_directory_cursor() as c:
+        _begin_write(c)
+        # Read before the writes below change SchoolID, since move_users needs each user's previous school
+        requests = c.execute(f"SELECT r.RequestID, r.UserID, u.SchoolID {matching}", params).fetchall()
+        if not requests:
+            return {"decided": 0, "joined": 0}
+        joined = 0
+        if approved:
+            joined = c.execute(f"""
+                UPDATE Users SET SchoolID = ?
+                WHERE UserID IN (SELECT r.UserID {matching}) AND SchoolID IS NOT ?
+            """, (actor.school_id, *params, actor.school_id)).rowcount
+        c.execute(f"UPDATE SchoolJoinRequests SET Status = ? WHERE RequestID IN (SELECT r.RequestID {matching})",
+                  ("Approved" if approved else "Denied", *params))
+    if approved:
+        sharding.move_users({user_id: previous_school_id for _, user_id, previous_school_id in requests})
+    return {"decided": len(requests), "joined": joined}
+
+
+# Timetable
+
+def create_period(actor, class_id, start_time, end_time, teacher_id=None):
+    """Add a period (taught by the actor by default) to a class and re-plan its students. Returns the PeriodID."""
+    authorize(actor, "teacher", "add periods")
+    start_time, end_time = _time_range(start_time, end_time)
+    teacher_id = teacher_id or actor.teacher_id
+    with get_cursor() as c:
+        _check_classes(c, actor, [class_id])
+        _check_teacher(c, actor, teacher_id)
+        # Enrolled students see the period through the StudentSchedule view, so no per-student rows are needed
+        c.execute("INSERT INTO Periods(StartTime, EndTime, ClassID, TeacherID) VALUES(?, ?, ?, ?);",
+                  (start_time, end_time, class_id, teacher_id))
+        period_id = c.lastrowid
+    replan_class(class_id)
+    return period_id
+
+
+def add_busy_time(actor, start_time, end_time):
+    """Record a time the student is busy and re-plan their revision. Returns the BusyID."""
+    authorize(actor, "student", "add their busy periods")
+    start_time, end_time = _time_range(start_time, end_time)
+    with get_cursor() as c:
+        c.execute("INSERT INTO StudentBusyTimes(StudentID, StartTime, EndTime) VALUES(?, ?, ?);",
+                  (actor.student_id, start_time, end_time))
+        busy_id = c.lastrowid
+    replan_student(actor.student_id)
+    return busy_id
+
+
+def class_free_slots(actor, class_id, threshold=1.0, day_start="08:00", day_end="18:00"):
+    """When at least ``threshold`` of a class the actor teaches are free: ``[(StartTime, EndTime, FreeCount), ...]``."""
+    authorize(actor, "teacher", "look up common free time")
+    day_start, day_end = _time_range(day_start, day_end)
+    if not 0 < threshold <= 1:
+        raise InvalidInput("The percentage of students must be between 1 and 100.")
+    with get_read_cursor() as c:
+        _check_teaches(c, actor, class_id)
+    return scheduling.class_free_slots(class_id, day_start=day_start, day_end=day_end, threshold=threshold)
+
+
+# Homework and quizzes
+
+def create_homework(actor, class_id, title, description, time_to_complete, due_date, homework_type, assignment_id=None):
+    """Set homework for a class and re-plan its students. Returns the HomeworkID.
+
+    ``due_date`` is a date (or an ISO string); a Quiz needs the ``assignment_id`` of an
+    existing quiz in the actor's school.
+    """
+    authorize(actor, "teacher", "add homework tasks")
+    try:
+        time_to_complete = int(time_to_complete)
+    except (TypeError, ValueError):
+        time_to_complete = 0
+    if time_to_complete <= 0:
+        raise InvalidInput("Time must be a positive integer.")
+    if isinstance(due_date, str):
+        try:
+            due_date = date.fromisoformat(due_date)
+        except ValueError:
+            raise InvalidInput(f"Invalid due date '{due_date}'. Use YYYY-MM-DD.") from None
+    if due_date < date.today():
+        raise InvalidInput("Due date cannot be in the past.")
+    if homework_type not in HOMEWORK_TYPES:
+        raise InvalidInput(f"Homework type must be one of {', '.join(HOMEWORK_TYPES)}.")
+    with get_cursor() as c:
+        _check_classes(c, actor, [class_id])
+        if homework_type == "Quiz":
+            row = c.execute("""
+                SELECT cl.SchoolID FROM Quizzes q JOIN Classes cl ON cl.ClassID = q.ClassID WHERE q.QuizID=?
+            """, (assignment_id,)).fetchone()
+            if row is None or row[0] != actor.school_id:
+                raise NotFound("Quiz ID does not exist. Create a new quiz first then add the homework task.")
+        c.execute("""
+            INSERT INTO HomeworkTasks(Title, Description, TimeToComplete, DueDate, HomeworkType, ClassID, TeacherID, AssignmentID)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?);
+        """, (title, description, time_to_complete, due_date, homework_type, class_id, actor.teacher_id, assignment_id))
+        homework_id = c.lastrowid
+    replan_class(class_id)
+    return homework_id
+
+
+def list_homework(actor):
+    """Upcoming homework for a student's classes, or for the classes a teacher teaches.
+
+    ``[(HomeworkID, Title, HomeworkType, DueDate, TimeToComplete, ClassID, AssignmentID), ...]``, soonest first.
+    """
+    authorize(actor, action="view homework")
+    if actor.role == "student":
+        classes_sql, person_id = "SELECT ClassID FROM Enrollment WHERE StudentID=?", actor.student_id
+    else:
+        classes_sql, person_id = "SELECT ClassID FROM ClassTeachers WHERE TeacherID=?", actor.teacher_id
+    with get_read_cursor() as c:
+        return c.execute(f"""
+            SELECT HomeworkID, Title, HomeworkType, DueDate, TimeToComplete, ClassID, AssignmentID
+            FROM HomeworkTasks
+            WHERE ClassID IN ({classes_sql}) AND DueDate >= ?
+            ORDER BY DueDate, HomeworkID
+        """, (person_id, date.today().isoformat())).fetchall()
+
+
+def homework_results(actor, homework_id):
+    """Per-student scores for homework set for a class the actor teaches, as ``(as_of, rows)``.
+
+    ``rows`` is grading.homework_results(); ``as_of`` is when the analytics snapshot they
+    come from was taken, or None if they were read live.
+    """
+    authorize(actor, "teacher", "view quiz results")
+    with get_read_cursor() as c:
+        row = c.execute("SELECT ClassID FROM HomeworkTasks WHERE HomeworkID=?", (homework_id,)).fetchone()
+        if row is None:
+            raise NotFound(f"Homework {homework_id} does not exist.")
+        _check_teaches(c, actor, row[0])
+    return analytics_as_of(), grading.homework_results(homework_id)
+
+
+def class_mastery(actor, class_id):
+    """analytics.class_mastery() for a class the actor teaches."""
+    authorize(actor, "teacher", "view topic mastery")
+    with get_read_cursor() as c:
+        _check_teaches(c, actor, class_id)
+    return analytics.class_mastery(class_id)
+
+
+def _check_quiz_access(actor, quiz_id):
+    """The HomeworkID the student answers the quiz under."""
+    authorize(actor, "student", "take quizzes")
+    with get_read_cursor() as c:
+        homework_id = quiz_homework_id(c, actor.student_id, quiz_id)
+    if homework_id is None:
+        raise NotFound(f"Quiz {quiz_id} is not set as homework for any of your classes.")
+    return homework_id
+
+
+def next_question(actor, quiz_id):
+    """The student's next adaptive question, ``(QuestionID, QuestionText, AnswerOptions)``, or None when finished."""
+    homework_id = _check_quiz_access(actor, quiz_id)
+    return quiz_engine.next_question(actor.student_id, quiz_id, homework_id)
+
+
+def submit_answer(actor, quiz_id, question_id, answer_given):
+    """Record and grade the student's answer. Returns whether it was correct."""
+    homework_id = _check_quiz_access(actor, quiz_id)
+    if not quiz_engine.has_question(quiz_id, question_id):
+        raise NotFound(f"Question {question_id} is not in quiz {quiz_id}.")
+    return quiz_engine.record_answer(actor.student_id, quiz_id, homework_id, question_id, answer_given)
+
+
+def create_quiz(actor, class_id, title, question_ids):
+    """Create a quiz for a class from questions in the school's pool. Returns the QuizID."""
+    authorize(actor, "teacher", "create quizzes")
+    question_ids = list(dict.fromkeys(int(question_id) for question_id in question_ids))
+    with get_cursor() as c:
+        _check_classes(c, actor, [class_id])
+        found = {row[0] for row in select_in(c, "SELECT QuestionID FROM QuizQuestions WHERE SchoolID=? AND QuestionID IN ({ids})",
+                                              question_ids, (actor.school_id,))}
+        missing = [question_id for question_id in question_ids if question_id not in found]
+        if missing:
+            raise NotFound(f"Questions not in your school's pool: {', '.join(map(str, missing))}")
+        c.execute("INSERT INTO Quizzes (Title, ClassID, TeacherID) VALUES (?, ?, ?)", (title, class_id, actor.teacher_id))
+        quiz_id = c.lastrowid
+        c.executemany("INSERT INTO QuizQuestionAssignments (QuizID, QuestionID) VALUES (?, ?)",
+                      [(quiz_id, question_id) for question_id in question_ids])
+    return quiz_id
+
+
+def add_topic(actor, topic_name):
+    """Add a topic to the school's question pool. Returns the TopicID."""
+    authorize(actor, "teacher", "add topics")
+    school_id = _school_of(actor, "add topics")
+    topic_name = topic_name.strip()
+    if not topic_name:
+        raise InvalidInput("Topic name cannot be empty.")
+    with get_cursor() as c:
+        try:
+            c.execute("INSERT INTO QuestionTopics (SchoolID, TopicName) VALUES (?, ?)", (school_id, topic_name))
+        except sqlite3.IntegrityError:
+            raise Conflict(f"Topic '{topic_name}' already exists in your school.") from None
+        return c.lastrowid
+
+
+def _question_row(school_id, question):
+    difficulty = str(question["difficulty"]).capitalize()
+    if difficulty not in DIFFICULTY_LEVELS:
+        raise InvalidInput(f"Invalid difficulty '{question['difficulty']}'. Use Easy, Medium or Hard.")
+    question_text = str(question["question_text"]).strip()
+    if not question_text:
+        raise InvalidInput("Question text cannot be empty.")
+    options = [str(option).strip() for option in question["options"]]
+    topic_id = int(question["topic_id"])
+    return (school_id, topic_id, question_text, difficulty, json.dumps(options),
+            str(question["correct_answer"]).strip(), question_hash(topic_id, question_text))
+
+
+def add_question(actor, topic_id, question_text, difficulty, options, correct_answer):
+    """Add one question to the school's pool. Returns the QuestionID."""
+    authorize(actor, "teacher", "add quiz questions")
+    school_id = _school_of(actor, "add quiz questions")
+    row = _question_row(school_id, {"topic_id": topic_id, "question_text": question_text, "difficulty": difficulty,
+                                    "options": options, "correct_answer": correct_answer})
+    with get_cursor() as c:
+        if c.execute("SELECT 1 FROM QuestionTopics WHERE TopicID=? AND SchoolID=?", (row[1], school_id)).fetchone() is None:
+            raise NotFound(f"Topic {row[1]} does not exist in your school.")
+        if c.execute("SELECT 1 FROM QuizQuestions WHERE SchoolID = ? AND ContentHash = ?", (school_id, row[-1])).fetchone():
+            raise Conflict("This question already exists in that topic.")
+        c.execute("""
+            INSERT INTO QuizQuestions (
+                SchoolID, TopicID, QuestionText, DifficultyLevel, AnswerOptions, CorrectAnswer, ContentHash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, row)
+        return c.lastrowid
+
+
+def add_questions(actor, questions):
+    """Add many questions in one transaction. Returns how many were new.
+
+    Each question is a mapping with ``topic_id``, ``question_text``, ``difficulty``,
+    ``options`` and ``correct_answer``. Everything is validated before anything is written;
+    questions already in the pool (same topic and text) are skipped. For spreadsheets, use
+    tasks.upsert_questions, which also creates topics and updates existing questions.
+    """
+    authorize(actor, "teacher", "add quiz questions")
+    school_id = _school_of(actor, "add quiz questions")
+    rows = []
+    for number, question in enumerate(questions, start=1):
+        try:
+            rows.append(_question_row(school_id, question))
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidInput(f"Question {number}: {e}") from None
+    if not rows:
+        return 0
+    with get_cursor() as c:
+        topic_ids = {row[1] for row in rows}
+        found = {row[0] for row in select_in(c, "SELECT TopicID FROM QuestionTopics WHERE SchoolID=? AND TopicID IN ({ids})",
+                                              topic_ids, (school_id,))}
+        missing = sorted(topic_ids - found)
+        if missing:
+            raise NotFound(f"Topics not in your school: {', '.join(map(str, missing))}")
+        before = c.connection.total_changes
+        c.executemany("""
+            INSERT INTO QuizQuestions (
+                SchoolID, TopicID, QuestionText, DifficultyLevel, AnswerOptions, CorrectAnswer, ContentHash
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(SchoolID, ContentHash) DO NOTHING
+        """, rows)
+        return c.connection.total_changes - before
@@ -6,10 +6,13 @@ class Session:
         self.user_id = user_id
         self.start_time = datetime.now()
         self.role = None
+        # Who the user is (school, teacher/student ID, admin flag), loaded once per login by databasee.current_principal
+        self.principal = None
 
     def login(self, user_id, role):
         self.user_id = user_id
         self.role = role
+        self.principal = None
         self.start_time = datetime.now()
         print(f"User ID {self.user_id} logged in as {self.role}.")
 
@@ -17,8 +20,13 @@ class Session:
     def logout(self):
         self.user_id = None
         self.role = None
+        self.principal = None
         print("User logged out.")
 
+    def invalidate_principal(self):
+        # Call after a write that changes the user's school, role or admin status
+        self.principal = None
+
 
     def is_logged_in(self):
         return self.user_id is not None
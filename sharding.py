@@ -0,0 +1,231 @@
+"""Optional per-school databases, so one school's writes never wait on another's.
+
+Set REVISIONAPP_SHARD_DIR to turn it on. The directory then holds:
+
+* ``directory.db``: Users (with password hashes), Students, Teachers, Schools and
+  SchoolJoinRequests, i.e. everything login, sign-up and moving between schools need.
+* ``school_<SchoolID>.db``: that school's classes, homework, quizzes, answers, scores and
+  plans, plus a copy of its own Schools, Users (without password hashes), Students and
+  Teachers rows so the usual joins keep working.
+
+Every shard has the full schema, so the rest of the app runs unchanged: databasee.get_cursor()
+opens the shard of the school set with databasee.use_school() (the server does this per
+request, the terminal app per login) and the directory otherwise. The services that change
+a user's school write to the directory and then call move_users() to update the copies.
+
+New rows in a shard get IDs from their own range, ``SchoolID << 32`` upwards, so IDs stay
+unique across shards and the in-memory caches keyed by QuizID or HomeworkID never mix schools.
+
+Split an existing single database with:
+
+    python sharding.py split --source tables.db --shard-dir shards
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from databasee import get_cursor, get_directory_read_cursor, router, select_in, use_school
+
+# Tables whose rows are copied into the shard of the school they belong to, and kept in the directory
+IDENTITY_TABLES = [
+    ("Schools", "SchoolID IN ({schools})"),
+    ("Users", "SchoolID IN ({schools})"),
+    ("Students", "UserID IN (SELECT UserID FROM {src}.Users WHERE SchoolID IN ({schools}))"),
+    ("Teachers", "UserID IN (SELECT UserID FROM {src}.Users WHERE SchoolID IN ({schools}))"),
+]
+
+_CLASSES = "ClassID IN (SELECT ClassID FROM {src}.Classes WHERE SchoolID IN ({schools}))"
+_HOMEWORK = """HomeworkID IN (SELECT h.HomeworkID FROM {src}.HomeworkTasks h JOIN {src}.Classes c ON c.ClassID = h.ClassID
+                              WHERE c.SchoolID IN ({schools}))"""
+_STUDENTS = """StudentID IN (SELECT s.StudentID FROM {src}.Students s JOIN {src}.Users u ON u.UserID = s.UserID
+                             WHERE u.SchoolID IN ({schools}))"""
+
+# Tables whose rows move to their school's shard, parents before children
+SCHOOL_TABLES = [
+    ("Classes", "SchoolID IN ({schools})"),
+    ("ClassTeachers", _CLASSES),
+    ("Enrollment", _CLASSES),
+    ("EnrollmentRequests", _CLASSES),
+    ("Periods", _CLASSES),
+    ("HomeworkTasks", _CLASSES),
+    ("Quizzes", _CLASSES),
+    ("QuestionTopics", "SchoolID IN ({schools})"),
+    ("QuizQuestions", "SchoolID IN ({schools})"),
+    ("QuizQuestionAssignments", """QuizID IN (SELECT q.QuizID FROM {src}.Quizzes q JOIN {src}.Classes c ON c.ClassID = q.ClassID
+                                              WHERE c.SchoolID IN ({schools}))"""),
+    ("QuestionImportCheckpoints", "SchoolID IN ({schools})"),
+    ("StudentQuizResults", _HOMEWORK),
+    ("StudentQuizScores", _HOMEWORK),
+    ("QuestionScores", _HOMEWORK),
+    ("RevisionPlan", _HOMEWORK),
+    ("StudentBusyTimes", _STUDENTS),
+]
+
+
+def id_base(school_id):
+    return int(school_id) << 32
+
+
+def seed_sequences(c, school_id):
+    """Start every AUTOINCREMENT table in this shard at the school's own ID range."""
+    base = id_base(school_id)
+    tables = [row[0] for row in c.execute("""
+        SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%'
+    """)]
+    for table in tables:
+        if c.execute("UPDATE sqlite_sequence SET seq = max(seq, ?) WHERE name = ?", (base, table)).rowcount == 0:
+            c.execute("INSERT INTO sqlite_sequence(name, seq) VALUES (?, ?)", (table, base))
+
+
+def create_shard(school_id):
+    """Create and migrate the shard for a school just added to the directory. No-op when not sharded."""
+    if router is None:
+        return
+    from migrations import migrate
+
+    with get_directory_read_cursor() as c:
+        school = c.execute("SELECT SchoolID, SchoolName FROM Schools WHERE SchoolID=?", (school_id,)).fetchone()
+    with use_school(school_id):
+        migrate(verbose=False)
+        with get_cursor() as c:
+            seed_sequences(c, school_id)
+            c.execute("""
+                INSERT INTO Schools(SchoolID, SchoolName) VALUES (?, ?)
+                ON CONFLICT(SchoolID) DO UPDATE SET SchoolName = excluded.SchoolName
+            """, school)
+
+
+def move_users(previous_schools):
+    """Bring the shard copies up to date after users' SchoolID changed in the directory.
+
+    ``previous_schools`` maps UserID to the SchoolID the user had before. The users are
+    copied into their new school's shard, and their copy in the old shard is detached from
+    that school (SchoolID NULL, since the new school has no row there), so they drop out of
+    its school-wide queries just as they would in a single database. No-op when not sharded.
+    """
+    if router is None or not previous_schools:
+        return
+    with get_directory_read_cursor() as c:
+        users = select_in(c, """
+            SELECT UserID, FirstName, LastName, Email, UserRole, SchoolID, IsSchoolAdmin, DateCreated
+            FROM Users WHERE UserID IN ({ids})
+        """, previous_schools)
+        students = select_in(c, "SELECT StudentID, YearGroup, UserID FROM Students WHERE UserID IN ({ids})", previous_schools)
+        teachers = select_in(c, "SELECT TeacherID, UserID FROM Teachers WHERE UserID IN ({ids})", previous_schools)
+
+    school_of = {user[0]: user[5] for user in users}
+    for school_id in {school for school in school_of.values() if school is not None}:
+        with use_school(school_id), get_cursor() as c:
+            # Upserts, not INSERT OR REPLACE, which would cascade-delete the user's enrolments
+            c.executemany("""
+                INSERT INTO Users(UserID, FirstName, LastName, Email, UserRole, SchoolID, IsSchoolAdmin, DateCreated, PasswordHash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, '')
+                ON CONFLICT(UserID) DO UPDATE SET FirstName = excluded.FirstName, LastName = excluded.LastName,
+                    Email = excluded.Email, UserRole = excluded.UserRole, SchoolID = excluded.SchoolID,
+                    IsSchoolAdmin = excluded.IsSchoolAdmin
+            """, [user for user in users if user[5] == school_id])
+            c.executemany("""
+                INSERT INTO Students(StudentID, YearGroup, UserID) VALUES (?, ?, ?)
+                ON CONFLICT(StudentID) DO UPDATE SET YearGroup = excluded.YearGroup
+            """, [student for student in students if school_of[student[2]] == school_id])
+            c.executemany("INSERT INTO Teachers(TeacherID, UserID) VALUES (?, ?) ON CONFLICT(TeacherID) DO NOTHING",
+                          [teacher for teacher in teachers if school_of[teacher[1]] == school_id])
+
+    for user_id, old_school_id in previous_schools.items():
+        if old_school_id is not None and old_school_id != school_of.get(user_id):
+            with use_school(old_school_id), get_cursor() as c:
+                c.execute("UPDATE Users SET SchoolID=NULL WHERE UserID=?", (user_id,))
+
+
+def _copy_rows(conn, table, where, school_id):
+    columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+    # Password hashes stay in the directory, the only database logins read
+    selected = ["'' AS PasswordHash" if table == "Users" and column == "PasswordHash" else column for column in columns]
+    conn.execute(f"""
+        INSERT INTO main.{table} ({", ".join(columns)})
+        SELECT {", ".join(selected)} FROM source.{table}
+        WHERE {where.format(src="source", schools=int(school_id))}
+    """)
+
+
+def split(source, shard_dir, verbose=True):
+    """Split a single database into ``shard_dir``/directory.db plus one shard per school.
+
+    The source is only read. It must already be migrated to the latest schema, which the
+    shards copy verbatim. Returns the SchoolIDs that got a shard.
+    """
+    from migrations import LATEST_VERSION
+
+    if os.path.exists(shard_dir) and any(name.endswith(".db") for name in os.listdir(shard_dir)):
+        raise ValueError(f"{shard_dir} already contains databases.")
+    os.makedirs(shard_dir, exist_ok=True)
+    source_uri = f"file:{os.path.abspath(source)}?mode=ro"
+    with sqlite3.connect(source_uri, uri=True) as src:
+        version = src.execute("PRAGMA user_version").fetchone()[0]
+        if version != LATEST_VERSION:
+            raise ValueError(f"{source} is at schema version {version}; run migrations.py on it first (latest {LATEST_VERSION}).")
+        schema = [row[0] for row in src.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+            ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, rowid
+        """)]
+        school_ids = [row[0] for row in src.execute("SELECT SchoolID FROM Schools ORDER BY SchoolID")]
+
+        # The directory starts as a full copy, then loses the rows that now live in a shard
+        directory_path = os.path.join(shard_dir, "directory.db")
+        with sqlite3.connect(directory_path) as directory:
+            src.backup(directory)
+        directory.close()
+
+    for school_id in school_ids:
+        start = time.perf_counter()
+        # Opened as a URI so the read-only URI of the source can be attached
+        shard = sqlite3.connect(f"file:{os.path.abspath(os.path.join(shard_dir, f'school_{int(school_id)}.db'))}", uri=True)
+        shard.execute("PRAGMA journal_mode = WAL;")
+        shard.execute("ATTACH DATABASE ? AS source", (source_uri,))
+        with shard:
+            for sql in schema:
+                shard.execute(sql)
+            for table, where in IDENTITY_TABLES + SCHOOL_TABLES:
+                _copy_rows(shard, table, where, school_id)
+            seed_sequences(shard, school_id)
+        shard.execute(f"PRAGMA user_version = {int(version)};")
+        shard.execute("DETACH DATABASE source")
+        shard.close()
+        if verbose:
+            print(f"School {school_id}: shard written ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+    directory = sqlite3.connect(directory_path)
+    # Children first, while the parent rows their filters look at still exist
+    with directory:
+        for table, where in reversed(SCHOOL_TABLES):
+            directory.execute(f"DELETE FROM {table} WHERE {where.format(src='main', schools='SELECT SchoolID FROM main.Schools')}")
+    directory.execute("PRAGMA journal_mode = WAL;")
+    directory.execute("VACUUM")
+    directory.close()
+    if verbose:
+        print(f"✅ {len(school_ids)} shards and a directory written to {shard_dir}.")
+    return school_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage per-school database shards.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    split_parser = subcommands.add_parser("split", help="split a single database into shards")
+    split_parser.add_argument("--source", required=True, help="the single database to read")
+    split_parser.add_argument("--shard-dir", required=True, help="new directory for directory.db and the shards")
+    args = parser.parse_args()
+
+    try:
+        split(args.source, args.shard_dir)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"Run with REVISIONAPP_SHARD_DIR={args.shard_dir} to use them.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Read-only snapshots of the live databases, so reports never compete with quiz answers.
+
+    python snapshots.py                  # take one snapshot of every database
+    python snapshots.py --every 300      # keep taking them every five minutes
+
+Reports, exports and mastery read through databasee.get_analytics_cursor(), which uses the
+latest snapshot of the current database (``tables.analytics.db`` next to ``tables.db``, and
+one per shard in sharded mode) for as long as it is younger than ANALYTICS_MAX_AGE_SECONDS,
+and the live database otherwise. server.py keeps them fresh in the background.
+
+A snapshot is copied with SQLite's online backup API a few pages at a time, pausing between
+steps, so the writers on the live file are never held up for long. It is written to a
+temporary file and renamed into place, so readers see either the old snapshot or the new
+one, never half of it. Each snapshot records when it was taken in its SnapshotInfo table.
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from databasee import pool, router
+
+PAGES_PER_STEP = 256
+STEP_PAUSE_SECONDS = 0.005
+# A write to the live file restarts a stepped copy; after this many restarts it is finished in one step
+MAX_RESTARTS = 3
+SNAPSHOT_INTERVAL_SECONDS = float(os.environ.get("REVISIONAPP_SNAPSHOT_SECONDS", 5 * 60))
+
+
+class _Restarted(Exception):
+    pass
+
+
+def take_snapshot(source_pool, pages=PAGES_PER_STEP, pause=STEP_PAUSE_SECONDS, max_restarts=MAX_RESTARTS):
+    """Copy ``source_pool``'s database to its replica_path. Returns the time the copy was taken."""
+    replica_path = source_pool.replica_path
+    temporary_path = replica_path + ".tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+
+    start = time.perf_counter()
+    # A connection of its own, so the backup never shares a transaction with the app's
+    source = sqlite3.connect(Path(source_pool.path).resolve().as_uri() + "?mode=ro", uri=True,
+                             timeout=source_pool.busy_timeout_ms / 1000)
+    replica = sqlite3.connect(temporary_path)
+    try:
+        remaining = None
+        restarts = 0
+
+        def progress(status, left, total):
+            nonlocal remaining, restarts
+            if remaining is not None and left >= remaining:
+                restarts += 1
+                if restarts > max_restarts:
+                    raise _Restarted()
+            remaining = left
+            time.sleep(pause)
+
+        try:
+            source.backup(replica, pages=pages, progress=progress)
+        except _Restarted:
+            # In WAL mode a single step reads one consistent snapshot without blocking writers
+            source.backup(replica)
+        taken_at = datetime.now().astimezone()
+        page_count = replica.execute("PRAGMA page_count").fetchone()[0]
+        # The live file's WAL mode is copied too; snapshots are opened read-only and need no -wal or -shm file
+        replica.execute("PRAGMA journal_mode = DELETE;")
+        with replica:
+            replica.execute("DROP TABLE IF EXISTS SnapshotInfo")
+            replica.execute("CREATE TABLE SnapshotInfo (TakenAt TEXT NOT NULL, Pages INTEGER NOT NULL, Restarts INTEGER NOT NULL, DurationMs REAL NOT NULL)")
+            replica.execute("INSERT INTO SnapshotInfo VALUES (?, ?, ?, ?)",
+                            (taken_at.isoformat(), page_count, restarts, (time.perf_counter() - start) * 1000))
+    finally:
+        replica.close()
+        source.close()
+    os.replace(temporary_path, replica_path)
+    source_pool.publish_snapshot(taken_at)
+    return taken_at
+
+
+def pools():
+    """Every database there is to snapshot: the single one, or the directory and each shard."""
+    if router is None:
+        return [pool]
+    return [pool] + [router.pool_for(school_id) for school_id in router.school_ids()]
+
+
+def snapshot_all(verbose=True):
+    for source_pool in pools():
+        start = time.perf_counter()
+        take_snapshot(source_pool)
+        if verbose:
+            print(f"📸 {source_pool.replica_path} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+class SnapshotScheduler:
+    """Takes a snapshot of every database every ``interval`` seconds on a background thread."""
+
+    def __init__(self, interval=SNAPSHOT_INTERVAL_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="snapshots", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                snapshot_all(verbose=False)
+            except (sqlite3.Error, OSError) as e:
+                # Reports fall back to the live database until a snapshot succeeds
+                print(f"❌ Analytics snapshot failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Take read-only analytics snapshots of the live databases.")
+    parser.add_argument("--every", type=float, default=0, help="keep taking snapshots this many seconds apart")
+    args = parser.parse_args()
+
+    while True:
+        snapshot_all()
+        if args.every <= 0:
+            return 0
+        try:
+            time.sleep(args.every)
+        except KeyboardInterrupt:
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""Fill a database with a realistic, reproducible school workload for benchmarks and query audits.
+
+    python synthetic_data.py --db bench.db --schools 50 --students 100000 --answers 1000000
+
+Every generated user's password is ``password``. The same seed always produces the same data.
+"""
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import random
+import time
+
+FIRST_NAMES = ["Amelia", "Oliver", "Isla", "George", "Ava", "Noah", "Mia", "Leo", "Freya", "Arthur",
+               "Lily", "Oscar", "Grace", "Harry", "Sofia", "Jack", "Ella", "Charlie", "Ivy", "Theo"]
+LAST_NAMES = ["Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson", "Davies", "Patel",
+              "Robinson", "Wright", "Thompson", "Evans", "Walker", "White", "Roberts", "Green", "Hall"]
+SUBJECTS = ["Maths", "English", "Biology", "Chemistry", "Physics", "History", "Geography", "French",
+            "Spanish", "Computing", "Art", "Music"]
+YEAR_GROUPS = [7, 8, 9, 10, 11, 12, 13]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+
+class Config:
+    """How much of everything to generate. Per-school counts are spread evenly across schools."""
+
+    def __init__(self, schools=50, students=100000, teachers_per_school=80, classes_per_school=80,
+                 classes_per_student=6, periods_per_class=5, max_busy_times=3, topics_per_school=20,
+                 questions_per_school=400, quizzes_per_class=4, questions_per_quiz=20, assignments_per_class=1, answers=1000000,
+                 pending_enrollment_requests=2000, pending_join_requests=500):
+        self.schools = schools
+        self.students = students
+        self.teachers_per_school = teachers_per_school
+        self.classes_per_school = classes_per_school
+        self.classes_per_student = classes_per_student
+        self.periods_per_class = periods_per_class
+        self.max_busy_times = max_busy_times
+        self.topics_per_school = topics_per_school
+        self.questions_per_school = questions_per_school
+        self.quizzes_per_class = quizzes_per_class
+        self.questions_per_quiz = questions_per_quiz
+        self.assignments_per_class = assignments_per_class
+        self.answers = answers
+        self.pending_enrollment_requests = pending_enrollment_requests
+        self.pending_join_requests = pending_join_requests
+
+
+def _hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate(c, config, password_hash, seed=0, today=None):
+    """Insert the workload through cursor ``c`` (the caller owns the transaction).
+
+    Returns a dict of row counts per table.
+    """
+    from databasee import question_hash
+
+    rng = random.Random(seed)
+    today = today or date.today()
+    counts = {}
+
+    def insert(table, columns, rows):
+        c.executemany(f"INSERT INTO {table}({', '.join(columns)}) VALUES({', '.join('?' * len(columns))});", rows)
+        counts[table] = counts.get(table, 0) + len(rows)
+
+    school_ids = list(range(1, config.schools + 1))
+    insert("Schools", ["SchoolID", "SchoolName"], [(s, f"Synthetic School {s}") for s in school_ids])
+
+    users, teachers, students = [], [], []
+    school_teachers = {s: [] for s in school_ids}
+    school_students = {s: [] for s in school_ids}
+    user_id = 0
+
+    def add_user(role, school_id, is_admin=False):
+        nonlocal user_id
+        user_id += 1
+        users.append((user_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"{role}{user_id}@synthetic.example",
+                      password_hash, role, school_id, is_admin))
+        return user_id
+
+    for school_id in school_ids:
+        for n in range(config.teachers_per_school):
+            teacher_id = len(teachers) + 1
+            teachers.append((teacher_id, add_user("teacher", school_id, is_admin=(n == 0))))
+            school_teachers[school_id].append(teacher_id)
+    for n in range(config.students):
+        school_id = school_ids[n % len(school_ids)]
+        student_id = len(students) + 1
+        students.append((student_id, rng.choice(YEAR_GROUPS), add_user("student", school_id)))
+        school_students[school_id].append(student_id)
+    # Teachers without a school yet, each waiting on a join request
+    join_requests = []
+    for _ in range(config.pending_join_requests):
+        teacher_id = len(teachers) + 1
+        teachers.append((teacher_id, add_user("teacher", None)))
+        join_requests.append((teachers[-1][1], rng.choice(school_ids)))
+
+    insert("Users", ["UserID", "FirstName", "LastName", "Email", "PasswordHash", "UserRole", "SchoolID", "IsSchoolAdmin"], users)
+    insert("Teachers", ["TeacherID", "UserID"], teachers)
+    insert("Students", ["StudentID", "YearGroup", "UserID"], students)
+    insert("SchoolJoinRequests", ["UserID", "SchoolID"], join_requests)
+    year_group = {student_id: year for student_id, year, _ in students}
+
+    classes, class_teachers, periods = [], [], []
+    school_classes = {s: {year: [] for year in YEAR_GROUPS} for s in school_ids}
+    class_teacher = {}
+    for school_id in school_ids:
+        for n in range(config.classes_per_school):
+            class_id = len(classes) + 1
+            year = YEAR_GROUPS[n % len(YEAR_GROUPS)]
+            classes.append((class_id, f"{year}{chr(65 + n // len(YEAR_GROUPS) % 26)}-{SUBJECTS[n % len(SUBJECTS)]}", school_id))
+            school_classes[school_id][year].append(class_id)
+            class_teacher[class_id] = rng.choice(school_teachers[school_id])
+            class_teachers.append((class_id, class_teacher[class_id]))
+            for _ in range(config.periods_per_class):
+                start = rng.randrange(8 * 60, 15 * 60, 5)
+                periods.append((_hhmm(start), _hhmm(start + rng.choice([50, 60, 100])), class_id, class_teacher[class_id]))
+    insert("Classes", ["ClassID", "LocalClassIdentifier", "SchoolID"], classes)
+    insert("ClassTeachers", ["ClassID", "TeacherID"], class_teachers)
+    insert("Periods", ["StartTime", "EndTime", "ClassID", "TeacherID"], periods)
+
+    enrollment, busy = [], []
+    student_classes = {}
+    for school_id in school_ids:
+        for student_id in school_students[school_id]:
+            options = school_classes[school_id][year_group[student_id]] or [cid for ids in school_classes[school_id].values() for cid in ids]
+            chosen = rng.sample(options, min(config.classes_per_student, len(options)))
+            student_classes[student_id] = chosen
+            for class_id in chosen:
+                enrollment.append((student_id, class_id))
+            for _ in range(rng.randint(0, config.max_busy_times)):
+                start = rng.randrange(16 * 60, 21 * 60, 15)
+                busy.append((student_id, _hhmm(start), _hhmm(min(start + rng.choice([30, 60, 90]), 23 * 60))))
+    insert("Enrollment", ["StudentID", "ClassID"], enrollment)
+    insert("StudentBusyTimes", ["StudentID", "StartTime", "EndTime"], busy)
+
+    enrollment_requests = []
+    for _ in range(config.pending_enrollment_requests):
+        school_id = rng.choice(school_ids)
+        student_id = rng.choice(school_students[school_id])
+        others = [cid for ids in school_classes[school_id].values() for cid in ids if cid not in student_classes[student_id]]
+        if others:
+            enrollment_requests.append((student_id, rng.choice(others)))
+    insert("EnrollmentRequests", ["StudentID", "ClassID"], enrollment_requests)
+
+    topics, questions = [], []
+    school_questions = {s: [] for s in school_ids}
+    answer_key = {}
+    for school_id in school_ids:
+        school_topics = []
+        for n in range(config.topics_per_school):
+            topic_id = len(topics) + 1
+            topics.append((topic_id, school_id, f"{SUBJECTS[n % len(SUBJECTS)]} topic {n + 1}"))
+            school_topics.append(topic_id)
+        for n in range(config.questions_per_school):
+            question_id = len(questions) + 1
+            topic_id = rng.choice(school_topics)
+            a, b = rng.randint(2, 99), rng.randint(2, 99)
+            text = f"Question {n + 1}: what is {a} + {b}?"
+            correct = str(a + b)
+            options = [correct, str(a + b + 1), str(a + b - 1), str(a * b)]
+            rng.shuffle(options)
+            questions.append((question_id, school_id, topic_id, text, rng.choice(DIFFICULTIES), json.dumps(options),
+                              correct, question_hash(topic_id, text)))
+            school_questions[school_id].append(question_id)
+            answer_key[question_id] = (correct, options)
+    insert("QuestionTopics", ["TopicID", "SchoolID", "TopicName"], topics)
+    insert("QuizQuestions", ["QuestionID", "SchoolID", "TopicID", "QuestionText", "DifficultyLevel", "AnswerOptions",
+                             "CorrectAnswer", "ContentHash"], questions)
+
+    # Each class gets written assignments as well as quizzes, so HomeworkIDs and QuizIDs diverge
+    quizzes, assignments, homework = [], [], []
+    class_quizzes, quiz_questions, quiz_homework = {}, {}, {}
+    school_of_class = {class_id: school_id for class_id, _, school_id in classes}
+    for class_id, _, _ in classes:
+        teacher_id = class_teacher[class_id]
+        for n in range(config.assignments_per_class):
+            assigned = today - timedelta(days=rng.randint(0, 120))
+            homework.append((len(homework) + 1, f"Assignment {n + 1}", "Synthetic assignment", rng.choice([30, 60, 90]),
+                             (assigned + timedelta(days=rng.randint(3, 14))).isoformat(), "Assignment", assigned.isoformat(),
+                             class_id, teacher_id, None))
+        for n in range(config.quizzes_per_class):
+            quiz_id = len(quizzes) + 1
+            homework_id = len(homework) + 1
+            assigned = today - timedelta(days=rng.randint(0, 120))
+            quizzes.append((quiz_id, f"Quiz {n + 1}", class_id, teacher_id, assigned.isoformat()))
+            homework.append((homework_id, f"Quiz {n + 1}", "Synthetic quiz", rng.choice([20, 30, 45, 60]),
+                             (assigned + timedelta(days=rng.randint(3, 14))).isoformat(), "Quiz", assigned.isoformat(),
+                             class_id, teacher_id, quiz_id))
+            quiz_homework[quiz_id] = homework_id
+            chosen = rng.sample(school_questions[school_of_class[class_id]],
+                                min(config.questions_per_quiz, len(school_questions[school_of_class[class_id]])))
+            quiz_questions[quiz_id] = chosen
+            assignments.extend((quiz_id, question_id) for question_id in chosen)
+            class_quizzes.setdefault(class_id, []).append(quiz_id)
+    insert("Quizzes", ["QuizID", "Title", "ClassID", "TeacherID", "DateAssigned"], quizzes)
+    insert("QuizQuestionAssignments", ["QuizID", "QuestionID"], assignments)
+    insert("HomeworkTasks", ["HomeworkID", "Title", "Description", "TimeToComplete", "DueDate", "HomeworkType",
+                             "DateAssigned", "ClassID", "TeacherID", "AssignmentID"], homework)
+
+    # Students work through whole quizzes in order until the answer budget is spent
+    results = []
+    attempted = set()
+    student_ids = [student_id for student_id in student_classes if any(class_quizzes.get(c) for c in student_classes[student_id])]
+    possible = sum(len(class_quizzes.get(c, ())) for student_id in student_ids for c in student_classes[student_id])
+    while len(results) < config.answers and len(attempted) < possible:
+        student_id = rng.choice(student_ids)
+        quiz_id = rng.choice(class_quizzes[rng.choice([c for c in student_classes[student_id] if class_quizzes.get(c)])])
+        if (student_id, quiz_id) in attempted:
+            continue
+        attempted.add((student_id, quiz_id))
+        skill = rng.random()
+        for question_id in quiz_questions[quiz_id][:config.answers - len(results)]:
+            correct, options = answer_key[question_id]
+            results.append((student_id, quiz_homework[quiz_id], question_id, correct if rng.random() < 0.3 + 0.6 * skill else rng.choice(options)))
+    insert("StudentQuizResults", ["StudentID", "HomeworkID", "QuestionID", "AnswerGiven"], results)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Revision App database.")
+    parser.add_argument("--db", required=True, help="database to create (must not exist yet)")
+    parser.add_argument("--seed", type=int, default=0)
+    defaults = Config()
+    for name, value in vars(defaults).items():
+        parser.add_argument("--" + name.replace("_", "-"), type=int, default=value)
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+
+    # The connection pool reads its path at import time
+    os.environ["REVISIONAPP_DB"] = args.db
+    from databasee import get_cursor, pool
+    from grading import grade_homework
+    from migrations import migrate
+    from passwords import passwords
+
+    migrate(verbose=False)
+    config = Config(**{name: getattr(args, name) for name in vars(defaults)})
+    start = time.perf_counter()
+    with get_cursor() as c:
+        counts = generate(c, config, passwords.hash("password"), seed=args.seed)
+        homework_ids = [row[0] for row in c.execute("SELECT HomeworkID FROM HomeworkTasks;")]
+    for i in range(0, len(homework_ids), 1000):
+        grade_homework(homework_ids[i:i + 1000])
+    passwords.shutdown()
+    # Move everything out of the write-ahead log, so the .db file can be copied on its own
+    pool.connection().execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    pool.close_all()
+    for table, count in counts.items():
+        print(f"{table:<26} {count:>10,}")
+    print(f"✅ Generated {args.db} in {time.perf_counter() - start:.1f} s.")
+
+
+if __name__ == "__main__":
+    main()
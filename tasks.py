@@ -1,51 +1,57 @@
 from databasee import get_school_id, get_teacher_id, get_student_id
 from session import session
-from main import c, connection
+from databasee import get_cursor, get_read_cursor, current_principal
+from quiz_engine import engine as quiz_engine, quiz_homework_id
 from datetime import datetime
-from databasee import get_school_id, get_teacher_id, get_student_id, get_user_role, ensure_logged_in
+from databasee import get_school_id, get_teacher_id, get_student_id, get_user_role, ensure_logged_in, question_hash, select_in
+from grading import grade_homework, normalise_answer
+from services import ServiceError, Conflict
+import services
+from school import read_id
 
 import sqlite3
 import hashlib
-from argon2 import PasswordHasher
 from datetime import datetime
 import json
 import random
-import pandas as pd
 import os
+import queue
 import sqlite3
+import threading
 
+# Rows parsed and committed at a time by the streaming CSV import
+IMPORT_CHUNK_ROWS = 50000
 
-def add_homework_task():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to add a homework task.")
-        return
-    
-    if not session.require_role("teacher"):
-        print("Entry denied! Only teachers can add homework tasks.")
-        return False
-    
-    teacher_id = get_teacher_id(session.get_user_id())
-    classes = c.execute("SELECT ClassID, LocalClassIdentifier FROM Classes WHERE SchoolID=(SELECT SchoolID FROM Users WHERE UserID=?)", (session.get_user_id(),)).fetchall()
 
+def choose_class(principal):
+    # Number the school's classes and return the chosen ClassID, or None if there are none
+    with get_read_cursor() as c:
+        classes = c.execute("SELECT ClassID, LocalClassIdentifier FROM Classes WHERE SchoolID=?", (principal.school_id,)).fetchall()
     if not classes:
-        print("You are not associated with any classes. Please create a class first.")
-        return False
-    
-    print("Classes you are associated with:")
+        print("No classes found in your school. Please create a class first.")
+        return None
     for index, (class_id, local_class_identifier) in enumerate(classes, start=1):
         print(f"{index}. Class ID: {class_id}, Local Class Identifier: {local_class_identifier}")
+    while True:
+        try:
+            choice = int(input("Select the class by number: ")) - 1
+            if 0 <= choice < len(classes):
+                return classes[choice][0]
+        except ValueError:
+            pass
+        print("Invalid choice. Please try again.")
 
-    class_choice_verified = False
-    while not class_choice_verified:
-        class_choice = int(input("Select the class by number: ")) - 1
-        if class_choice < 0 or class_choice >= len(classes):
-            print("Invalid choice. Please try again.")
-        else:
-            class_choice_verified = True
-    
-    selected_class_id = classes[class_choice][0]
+def add_homework_task():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add homework tasks")
+    except ServiceError as e:
+        print(e)
+        return False
 
+    class_id = choose_class(principal)
+    if class_id is None:
+        return False
     title = input("Enter the homework task title: ")
     description = input("Enter the homework task description: ")
 
@@ -57,224 +63,204 @@ def add_homework_task():
             break
         except ValueError as e:
             print(f"Invalid input: {e}. Please enter a valid number.")
-            continue
-
-        
 
-    due_date_verified = False
-
-    while not due_date_verified:
-        due_date_input = input("Enter the due date (DD-MM-YYYY): ")
+    while True:
         try:
-            due_date = datetime.strptime(due_date_input, "%d-%m-%Y").date()
-            if due_date < datetime.now().date():
-                print("Due date cannot be in the past. Please enter a valid date.")
-                continue
-            due_date_verified = True
+            due_date = datetime.strptime(input("Enter the due date (DD-MM-YYYY): "), "%d-%m-%Y").date()
+            if due_date >= datetime.now().date():
+                break
+            print("Due date cannot be in the past. Please enter a valid date.")
         except ValueError:
             print("Invalid date format. Please use DD-MM-YYYY format.")
-            continue
-    
-    homework_type_choice_verified = False
-    homework_types = ["Quiz", "Assignment", "Project", "Other"]
-    
-    while not homework_type_choice_verified:
+
+    while True:
         print("Select the type of homework task:")
-        for index, homework_type in enumerate(homework_types, start=1):
+        for index, homework_type in enumerate(services.HOMEWORK_TYPES, start=1):
             print(f"{index}. {homework_type}")
-        
         try:
-            homework_type_choice = int(input("Enter the number corresponding to the homework type: ")) - 1
-            if homework_type_choice < 0 or homework_type_choice >= len(homework_types):
-                raise ValueError("Invalid choice. Please select a valid option.")
-            homework_type_choice = homework_types[homework_type_choice]
-            homework_type_choice_verified = True
-        except ValueError as e:
-            print(f"Error: {e}. Please try again.")
+            choice = int(input("Enter the number corresponding to the homework type: ")) - 1
+            if 0 <= choice < len(services.HOMEWORK_TYPES):
+                homework_type = services.HOMEWORK_TYPES[choice]
+                break
+        except ValueError:
+            pass
+        print("Error: Invalid choice. Please select a valid option.")
 
-    if homework_type_choice == "Quiz":
+    assignment_id = None
+    if homework_type == "Quiz":
         assignment_id = input("Enter the Quiz ID (or leave blank to create a new quiz): ").strip()
-        if assignment_id:
-            try:
-                assignment_id = int(assignment_id)
-                c.execute("SELECT AssignmentID FROM QuizQuestionAssignmnts WHERE QuizID=?", (assignment_id,))
-                if c.fetchone() is None:
-                    print("Quiz ID does not exist. Creating a new quiz.")
-                    assignment_id = None
-            except ValueError:
-                print("Invalid Quiz ID. Creating a new quiz.")
-                assignment_id = None
-        if not assignment_id:
+        if not assignment_id.isdigit():
             print("Create a new quiz first then come back to add the homework task.")
             return False
-    
-    c.execute("INSERT INTO HomeworkTasks(Title, Description, TimeToComplete, DueDate, HomeworkType, ClassID, TeacherID, AssignmentID) VALUES(?, ?, ?, ?, ?, ?, ?, ?);",
-                  (title, description, time_to_complete, due_date, homework_type_choice, selected_class_id, teacher_id, assignment_id))
-
-
-    connection.commit()
-    return True 
-    
-
+        assignment_id = int(assignment_id)
 
+    try:
+        services.create_homework(principal, class_id, title, description, time_to_complete, due_date,
+                                 homework_type, assignment_id)
+    except ServiceError as e:
+        print(e)
+        return False
+    print("✅ Homework task added.")
+    return True
 
 
 def create_quiz_from_pool():
-    global current_user_token
-    if session.is_logged_in() is False:
-        print("You must be logged in to create a quiz.")
-        return
-    if get_user_role(session.get_user_id()) != "teacher":
-        print("Only teachers can create quizzes.")
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "create quizzes")
+    except ServiceError as e:
+        print(e)
         return
-    
-    teacher_id = get_teacher_id(session.get_user_id())
-    school_id = get_school_id(session.get_user_id())
 
-    # Select class
-    classes = c.execute("""
-        SELECT ClassID, LocalClassIdentifier
-        FROM Classes
-        WHERE SchoolID = ?
-    """, (school_id,)).fetchall()
-    
-    if not classes:
-        print("No classes found in your school.")
-        return
-    
     print("Select a class for the quiz:")
-    for i, (class_id, name) in enumerate(classes, start=1):
-        print(f"{i}. {name} (Class ID: {class_id})")
-    choice = int(input("Enter number: ")) - 1
-    class_id = classes[choice][0]
-    
-    quiz_title = input("Enter quiz title: ")
-    c.execute("INSERT INTO Quizzes (Title, ClassID, TeacherID) VALUES (?, ?, ?)", (quiz_title, class_id, teacher_id))
-    c.execute("""
-    SELECT QuizID
-    FROM Quizzes
-    WHERE Title = ? AND ClassID = ? AND TeacherID = ?
-    ORDER BY QuizID ASC
-""", (quiz_title, class_id, teacher_id))
-    quiz_id = c.fetchone()[-1]
-
-    # Select topic
-    topics = c.execute("SELECT TopicID, TopicName FROM QuestionTopics WHERE SchoolID=?", (school_id,)).fetchall()
-    if not topics:
-        print("No topics found for your school.")
+    class_id = choose_class(principal)
+    if class_id is None:
         return
-    print("Available Topics:")
-    for tid, tname in topics:
-        print(f"{tid}. {tname}")
-    topic_id = int(input("Enter topic ID: "))
-
-    # Select questions from topic
-    questions = c.execute("""
-        SELECT QuestionID, QuestionText, DifficultyLevel
-        FROM QuizQuestions
-        WHERE SchoolID=? AND TopicID=?
-    """, (school_id, topic_id)).fetchall()
+    quiz_title = input("Enter quiz title: ")
+
+    with get_read_cursor() as c:
+        topics = c.execute("SELECT TopicID, TopicName FROM QuestionTopics WHERE SchoolID=?", (principal.school_id,)).fetchall()
+        if not topics:
+            print("No topics found for your school.")
+            return
+        print("Available Topics:")
+        for tid, tname in topics:
+            print(f"{tid}. {tname}")
+        topic_id = int(input("Enter topic ID: "))
+
+        questions = c.execute("""
+            SELECT QuestionID, QuestionText, DifficultyLevel
+            FROM QuizQuestions
+            WHERE SchoolID=? AND TopicID=?
+        """, (principal.school_id, topic_id)).fetchall()
     if not questions:
         print("No questions found for that topic.")
         return
     for qid, text, diff in questions:
         print(f"QID {qid} [{diff}]: {text}")
-    
-    selected_ids = input("Enter question IDs to add (comma-separated): ").split(",")
-    for qid in selected_ids:
-        c.execute("INSERT INTO QuizQuestionAssignments (QuizID, QuestionID) VALUES (?, ?)", (quiz_id, int(qid)))
-    
-    connection.commit()
 
+    selected_ids = [qid for qid in input("Enter question IDs to add (comma-separated): ").split(",") if qid.strip()]
+    try:
+        quiz_id = services.create_quiz(principal, class_id, quiz_title, selected_ids)
+    except (ServiceError, ValueError) as e:
+        print(f"❌ {e}")
+        return
     print(f"✅ Quiz '{quiz_title}' created successfully with ID {quiz_id}")
 
 def get_next_question(student_id, quiz_id):
-    # Get last answered question
-    last_result = c.execute("""
-        SELECT sr.QuestionID, q.DifficultyLevel, q.CorrectAnswer, sr.AnswerGiven
-        FROM StudentQuizResults sr
-        JOIN QuizQuestions q ON sr.QuestionID = q.QuestionID
-        WHERE sr.StudentID = ? AND sr.HomeworkID = ?
-        ORDER BY sr.ResultID DESC LIMIT 1
-    """, (student_id, quiz_id)).fetchone()
-    
-    if last_result is None:
-        # Start with Medium difficulty
-        return c.execute("""
-            SELECT q.QuestionID, q.QuestionText, q.AnswerOptions
-            FROM QuizQuestionAssignments qa
-            JOIN QuizQuestions q ON qa.QuestionID = q.QuestionID
-            WHERE qa.QuizID = ? AND q.DifficultyLevel = 'Medium'
-            LIMIT 1
-        """, (quiz_id,)).fetchone()
-    
-    last_qid, last_diff, correct_answer, answer_given = last_result
-    was_correct = (correct_answer.strip().lower() == (answer_given or "").strip().lower())
-    
-    # Difficulty adjustment
-    diff_levels = ["Easy", "Medium", "Hard"]
-    idx = diff_levels.index(last_diff)
-    if was_correct and idx < 2:
-        next_diff = diff_levels[idx + 1]
-    elif not was_correct and idx > 0:
-        next_diff = diff_levels[idx - 1]
-    else:
-        next_diff = last_diff
-    
-    # Get next unused question of adjusted difficulty
-    return c.execute("""
-        SELECT q.QuestionID, q.QuestionText, q.AnswerOptions
-        FROM QuizQuestionAssignments qa
-        JOIN QuizQuestions q ON qa.QuestionID = q.QuestionID
-        WHERE qa.QuizID = ?
-          AND q.DifficultyLevel = ?
-          AND q.QuestionID NOT IN (
-              SELECT QuestionID
-              FROM StudentQuizResults
-              WHERE StudentID = ? AND HomeworkID = ?
-          )
-        LIMIT 1
-    """, (quiz_id, next_diff, student_id, quiz_id)).fetchone()
-
-def add_topic():
+    # Served from the in-memory adaptive engine; see quiz_engine.QuizEngine
+    with get_read_cursor() as c:
+        homework_id = quiz_homework_id(c, student_id, quiz_id)
+    if homework_id is None:
+        return None
+    return quiz_engine.next_question(student_id, quiz_id, homework_id)
+
+def view_quiz_results():
     if session.is_logged_in() is False:
-        print("You must be logged in to add a topic.")
+        print("You must be logged in to view quiz results.")
         return
     if not session.require_role("teacher"):
-        print("Only teachers can add topics.")
+        print("Only teachers can view quiz results.")
         return
 
-    school_id = get_school_id(session.get_user_id())
-    topic_name = input("Enter topic name: ").strip()
+    with get_read_cursor() as c:
+        homework = c.execute("""
+            SELECT HomeworkID, Title FROM HomeworkTasks
+            WHERE HomeworkType = 'Quiz' AND ClassID IN (
+                SELECT ClassID FROM ClassTeachers WHERE TeacherID = ?
+            )
+            ORDER BY DueDate DESC
+        """, (get_teacher_id(session.get_user_id()),)).fetchall()
+    if not homework:
+        print("No quiz homework found for your classes.")
+        return
 
+    for homework_id, title in homework:
+        print(f"{homework_id}. {title}")
     try:
-        c.execute("""
-            INSERT INTO QuestionTopics (SchoolID, TopicName)
-            VALUES (?, ?)
-        """, (school_id, topic_name))
-        connection.commit()
-        print(f"✅ Topic '{topic_name}' added to your school’s pool.")
-    except sqlite3.IntegrityError:
-        print(f"⚠️ Topic '{topic_name}' already exists in your school.")
-
+        homework_id = int(input("Enter homework ID: "))
+        as_of, results = services.homework_results(current_principal(), homework_id)
+    except ValueError:
+        print("❌ Homework ID must be a number.")
+        return
+    except ServiceError as e:
+        print(f"❌ {e}")
+        return
+    if not results:
+        print("No answers have been submitted yet." if as_of is None else f"No answers had been submitted as of {as_of:%H:%M}.")
+        return
+    if as_of is not None:
+        print(f"Results as of {as_of:%d/%m %H:%M}; answers since then will show after the next snapshot.")
+    for student_id, first_name, last_name, answered, correct in results:
+        print(f"{first_name} {last_name} (Student ID: {student_id}): {correct}/{answered} correct")
 
-def add_quiz_question():
+def view_topic_mastery():
     if session.is_logged_in() is False:
-        print("You must be logged in to add a quiz question.")
+        print("You must be logged in to view topic mastery.")
         return
     if not session.require_role("teacher"):
-        print("Only teachers can add quiz questions.")
+        print("Only teachers can view topic mastery.")
         return
 
-    school_id = get_school_id(session.get_user_id())
+    with get_read_cursor() as c:
+        classes = c.execute("""
+            SELECT ClassID, LocalClassIdentifier FROM Classes
+            WHERE ClassID IN (SELECT ClassID FROM ClassTeachers WHERE TeacherID = ?)
+        """, (get_teacher_id(session.get_user_id()),)).fetchall()
+    if not classes:
+        print("You are not assigned to any classes.")
+        return
+
+    for class_id, local_class_identifier in classes:
+        print(f"{class_id}. {local_class_identifier}")
+    try:
+        mastery = services.class_mastery(current_principal(), read_id("Enter class ID: "))
+    except ServiceError as e:
+        print(f"❌ {e}")
+        return
+    if not len(mastery.student_ids):
+        print("No quiz answers for this class yet.")
+        return
+    if mastery.as_of is not None:
+        print(f"Mastery as of {mastery.as_of:%d/%m %H:%M}.")
+
+    print("\nTopic accuracy across the class:")
+    for topic_name, accuracy in zip(mastery.topic_names, mastery.topic_averages().tolist()):
+        print(f"  {topic_name}: {accuracy:.0%}")
+    print("\nWeakest topics per student:")
+    for student_id in mastery.student_ids.tolist():
+        weakest = ", ".join(f"{name} ({accuracy:.0%})" for name, accuracy in mastery.weakest_topics(student_id))
+        print(f"  Student {student_id}: {weakest}")
+
+def add_topic():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add topics")
+        topic_name = input("Enter topic name: ").strip()
+        services.add_topic(principal, topic_name)
+    except Conflict as e:
+        print(f"⚠️ {e}")
+        return
+    except ServiceError as e:
+        print(e)
+        return
+    print(f"✅ Topic '{topic_name}' added to your school’s pool.")
 
-    # Select topic
-    topics = c.execute("""
-        SELECT TopicID, TopicName
-        FROM QuestionTopics
-        WHERE SchoolID = ?
-    """, (school_id,)).fetchall()
 
+def add_quiz_question():
+    principal = current_principal()
+    try:
+        services.authorize(principal, "teacher", "add quiz questions")
+    except ServiceError as e:
+        print(e)
+        return
+
+    with get_read_cursor() as c:
+        topics = c.execute("""
+            SELECT TopicID, TopicName
+            FROM QuestionTopics
+            WHERE SchoolID = ?
+        """, (principal.school_id,)).fetchall()
     if not topics:
         print("⚠️ No topics available. Please add a topic first.")
         return
@@ -284,34 +270,28 @@ def add_quiz_question():
         print(f"{tid}. {tname}")
 
     topic_id = int(input("Enter Topic ID: "))
-
-    # Question details
     question_text = input("Enter the question text: ").strip()
-    difficulty = input("Enter difficulty (Easy, Medium, Hard): ").capitalize()
-    if difficulty not in ["Easy", "Medium", "Hard"]:
-        print("❌ Invalid difficulty.")
-        return
+    difficulty = input("Enter difficulty (Easy, Medium, Hard): ")
 
     options = []
     print("Enter 4 answer options:")
     for i in range(4):
         options.append(input(f"Option {i+1}: ").strip())
-
     correct_answer = input("Enter the correct answer exactly as written above: ").strip()
 
-    # Store as JSON
-    answer_options_json = json.dumps(options)
-
-    c.execute("""
-        INSERT INTO QuizQuestions (
-            SchoolID, TopicID, QuestionText, DifficultyLevel, AnswerOptions, CorrectAnswer
-        ) VALUES (?, ?, ?, ?, ?, ?)
-    """, (school_id, topic_id, question_text, difficulty, answer_options_json, correct_answer))
-
-    connection.commit()
+    try:
+        services.add_question(principal, topic_id, question_text, difficulty, options, correct_answer)
+    except Conflict as e:
+        print(f"⚠️ {e}")
+        return
+    except ServiceError as e:
+        print(f"❌ {e}")
+        return
     print("✅ Question added successfully to your school’s question pool.")
 
 def bulk_upload_questions():
+    import pandas as pd
+
     if session.is_logged_in() is False:
         print("You must be logged in to upload questions.")
         return
@@ -328,9 +308,10 @@ def bulk_upload_questions():
 
     try:
         if file_path.lower().endswith(".csv"):
-            df = pd.read_csv(file_path)
+            # Only the header is read here; the rows are streamed in chunks below
+            df = pd.read_csv(file_path, nrows=0)
         elif file_path.lower().endswith((".xlsx", ".xls")):
-            df = pd.read_excel(file_path)
+            df = pd.read_excel(file_path, dtype=str)
         else:
             print("❌ Unsupported file format. Use CSV or Excel.")
             return
@@ -345,58 +326,194 @@ def bulk_upload_questions():
         print(f"❌ Missing required columns. Must include: {', '.join(required_cols)}")
         return
 
+    try:
+        if file_path.lower().endswith(".csv"):
+            try:
+                added_count, updated_count = stream_upload_questions(school_id, file_path)
+            except Exception as e:
+                print(f"❌ Import stopped: {e}. Upload the same file again to resume.")
+                return
+        else:
+            with get_cursor() as c:
+                added_count, updated_count = upsert_questions(c, school_id, df)
+    finally:
+        # Updated questions may carry new answers or difficulties
+        quiz_engine.invalidate_quiz()
+    print(f"✅ Bulk upload complete — Added: {added_count}, Updated: {updated_count}")
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def stream_upload_questions(school_id, file_path, chunk_size=IMPORT_CHUNK_ROWS):
+    """Import a question CSV in bounded chunks, committing and checkpointing after each one.
+
+    A reader thread parses the next chunk while the current one is written, so at most a
+    few chunks are held in memory whatever the file size. Progress is stored in
+    QuestionImportCheckpoints against the file's SHA-256, and uploading the same file again
+    after a failure resumes after the last committed row.
+    """
+    import pandas as pd
+
+    file_hash = file_sha256(file_path)
+    with get_read_cursor() as c:
+        checkpoint = c.execute("""
+            SELECT RowsDone FROM QuestionImportCheckpoints
+            WHERE SchoolID = ? AND FileHash = ?
+        """, (school_id, file_hash)).fetchone()
+    rows_done = checkpoint[0] if checkpoint else 0
+    if rows_done:
+        print(f"↩️ Resuming import after row {rows_done}.")
+
+    chunks = queue.Queue(maxsize=1)
+    stop = threading.Event()
+
+    def put(item):
+        # Gives up once the consumer has stopped, so the thread never blocks on a full queue
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_chunks():
+        try:
+            # Line 0 is the header; skip the data rows committed by an earlier attempt
+            skip = (lambda line: 0 < line <= rows_done) if rows_done else None
+            # Read as text, so an answer like 4 is not turned into 4.0 by a blank cell in its column
+            with pd.read_csv(file_path, chunksize=chunk_size, skiprows=skip, dtype=str, keep_default_na=False) as csv_chunks:
+                for chunk in csv_chunks:
+                    if not put(chunk):
+                        return
+            put(None)
+        except Exception as e:
+            put(e)
+
+    reader = threading.Thread(target=read_chunks, daemon=True)
+    reader.start()
+
     added_count = 0
     updated_count = 0
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+
+            with get_cursor() as c:
+                added, updated = upsert_questions(c, school_id, chunk)
+                rows_done += len(chunk)
+                c.execute("""
+                    INSERT INTO QuestionImportCheckpoints (SchoolID, FileHash, FilePath, RowsDone)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(SchoolID, FileHash) DO UPDATE
+                    SET RowsDone = excluded.RowsDone, UpdatedAt = current_timestamp
+                """, (school_id, file_hash, file_path, rows_done))
+            added_count += added
+            updated_count += updated
+            print(f"… {rows_done} rows imported")
+    finally:
+        stop.set()
+        # The reader notices within one put timeout and closes the file
+        reader.join()
+
+    with get_cursor() as c:
+        c.execute("DELETE FROM QuestionImportCheckpoints WHERE SchoolID = ? AND FileHash = ?",
+                  (school_id, file_hash))
+    return added_count, updated_count
+
+def upsert_questions(c, school_id, df):
+    """Insert or update every question in ``df`` for one school using set-based statements.
+
+    Columns are normalised once with vectorised pandas operations, every distinct topic is
+    resolved in one query, and questions are upserted with executemany on the
+    (SchoolID, ContentHash) index. Homework set from quizzes whose questions get a new
+    correct answer is re-graded. The caller owns the transaction. Returns
+    ``(added_count, updated_count)``.
+    """
+    import pandas as pd
 
-    for _, row in df.iterrows():
-        topic_name = str(row["TopicName"]).strip()
-        difficulty = str(row["Difficulty"]).capitalize()
-        if difficulty not in ["Easy", "Medium", "Hard"]:
-            print(f"⚠️ Skipping invalid difficulty '{difficulty}' for question: {row['QuestionText']}")
-            continue
-
-        # Ensure topic exists
-        topic_row = c.execute("""
-            SELECT TopicID FROM QuestionTopics
-            WHERE SchoolID = ? AND TopicName = ?
-        """, (school_id, topic_name)).fetchone()
-
-        if topic_row:
-            topic_id = topic_row[0]
-        else:
-            c.execute("""
-                INSERT INTO QuestionTopics (SchoolID, TopicName) VALUES (?, ?)
-            """, (school_id, topic_name))
-            topic_id = c.lastrowid
-
-        options = [str(row[f"Option{i}"]).strip() for i in range(1, 5)]
-        correct_answer = str(row["CorrectAnswer"]).strip()
-
-        # Check if question already exists
-        existing_question = c.execute("""
-            SELECT QuestionID FROM QuizQuestions
-            WHERE SchoolID = ? AND TopicID = ? AND QuestionText = ?
-        """, (school_id, topic_id, row["QuestionText"])).fetchone()
-
-        if existing_question:
-            # Update existing question
-            c.execute("""
-                UPDATE QuizQuestions
-                SET DifficultyLevel = ?, AnswerOptions = ?, CorrectAnswer = ?
-                WHERE QuestionID = ?
-            """, (difficulty, json.dumps(options), correct_answer, existing_question[0]))
-            updated_count += 1
-        else:
-            # Insert new question
-            c.execute("""
-                INSERT INTO QuizQuestions (
-                    SchoolID, TopicID, QuestionText, DifficultyLevel, AnswerOptions, CorrectAnswer
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (school_id, topic_id, row["QuestionText"], difficulty, json.dumps(options), correct_answer))
-            added_count += 1
-
-    connection.commit()
-    print(f"✅ Bulk upload complete — Added: {added_count}, Updated: {updated_count}")
+    def text(column):
+        # Blank cells come back as NaN, which astype(str) would store as the text "nan"
+        return df[column].fillna("").astype(str)
+
+    df = pd.DataFrame({
+        "TopicName": text("TopicName").str.strip(),
+        "Difficulty": text("Difficulty").str.strip().str.capitalize(),
+        "QuestionText": text("QuestionText"),
+        "Option1": text("Option1").str.strip(),
+        "Option2": text("Option2").str.strip(),
+        "Option3": text("Option3").str.strip(),
+        "Option4": text("Option4").str.strip(),
+        "CorrectAnswer": text("CorrectAnswer").str.strip(),
+    })
+
+    incomplete = (df["TopicName"] == "") | (df["QuestionText"].str.strip() == "") | (df["CorrectAnswer"] == "")
+    for question_text in df.loc[incomplete, "QuestionText"].tolist():
+        print(f"⚠️ Skipping question with a missing topic, text or correct answer: {question_text or '(blank)'}")
+    df = df[~incomplete]
+    invalid = ~df["Difficulty"].isin(["Easy", "Medium", "Hard"])
+    for difficulty, question_text in df.loc[invalid, ["Difficulty", "QuestionText"]].itertuples(index=False):
+        print(f"⚠️ Skipping invalid difficulty '{difficulty}' for question: {question_text}")
+    df = df[~invalid]
+    if df.empty:
+        return 0, 0
+
+    # Resolve every distinct topic at once, creating the missing ones in one batch
+    topic_names = df["TopicName"].unique().tolist()
+    c.executemany("INSERT OR IGNORE INTO QuestionTopics (SchoolID, TopicName) VALUES (?, ?)",
+                  [(school_id, name) for name in topic_names])
+    topic_ids = dict(c.execute("SELECT TopicName, TopicID FROM QuestionTopics WHERE SchoolID = ?",
+                               (school_id,)).fetchall())
+    df = df.assign(TopicID=df["TopicName"].map(topic_ids).astype(int))
+    df = df.assign(ContentHash=[question_hash(topic_id, question_text)
+                                for topic_id, question_text in zip(df["TopicID"].tolist(), df["QuestionText"].tolist())])
+
+    # A question repeated in the file ends up with the values from its last row
+    df = df.drop_duplicates(subset="ContentHash", keep="last")
+
+    # Indexed lookups on (SchoolID, ContentHash), batched to stay under SQLite's variable limit
+    hashes = df["ContentHash"].tolist()
+    existing = {content_hash: (question_id, correct_answer)
+                for question_id, content_hash, correct_answer in select_in(c, """
+                    SELECT QuestionID, ContentHash, CorrectAnswer FROM QuizQuestions
+                    WHERE SchoolID = ? AND ContentHash IN ({ids})
+                """, hashes, (school_id,))}
+    updated_count = len(existing)
+    # Questions whose answer key changes, so the scores already stored for them are stale
+    rekeyed = [existing[content_hash][0]
+               for content_hash, correct_answer in zip(hashes, df["CorrectAnswer"].tolist())
+               if content_hash in existing
+               and normalise_answer(existing[content_hash][1]) != normalise_answer(correct_answer)]
+
+    # tolist() hands back plain Python values, which sqlite3 can bind (NumPy scalars it cannot)
+    rows = zip(df["TopicID"].tolist(), df["QuestionText"].tolist(), df["Difficulty"].tolist(),
+               df["CorrectAnswer"].tolist(), df[["Option1", "Option2", "Option3", "Option4"]].values.tolist(), hashes)
+    c.executemany("""
+        INSERT INTO QuizQuestions (
+            SchoolID, TopicID, QuestionText, DifficultyLevel, AnswerOptions, CorrectAnswer, ContentHash
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(SchoolID, ContentHash) DO UPDATE
+        SET DifficultyLevel = excluded.DifficultyLevel,
+            AnswerOptions = excluded.AnswerOptions,
+            CorrectAnswer = excluded.CorrectAnswer
+    """, [(school_id, topic_id, question_text, difficulty, json.dumps(options), correct_answer, content_hash)
+          for topic_id, question_text, difficulty, correct_answer, options, content_hash in rows])
+    if rekeyed:
+        # Re-grade every homework set from a quiz containing them, in the caller's transaction
+        grade_homework(row[0] for row in select_in(c, """
+            SELECT DISTINCT h.HomeworkID FROM QuizQuestionAssignments qa
+            JOIN HomeworkTasks h ON h.HomeworkType = 'Quiz' AND h.AssignmentID = qa.QuizID
+            WHERE qa.QuestionID IN ({ids})
+        """, rekeyed))
+    return len(hashes) - updated_count, updated_count
 
 def generate_question_template():
     import pandas as pd
@@ -430,10 +547,10 @@ def generate_question_template():
 
     print(f"✅ Template saved as {file_path}. Fill it out and use Bulk Upload Questions.")
 
-from openpyxl import Workbook
-from openpyxl.worksheet.datavalidation import DataValidation
-
 def generate_upload_template():
+    from openpyxl import Workbook
+    from openpyxl.worksheet.datavalidation import DataValidation
+
     global current_user_token
     if session.is_logged_in() is False:
         print("❌ You must be logged in to generate the template.")
@@ -446,8 +563,9 @@ def generate_upload_template():
 
     school_id = get_school_id(session.get_user_id())
 
-    # Get topic names for dropdown
-    topic_rows = c.execute("SELECT TopicName FROM QuestionTopics WHERE SchoolID=?", (school_id,)).fetchall()
+    with get_read_cursor() as c:
+        # Get topic names for dropdown
+        topic_rows = c.execute("SELECT TopicName FROM QuestionTopics WHERE SchoolID=?", (school_id,)).fetchall()
     topics = [row[0] for row in topic_rows]
 
     wb = Workbook()
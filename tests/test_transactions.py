@@ -0,0 +1,139 @@
+"""ConnectionPool.transaction() with and without GroupCommit, on a throwaway database."""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import databasee
+from databasee import ConnectionPool
+
+WRITERS = 8
+
+
+class Failed(Exception):
+    pass
+
+
+class TransactionTests:
+    """Run by each subclass below with its own ``group_commit_ms``."""
+
+    group_commit_ms = 0
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.pool = ConnectionPool(os.path.join(directory.name, "test.db"), group_commit_ms=self.group_commit_ms)
+        self.addCleanup(self.pool.close_all)
+        with self.pool.transaction() as conn:
+            conn.execute("CREATE TABLE Items (Name TEXT PRIMARY KEY)")
+
+    def names(self):
+        # A connection of its own, so only committed rows are visible
+        conn = sqlite3.connect(self.pool.path)
+        try:
+            return sorted(row[0] for row in conn.execute("SELECT Name FROM Items"))
+        finally:
+            conn.close()
+
+    def run_writers(self, write):
+        """Call ``write(i)`` on WRITERS threads started together; returns what each one raised."""
+        start = threading.Barrier(WRITERS)
+        errors = [None] * WRITERS
+
+        def run(i):
+            start.wait()
+            try:
+                write(i)
+            except Exception as e:
+                errors[i] = e
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+            self.assertFalse(thread.is_alive(), "a writer never finished")
+        return errors
+
+    def test_concurrent_writers_all_commit(self):
+        def write(i):
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT INTO Items (Name) VALUES (?)", (f"item{i}",))
+
+        self.assertEqual(self.run_writers(write), [None] * WRITERS)
+        self.assertEqual(self.names(), sorted(f"item{i}" for i in range(WRITERS)))
+
+    def test_failed_unit_rolls_back_only_itself(self):
+        def write(i):
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT INTO Items (Name) VALUES (?)", (f"item{i}",))
+                if i == 0:
+                    raise Failed()
+
+        errors = self.run_writers(write)
+        self.assertIsInstance(errors[0], Failed)
+        self.assertEqual(errors[1:], [None] * (WRITERS - 1))
+        self.assertEqual(self.names(), sorted(f"item{i}" for i in range(1, WRITERS)))
+
+    def test_nested_transaction_joins_the_outer_one(self):
+        with self.pool.transaction() as outer:
+            outer.execute("INSERT INTO Items (Name) VALUES ('outer')")
+            with self.pool.transaction() as inner:
+                self.assertIs(inner, outer)
+                inner.execute("INSERT INTO Items (Name) VALUES ('inner')")
+            # Leaving the inner block does not commit
+            self.assertEqual(self.names(), [])
+            with self.pool.read_cursor() as c:
+                self.assertEqual(c.execute("SELECT COUNT(*) FROM Items").fetchone()[0], 2)
+        self.assertEqual(self.names(), ["inner", "outer"])
+
+    def test_failure_after_nested_transaction_rolls_back_both(self):
+        with self.assertRaises(Failed):
+            with self.pool.transaction() as outer:
+                outer.execute("INSERT INTO Items (Name) VALUES ('outer')")
+                with self.pool.transaction() as inner:
+                    inner.execute("INSERT INTO Items (Name) VALUES ('inner')")
+                raise Failed()
+        self.assertEqual(self.names(), [])
+        # The pool is still usable afterwards
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT INTO Items (Name) VALUES ('after')")
+        self.assertEqual(self.names(), ["after"])
+
+    def test_read_cursor_sees_committed_writes(self):
+        with mock.patch.object(databasee, "pool", self.pool), mock.patch.object(databasee, "router", None):
+            # Open the reader first, so it has to notice the commit rather than start after it
+            with databasee.get_read_cursor() as c:
+                self.assertEqual(c.execute("SELECT COUNT(*) FROM Items").fetchone()[0], 0)
+            with databasee.get_cursor() as c:
+                c.execute("INSERT INTO Items (Name) VALUES ('mine')")
+            with databasee.get_read_cursor() as c:
+                self.assertEqual(c.execute("SELECT Name FROM Items").fetchall(), [("mine",)])
+
+            def write(i):
+                with databasee.get_cursor() as c:
+                    c.execute("INSERT INTO Items (Name) VALUES (?)", (f"item{i}",))
+                with databasee.get_read_cursor() as c:
+                    if c.execute("SELECT 1 FROM Items WHERE Name = ?", (f"item{i}",)).fetchone() is None:
+                        raise AssertionError(f"item{i} not visible after its commit")
+
+            self.assertEqual(self.run_writers(write), [None] * WRITERS)
+
+
+class SoloCommitTests(TransactionTests, unittest.TestCase):
+    group_commit_ms = 0
+
+
+class GroupCommitTests(TransactionTests, unittest.TestCase):
+    group_commit_ms = 5
+
+    def test_writers_share_one_connection(self):
+        self.assertIs(self.pool.connection(), self.pool.connection())
+        with self.pool.transaction() as conn:
+            self.assertIs(conn, self.pool.connection())
+
+
+if __name__ == "__main__":
+    unittest.main()